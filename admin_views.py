@@ -0,0 +1,522 @@
+from flask import current_app, render_template, request, redirect, url_for, flash, session
+from forms import LoginForm, ProductForm
+from models import db
+from models.product import Category, Product, ProductType, ContactMessage, AdminUser
+from contact_queue import contact_queue
+from catalog_file import catalog_file
+from metrics import metrics
+from slow_queries import slow_query_log
+from profiling import request_profiler
+from memory_diagnostics import memory_diagnostics
+from search_cache import search_cache
+from functools import wraps
+import datetime
+import json
+import os
+import time
+
+# Login required decorator
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'admin_id' not in session:
+            flash('Please login to access this page', 'danger')
+            return redirect(url_for('admin_login'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+# ADMIN ROUTES
+
+# Admin login route
+def admin_login():
+    # If user is already logged in, redirect to dashboard
+    if 'admin_id' in session:
+        return redirect(url_for('admin_dashboard'))
+    
+    form = LoginForm()
+    if form.validate_on_submit():
+        username = form.username.data
+        password = form.password.data
+        
+        # Verify credentials
+        user = AdminUser.verify_password(username, password)
+        
+        if user:
+            # Store user ID in session
+            session['admin_id'] = user.id
+            session['admin_username'] = user.username
+            session['admin_name'] = user.name
+            
+            flash(f'Welcome back, {user.name}!', 'success')
+            return redirect(url_for('admin_dashboard'))
+        else:
+            flash('Invalid username or password', 'danger')
+    
+    return render_template('admin/login.html', form=form)
+
+# Admin logout route
+def admin_logout():
+    # Clear session data
+    session.pop('admin_id', None)
+    session.pop('admin_username', None)
+    session.pop('admin_name', None)
+    
+    flash('You have been logged out', 'success')
+    return redirect(url_for('admin_login'))
+
+# Admin dashboard route
+@login_required
+def admin_dashboard():
+    # Get statistics for dashboard
+    product_count = len(Product.query_all())
+    category_count = len(Category.query_all())
+    product_type_count = len(ProductType.query_all())
+    
+    # Get recent messages
+    recent_messages = ContactMessage.page(limit=5)  # Get top 5 most recent messages
+    message_count = len(recent_messages)
+    
+    # The storefront reads a published copy (snapshot and/or catalog file)
+    publishing = db.READ_MODE == 'snapshot' or catalog_file.enabled
+    published_path = db.SNAPSHOT_PATH if db.READ_MODE == 'snapshot' else catalog_file.path
+    published_at = None
+    if publishing and os.path.exists(published_path):
+        published_at = datetime.datetime.fromtimestamp(os.path.getmtime(published_path)).strftime('%Y-%m-%d %H:%M:%S')
+    
+    return render_template(
+        'admin/dashboard.html',
+        product_count=product_count,
+        category_count=category_count,
+        product_type_count=product_type_count,
+        message_count=message_count,
+        recent_messages=recent_messages,
+        contact_queue_stats=contact_queue.stats(),
+        search_cache_stats=search_cache.stats(),
+        publishing=publishing,
+        published_at=published_at
+    )
+
+# Admin publish route: swap the storefront's snapshot and catalog file for copies of the live database
+@login_required
+def admin_publish():
+    started = time.perf_counter()
+    if db.READ_MODE == 'snapshot':
+        db.publish_snapshot()
+    if catalog_file.enabled:
+        catalog_file.export()
+    flash(f'Storefront published ({(time.perf_counter() - started) * 1000:.0f} ms)', 'success')
+    return redirect(url_for('admin_dashboard'))
+
+# Admin products list route
+@login_required
+def admin_products():
+    products = Product.query_all()
+    categories = Category.query_all()
+    product_types = ProductType.query_all()
+    
+    return render_template(
+        'admin/products.html',
+        products=products,
+        categories=categories,
+        product_types=product_types
+    )
+
+# Admin add product route
+@login_required
+def admin_add_product():
+    form = ProductForm()
+    
+    # Populate the category and product type dropdown lists
+    categories = Category.query_all()
+    form.category_id.choices = [(c.id, c.name) for c in categories]
+    
+    product_types = ProductType.query_all()
+    form.product_type_id.choices = [(0, 'None')] + [(pt.id, pt.name) for pt in product_types]
+    
+    if form.validate_on_submit():
+        # Create a new product
+        new_product = Product(
+            product_id=form.product_id.data,
+            name=form.name.data,
+            description=form.description.data,
+            category_id=form.category_id.data,
+            product_type_id=form.product_type_id.data if form.product_type_id.data > 0 else None,
+            image_url=form.image_url.data,
+            price=form.price.data,
+            specifications=form.specifications.data,
+            features=form.features.data
+        )
+        
+        Product.save(new_product)
+        flash('Product added successfully', 'success')
+        return redirect(url_for('admin_products'))
+    
+    return render_template('admin/product_form.html', form=form)
+
+# Admin edit product route
+@login_required
+def admin_edit_product(product_id):
+    products = Product.filter_by(product_id=product_id)
+    if not products:
+        flash('Product not found', 'danger')
+        return redirect(url_for('admin_products'))
+        
+    product = products[0]
+    form = ProductForm(obj=product)
+    
+    # Populate the category and product type dropdown lists
+    categories = Category.query_all()
+    form.category_id.choices = [(c.id, c.name) for c in categories]
+    
+    product_types = ProductType.query_all()
+    form.product_type_id.choices = [(0, 'None')] + [(pt.id, pt.name) for pt in product_types]
+    
+    if form.validate_on_submit():
+        # Update the product
+        product.name = form.name.data
+        product.product_id = form.product_id.data
+        product.description = form.description.data
+        product.category_id = form.category_id.data
+        product.product_type_id = form.product_type_id.data if form.product_type_id.data > 0 else None
+        product.image_url = form.image_url.data
+        product.price = form.price.data
+        product.specifications = form.specifications.data
+        product.features = form.features.data
+        
+        Product.save(product)
+        flash('Product updated successfully', 'success')
+        return redirect(url_for('admin_products'))
+    
+    # Pre-fill the form
+    if product.specifications:
+        form.specifications.data = json.dumps(product.get_specifications(), indent=2)
+    if product.features:
+        form.features.data = json.dumps(product.get_features(), indent=2)
+    
+    return render_template('admin/product_form.html', form=form, product=product)
+
+# Admin delete product route
+@login_required
+def admin_delete_product(product_id):
+    products = Product.filter_by(product_id=product_id)
+    if not products:
+        flash('Product not found', 'danger')
+    else:
+        Product.delete(product_id)
+        flash('Product deleted successfully', 'success')
+    
+    return redirect(url_for('admin_products'))
+
+# Admin categories list route
+@login_required
+def admin_categories():
+    categories = Category.query_all()
+    return render_template('admin/categories.html', categories=categories)
+
+# Admin add category route
+@login_required
+def admin_add_category():
+    # Get form data
+    name = request.form.get('name')
+    slug = request.form.get('slug')
+    description = request.form.get('description')
+    image_url = request.form.get('image_url')
+    
+    if not name or not slug:
+        flash('Name and slug are required', 'danger')
+        return redirect(url_for('admin_categories'))
+    
+    # Create a new category
+    new_category = Category(
+        name=name,
+        slug=slug,
+        description=description,
+        image_url=image_url
+    )
+    
+    Category.save(new_category)
+    flash('Category added successfully', 'success')
+    return redirect(url_for('admin_categories'))
+
+# Admin edit category route
+@login_required
+def admin_edit_category(category_id):
+    category = Category.get(category_id)
+    if not category:
+        flash('Category not found', 'danger')
+        return redirect(url_for('admin_categories'))
+    
+    # Get form data
+    name = request.form.get('name')
+    slug = request.form.get('slug')
+    description = request.form.get('description')
+    image_url = request.form.get('image_url')
+    
+    if not name or not slug:
+        flash('Name and slug are required', 'danger')
+        return redirect(url_for('admin_categories'))
+    
+    # Update the category
+    category.name = name
+    category.slug = slug
+    category.description = description
+    category.image_url = image_url
+    
+    Category.save(category)
+    flash('Category updated successfully', 'success')
+    return redirect(url_for('admin_categories'))
+
+# Admin delete category route
+@login_required
+def admin_delete_category(category_id):
+    category = Category.get(category_id)
+    if not category:
+        flash('Category not found', 'danger')
+    else:
+        # Check if category has products
+        products = Product.filter_by(category_id=category_id)
+        if products:
+            flash(f'Cannot delete category: {len(products)} products are associated with it', 'danger')
+        else:
+            Category.delete(category_id)
+            flash('Category deleted successfully', 'success')
+    
+    return redirect(url_for('admin_categories'))
+
+# Admin product types list route
+@login_required
+def admin_product_types():
+    product_types = ProductType.query_all()
+    categories = Category.query_all()
+    return render_template('admin/product_types.html', product_types=product_types, categories=categories)
+
+# Admin add product type route
+@login_required
+def admin_add_product_type():
+    # Get form data
+    name = request.form.get('name')
+    slug = request.form.get('slug')
+    category_id = request.form.get('category_id')
+    description = request.form.get('description')
+    
+    if not name or not slug or not category_id:
+        flash('Name, slug, and category are required', 'danger')
+        return redirect(url_for('admin_product_types'))
+    
+    # Create a new product type
+    new_product_type = ProductType(
+        name=name,
+        slug=slug,
+        category_id=int(category_id),
+        description=description
+    )
+    
+    ProductType.save(new_product_type)
+    flash('Product type added successfully', 'success')
+    return redirect(url_for('admin_product_types'))
+
+# Admin edit product type route
+@login_required
+def admin_edit_product_type(product_type_id):
+    product_type = ProductType.get(product_type_id)
+    if not product_type:
+        flash('Product type not found', 'danger')
+        return redirect(url_for('admin_product_types'))
+    
+    # Get form data
+    name = request.form.get('name')
+    slug = request.form.get('slug')
+    category_id = request.form.get('category_id')
+    description = request.form.get('description')
+    
+    if not name or not slug or not category_id:
+        flash('Name, slug, and category are required', 'danger')
+        return redirect(url_for('admin_product_types'))
+    
+    # Update the product type
+    product_type.name = name
+    product_type.slug = slug
+    product_type.category_id = int(category_id)
+    product_type.description = description
+    
+    ProductType.save(product_type)
+    flash('Product type updated successfully', 'success')
+    return redirect(url_for('admin_product_types'))
+
+# Admin delete product type route
+@login_required
+def admin_delete_product_type(product_type_id):
+    product_type = ProductType.get(product_type_id)
+    if not product_type:
+        flash('Product type not found', 'danger')
+    else:
+        # Check if product type has products
+        products = Product.filter_by(product_type_id=product_type_id)
+        if products:
+            # Update products to remove the product type (set to NULL)
+            for product in products:
+                product.product_type_id = None
+                Product.save(product)
+        
+        ProductType.delete(product_type_id)
+        flash('Product type deleted successfully', 'success')
+    
+    return redirect(url_for('admin_product_types'))
+
+# Admin metrics route (Prometheus text format)
+def admin_metrics():
+    return metrics.view()
+
+# Admin slow query log route
+@login_required
+def admin_slow_queries():
+    return render_template(
+        'admin/slow_queries.html',
+        slow_queries=slow_query_log.aggregate(),
+        enabled=slow_query_log.enabled,
+        threshold_ms=current_app.config['SLOW_QUERY_THRESHOLD_MS']
+    )
+
+# Admin clear slow query log route
+@login_required
+def admin_clear_slow_queries():
+    slow_query_log.clear()
+    flash('Slow query log cleared', 'success')
+    return redirect(url_for('admin_slow_queries'))
+
+# Admin request profiles route
+@login_required
+def admin_profile(name=None):
+    match = request.args.get('match', '').strip()
+    functions = None
+    if name:
+        functions = request_profiler.top_functions(name, match=match or None)
+        if functions is None:
+            flash('Profile not found', 'danger')
+            return redirect(url_for('admin_profile'))
+    
+    return render_template(
+        'admin/profiles.html',
+        profiles=request_profiler.profiles(),
+        functions=functions,
+        selected=name,
+        match=match,
+        enabled=request_profiler.enabled,
+        sample_rate=request_profiler.sample_rate,
+        endpoints=sorted(request_profiler.endpoints),
+        header=request_profiler.header
+    )
+
+# Admin reset profiles route
+@login_required
+def admin_reset_profiles():
+    request_profiler.reset()
+    flash('Profiles reset', 'success')
+    return redirect(url_for('admin_profile'))
+
+# Admin memory diagnostics route
+@login_required
+def admin_memory():
+    old_name = request.args.get('a')
+    new_name = request.args.get('b')
+    group_by = request.args.get('group', 'lineno')
+    if group_by not in ('lineno', 'filename'):
+        group_by = 'lineno'
+    
+    diff = None
+    if old_name and new_name:
+        diff = memory_diagnostics.diff(old_name, new_name, group_by=group_by)
+        if diff is None:
+            flash('Snapshot not found in this worker', 'danger')
+    
+    return render_template(
+        'admin/memory.html',
+        pid=os.getpid(),
+        tracing=memory_diagnostics.tracing,
+        traced=memory_diagnostics.traced_memory(),
+        snapshots=memory_diagnostics.list_snapshots(),
+        peaks=memory_diagnostics.request_peaks(),
+        peak_endpoints=sorted(memory_diagnostics.peak_endpoints),
+        diff=diff,
+        old_name=old_name,
+        new_name=new_name,
+        group_by=group_by
+    )
+
+# Admin start tracemalloc route
+@login_required
+def admin_memory_start():
+    memory_diagnostics.start()
+    flash('Memory tracing started', 'success')
+    return redirect(url_for('admin_memory'))
+
+# Admin stop tracemalloc route
+@login_required
+def admin_memory_stop():
+    memory_diagnostics.stop()
+    flash('Memory tracing stopped and snapshots discarded', 'success')
+    return redirect(url_for('admin_memory'))
+
+# Admin take memory snapshot route
+@login_required
+def admin_memory_snapshot():
+    if not memory_diagnostics.tracing:
+        flash('Start tracing before taking a snapshot', 'danger')
+        return redirect(url_for('admin_memory'))
+    
+    name = memory_diagnostics.take_snapshot(request.form.get('name', '').strip() or None)
+    flash(f'Snapshot "{name}" taken', 'success')
+    return redirect(url_for('admin_memory'))
+
+# Admin messages list route
+@login_required
+def admin_messages():
+    search = request.args.get('q', '').strip()
+    page_size = current_app.config['INBOX_PAGE_SIZE']
+    
+    # Keyset cursor: "<created_at>|<id>" of the last message on the previous page
+    before = None
+    cursor = request.args.get('before', '')
+    if '|' in cursor:
+        created_at, _, message_id = cursor.rpartition('|')
+        if message_id.isdigit():
+            before = (created_at, int(message_id))
+    
+    # Fetch one extra row to know whether there is an older page
+    contact_messages = ContactMessage.page(before=before, search=search, limit=page_size + 1)
+    next_cursor = None
+    if len(contact_messages) > page_size:
+        contact_messages = contact_messages[:page_size]
+        last = contact_messages[-1]
+        next_cursor = f'{last.created_at}|{last.id}'
+    
+    return render_template(
+        'admin/messages.html',
+        contact_messages=contact_messages,
+        search=search,
+        next_cursor=next_cursor,
+        is_first_page=before is None
+    )
+
+# Admin view message route
+@login_required
+def admin_view_message(message_id):
+    message = ContactMessage.get(message_id)
+    if not message:
+        flash('Message not found', 'danger')
+        return redirect(url_for('admin_messages'))
+    
+    return render_template('admin/view_message.html', message=message)
+
+# Admin delete message route
+@login_required
+def admin_delete_message(message_id):
+    message = ContactMessage.get(message_id)
+    if not message:
+        flash('Message not found', 'danger')
+    else:
+        ContactMessage.delete(message_id)
+        flash('Message deleted successfully', 'success')
+    
+    return redirect(url_for('admin_messages'))
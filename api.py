@@ -0,0 +1,184 @@
+from flask import current_app, json, request, jsonify
+from models.product import PRODUCT_FIELDS, Product
+from product_json import product_json
+from views import listing_params, next_page
+
+def parse_fields(names):
+    """A projection tuple from requested field names; raises ValueError on unknown names"""
+    fields = tuple(dict.fromkeys(name.strip() for name in names if isinstance(name, str) and name.strip()))
+    unknown = [field for field in fields if field not in PRODUCT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    if not fields:
+        raise ValueError('No fields requested')
+    return fields
+
+def fields_param():
+    """The ?fields=a,b,c projection, or None for every field"""
+    value = request.args.get('fields', '')
+    return parse_fields(value.split(',')) if value else None
+
+def lookup_ids(product_ids):
+    """The non-empty product_ids asked for; raises ValueError past API_MAX_LOOKUP_IDS"""
+    product_ids = [product_id.strip() for product_id in product_ids if product_id and product_id.strip()]
+    max_ids = current_app.config['API_MAX_LOOKUP_IDS']
+    if len(product_ids) > max_ids:
+        raise ValueError(f"At most {max_ids} ids per request")
+    return product_ids
+
+def lookup_response(product_ids, fields, products=None):
+    # {"products": [...], "missing": [...]}, products in the order asked for;
+    # `products` may already have been fetched (the async view does so)
+    if products is None:
+        try:
+            product_ids = lookup_ids(product_ids)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        products = Product.get_many(product_ids, fields)
+    found = {product.product_id for product in products}
+    missing = [product_id for product_id in dict.fromkeys(product_ids) if product_id not in found]
+    body = (
+        b'{"missing":' + json.dumps(missing, separators=(',', ':')).encode('utf-8')
+        + b',"products":' + product_json.encode_list(products, fields).rstrip(b'\n') + b'}\n'
+    )
+    return current_app.response_class(body, mimetype=current_app.config['JSONIFY_MIMETYPE'])
+
+# API routes for admin functions
+def product_list_params():
+    """The /api/products query, shared with the async view.
+
+    Returns `(error response, None)` or `(None, params)`, where params
+    holds the ?fields= projection, the ?ids= to look up (or None), the
+    listing parameters (price_min, price_max, sort, after) and ?limit=
+    (None for every matching product).
+    """
+    try:
+        fields = fields_param()
+    except ValueError as e:
+        return (jsonify({"error": str(e), "fields": list(PRODUCT_FIELDS)}), 400), None
+    # ?ids=NT45,RT01,... looks up those products instead of listing
+    try:
+        ids = lookup_ids(request.args['ids'].split(',')) if 'ids' in request.args else None
+    except ValueError as e:
+        return (jsonify({"error": str(e)}), 400), None
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = min(limit, current_app.config['API_MAX_PAGE_SIZE']) if limit >= 1 else None
+    return None, {'fields': fields, 'ids': ids, 'listing': listing_params(), 'limit': limit}
+
+def product_list(fields, ids, listing, limit):
+    """The model call behind /api/products"""
+    if ids is not None:
+        return Product.get_many(ids, fields)
+    return Product.filter_by_price(**listing, limit=None if limit is None else limit + 1, fields=fields)
+
+def product_list_response(products, fields, ids, listing, limit):
+    if ids is not None:
+        return lookup_response(ids, fields, products)
+    if limit is None:
+        return product_json.response(products, fields)
+    products, next_url = next_page(products, limit, listing['sort'])
+    response = product_json.response(products, fields)
+    if next_url:
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response
+
+def get_products():
+    # Accepts the listing parameters (price_min, price_max, sort, after) and
+    # ?fields= to return (and read) only some columns. Without ?limit= every
+    # matching product is returned; with it, one page and a Link header
+    # pointing at the next
+    error, params = product_list_params()
+    if error:
+        return error
+    return product_list_response(product_list(**params), **params)
+
+def lookup_products():
+    # POST form of ?ids= for long lists: a JSON body {"ids": [...], "fields":
+    # [...]} or form fields ids=NT45,RT01,...
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        product_ids = data.get('ids')
+        fields = data.get('fields')
+    else:
+        product_ids = request.form.get('ids', '').split(',')
+        fields = request.form.get('fields') or None
+    if not isinstance(product_ids, list) or not all(isinstance(product_id, str) for product_id in product_ids):
+        return jsonify({"error": "ids must be a list of product ids"}), 400
+    try:
+        if fields is not None:
+            fields = parse_fields(fields.split(',') if isinstance(fields, str) else fields)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e), "fields": list(PRODUCT_FIELDS)}), 400
+    return lookup_response(product_ids, fields)
+
+def get_product_changes():
+    # Change feed for integrations: pass the returned cursor back as ?since=
+    # to get what changed after it, in commit order
+    since = request.args.get('since', '')
+    if since and not since.isdigit():
+        return jsonify({"error": "Invalid cursor"}), 400
+    limit = request.args.get('limit', type=int) or current_app.config['CHANGE_FEED_PAGE_SIZE']
+    limit = max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+    
+    changes, cursor, has_more = Product.changes(int(since) if since else None, limit)
+    items = []
+    for change_seq, op, record in changes:
+        if op == 'upsert':
+            items.append({'op': op, 'change_seq': change_seq, 'product': record.to_dict()})
+        else:
+            items.append({
+                'op': op,
+                'change_seq': change_seq,
+                'product_id': record['product_id'],
+                'deleted_at': record['deleted_at'],
+            })
+    return jsonify({
+        'changes': items,
+        'cursor': None if cursor is None else str(cursor),
+        'has_more': has_more,
+    })
+
+def add_product():
+    # Add authentication here
+    data = request.json
+    
+    new_product = Product(
+        product_id=data['product_id'],
+        name=data['name'],
+        description=data['description'],
+        category_id=data['category_id'],
+        product_type_id=data.get('product_type_id'),
+        image_url=data.get('image_url', ''),
+        price=data.get('price'),
+        specifications=data.get('specifications', '{}'),
+        features=data.get('features', '[]')
+    )
+    
+    Product.save(new_product)
+    return jsonify(new_product.to_dict()), 201
+
+def update_product(product_id):
+    # Add authentication here
+    products = Product.filter_by(product_id=product_id)
+    if not products:
+        return jsonify({"error": "Product not found"}), 404
+        
+    product = products[0]
+    data = request.json
+    
+    for key, value in data.items():
+        if hasattr(product, key):
+            setattr(product, key, value)
+    
+    Product.save(product)
+    return jsonify(product.to_dict())
+
+def delete_product(product_id):
+    # Add authentication here
+    products = Product.filter_by(product_id=product_id)
+    if not products:
+        return jsonify({"error": "Product not found"}), 404
+        
+    Product.delete(product_id)
+    return '', 204
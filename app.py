@@ -1,618 +1,273 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, flash, session
-from flask_wtf import FlaskForm, CSRFProtect
-from wtforms import StringField, TextAreaField, SubmitField, PasswordField, SelectField, FloatField, HiddenField
-from wtforms.validators import DataRequired, Email, Length, Optional, ValidationError
-from models.product import Category, Product, ProductType, ContactMessage, AdminUser
-from functools import wraps
+from flask import Flask, current_app, g, request
+from flask_wtf.csrf import CSRFProtect
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.utils import cached_property, import_string
+from models import db
+from models.product import Category
+from models.schema import migrate
+from config import Config
+from contact_queue import contact_queue
+from db_executor import db_executor
+from catalog_file import catalog_file
+from catalog_generation import catalog_generation
+from product_json import product_json
+from sitemap import sitemaps
+from compression import compression
+from rate_limit import rate_limiter
+from search_cache import search_cache
+from metrics import metrics
+from slow_queries import slow_query_log
+from profiling import request_profiler
+from memory_diagnostics import memory_diagnostics
 import datetime
-import sqlite3
-import json
+import os
+
+csrf = CSRFProtect()  # CSRF protection, bound to the app in create_app()
+
+# URL rule, view ("module.function") and methods. Views are imported the
+# first time they are requested (see LazyView), so starting the app does
+# not import the admin views or the WTForms classes.
+URL_RULES = [
+    # Storefront
+    ('/', 'views.home', None),
+    ('/about', 'views.about', None),
+    ('/contact', 'views.contact', ['GET', 'POST']),
+    ('/category/<string:category_name>', 'views.category', None),
+    ('/product/<string:product_id>', 'views.product', None),
+    ('/search', 'views.search', None),
+    ('/sitemap.xml', 'views.sitemap_index', ['GET']),
+    ('/sitemaps/<name>.xml', 'views.sitemap', ['GET']),
+    # Admin (imports the WTForms classes on first use)
+    ('/admin/login', 'admin_views.admin_login', ['GET', 'POST']),
+    ('/admin/logout', 'admin_views.admin_logout', None),
+    ('/admin/dashboard', 'admin_views.admin_dashboard', None),
+    ('/admin/publish', 'admin_views.admin_publish', ['POST']),
+    ('/admin/products', 'admin_views.admin_products', None),
+    ('/admin/products/add', 'admin_views.admin_add_product', ['GET', 'POST']),
+    ('/admin/products/edit/<string:product_id>', 'admin_views.admin_edit_product', ['GET', 'POST']),
+    ('/admin/products/delete/<string:product_id>', 'admin_views.admin_delete_product', ['POST']),
+    ('/admin/categories', 'admin_views.admin_categories', None),
+    ('/admin/categories/add', 'admin_views.admin_add_category', ['POST']),
+    ('/admin/categories/edit/<int:category_id>', 'admin_views.admin_edit_category', ['POST']),
+    ('/admin/categories/delete/<int:category_id>', 'admin_views.admin_delete_category', ['POST']),
+    ('/admin/product-types', 'admin_views.admin_product_types', None),
+    ('/admin/product-types/add', 'admin_views.admin_add_product_type', ['POST']),
+    ('/admin/product-types/edit/<int:product_type_id>', 'admin_views.admin_edit_product_type', ['POST']),
+    ('/admin/product-types/delete/<int:product_type_id>', 'admin_views.admin_delete_product_type', ['POST']),
+    ('/admin/metrics', 'admin_views.admin_metrics', None),
+    ('/admin/slow-queries', 'admin_views.admin_slow_queries', None),
+    ('/admin/slow-queries/clear', 'admin_views.admin_clear_slow_queries', ['POST']),
+    ('/admin/profiles', 'admin_views.admin_profile', None),
+    ('/admin/profiles/<string:name>', 'admin_views.admin_profile', None),
+    ('/admin/profiles/reset', 'admin_views.admin_reset_profiles', ['POST']),
+    ('/admin/memory', 'admin_views.admin_memory', None),
+    ('/admin/memory/start', 'admin_views.admin_memory_start', ['POST']),
+    ('/admin/memory/stop', 'admin_views.admin_memory_stop', ['POST']),
+    ('/admin/memory/snapshot', 'admin_views.admin_memory_snapshot', ['POST']),
+    ('/admin/messages', 'admin_views.admin_messages', None),
+    ('/admin/messages/view/<int:message_id>', 'admin_views.admin_view_message', None),
+    ('/admin/messages/delete/<int:message_id>', 'admin_views.admin_delete_message', ['POST']),
+    # API
+    ('/api/products', 'api.get_products', ['GET']),
+    ('/api/products', 'api.add_product', ['POST']),
+    ('/api/products/changes', 'api.get_product_changes', ['GET']),
+    ('/api/products/lookup', 'api.lookup_products', ['POST']),
+    ('/api/products/<string:product_id>', 'api.update_product', ['PUT']),
+    ('/api/products/<string:product_id>', 'api.delete_product', ['DELETE']),
+    # Async read path (model calls run on the db_executor thread pool)
+    ('/api/async/products', 'async_views.get_products_async', ['GET']),
+    ('/async/search', 'async_views.search_async', None),
+]
+
+
+class LazyView:
+    """View that imports its function on first call (Flask's lazy loading pattern)"""
+
+    def __init__(self, import_name):
+        self.__module__, self.__name__ = import_name.rsplit('.', 1)
+        self.import_name = import_name
+
+    @cached_property
+    def view(self):
+        return import_string(self.import_name)
+
+    def __call__(self, *args, **kwargs):
+        # Flask only recognises `async def` views by their function, so
+        # wrap the imported view here rather than at registration
+        return current_app.ensure_sync(self.view)(*args, **kwargs)
+
+
+def create_app(config=None):
+    """Build the application. `config` is a dict or object of settings
+    that override the defaults in config.Config."""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    # The models read the database settings from the connection layer
+    db.DATABASE_PATH = app.config['DATABASE']
+    db.READ_MODE = app.config['DB_READ_MODE']
+    db.SNAPSHOT_PATH = app.config['DB_SNAPSHOT_PATH']
+
+    if app.config['JINJA_CACHE_DIR']:
+        os.makedirs(app.config['JINJA_CACHE_DIR'], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['JINJA_CACHE_DIR'])
+
+    csrf.init_app(app)  # Initialize CSRF protection
+    csrf.exempt('api.lookup_products')  # A read-only POST, so long id lists fit in the body
+    metrics.init_app(app)  # Request, SQL and template instrumentation
+    slow_query_log.init_app(app)  # Opt-in slow query log with EXPLAIN QUERY PLAN
+    request_profiler.init_app(app)  # Sampling cProfile hook
+    memory_diagnostics.init_app(app)  # tracemalloc snapshots and per-request peaks
+    contact_queue.init_app(app)  # Contact form submissions are written in the background
+    db_executor.init_app(app)  # Thread pool for the async views' model calls
+    catalog_file.init_app(app)  # Memory-mapped catalog for the storefront read path
+    catalog_generation.init_app(app)  # Per-request check for catalog changes made by any worker
+    product_json.init_app(app)  # Encoded product JSON reused by the list endpoints
+    search_cache.init_app(app)  # Search results by normalised query, cleared when the catalog changes
+    sitemaps.init_app(app)  # sitemap.xml files cached on disk until the catalog changes
+    rate_limiter.init_app(app)  # Token buckets per client for search, contact and the write API
+    compression.init_app(app)  # gzip/brotli for text responses, around the whole WSGI app
+
+    metrics.add_gauge('contact_queue_depth', 'Contact messages waiting to be written',
+                      lambda: contact_queue.stats()['depth'])
+    metrics.add_gauge('contact_queue_dropped', 'Contact messages rejected because the queue was full',
+                      lambda: contact_queue.stats()['dropped'])
+    metrics.add_gauge('contact_queue_spilled', 'Contact messages written to the spill file',
+                      lambda: contact_queue.stats()['spilled'])
+    metrics.add_gauge('db_executor_pending', 'Model calls submitted to the async DB executor and not finished',
+                      lambda: db_executor.stats()['pending'])
+    metrics.add_gauge('catalog_generation', 'Catalog generation last seen by this worker',
+                      lambda: catalog_generation.stats()['generation'] or 0)
+    metrics.add_gauge('catalog_file_reloads', 'Times this worker mapped a new catalog file',
+                      lambda: catalog_file.stats()['reloads'])
+    metrics.add_gauge('product_json_cache_entries', 'Products whose encoded JSON this worker has cached',
+                      lambda: product_json.stats()['entries'])
+    metrics.add_gauge('product_json_cache_hits', 'Product JSON cache hits in this worker',
+                      lambda: product_json.stats()['hits'])
+    metrics.add_gauge('product_json_cache_misses', 'Product JSON cache misses in this worker',
+                      lambda: product_json.stats()['misses'])
+    metrics.add_gauge('search_cache_entries', 'Search result pages this worker has cached',
+                      lambda: search_cache.stats()['entries'])
+    metrics.add_gauge('search_cache_hits', 'Search result cache hits in this worker',
+                      lambda: search_cache.stats()['hits'])
+    metrics.add_gauge('search_cache_misses', 'Search result cache misses in this worker',
+                      lambda: search_cache.stats()['misses'])
+    metrics.add_gauge('sitemap_builds', 'Sitemap files this worker has rebuilt',
+                      lambda: sitemaps.stats()['builds'])
+    metrics.add_gauge('rate_limit_buckets', 'Clients with a rate limit bucket, by rule',
+                      lambda: {(name,): rule['buckets'] for name, rule in rate_limiter.stats()['rules'].items()},
+                      ('rule',))
+    metrics.add_gauge('rate_limit_limited', 'Clients with no requests left, by rule',
+                      lambda: {(name,): rule['limited'] for name, rule in rate_limiter.stats()['rules'].items()},
+                      ('rule',))
+    metrics.add_gauge('rate_limit_bucket_fill', 'Mean share of their burst that tracked clients have used, by rule',
+                      lambda: {(name,): rule['fill'] for name, rule in rate_limiter.stats()['rules'].items()},
+                      ('rule',))
+    metrics.add_gauge('rate_limit_rejected', 'Requests this worker answered with 429, by rule',
+                      lambda: {(name,): rule['rejected'] for name, rule in rate_limiter.stats()['rules'].items()},
+                      ('rule',))
+    metrics.add_gauge('compression_bytes_saved', 'Response bytes saved by compression in this worker',
+                      lambda: {(coding,): saved for coding, saved in compression.stats()['bytes_saved'].items()},
+                      ('encoding',))
+    metrics.add_gauge('traced_memory_bytes', 'Memory traced by tracemalloc (0 when not tracing)',
+                      lambda: (memory_diagnostics.traced_memory() or {'current': 0})['current'])
+
+    for rule, view, methods in URL_RULES:
+        endpoint = view.rsplit('.', 1)[1]
+        existing = app.view_functions.get(endpoint)
+        app.add_url_rule(rule, endpoint, existing or LazyView(view), methods=methods)
+
+    # Bring the schema up to date once per process, before the first request is served
+    @app.before_first_request
+    def apply_migrations():
+        migrate()
+        if db.READ_MODE == 'snapshot' and not db.snapshot_info():
+            db.publish_snapshot()
+        if catalog_file.enabled and not os.path.exists(catalog_file.path):
+            catalog_file.export()
+
+    # Admin pages and writes read the live database, not the published snapshot
+    @app.before_request
+    def select_read_connection():
+        if request.path.startswith('/admin') or request.method not in ('GET', 'HEAD'):
+            g.live_reads_token = db.live_reads.set(True)
+
+    @app.teardown_request
+    def reset_read_connection(exc):
+        token = g.pop('live_reads_token', None)
+        if token is not None:
+            db.live_reads.reset(token)
+
+    # Navigation categories, reused until the catalog generation changes
+    navigation = (None, None)
+
+    def navigation_categories():
+        nonlocal navigation
+        generation = catalog_generation.current()
+        if generation is None or db.live_reads.get():
+            return Category.query_all()
+        if navigation[0] != generation:
+            navigation = (generation, Category.query_all())
+        return navigation[1]
+
+    # Context processor to add data to all templates
+    @app.context_processor
+    def inject_data():
+        catalog = catalog_file.current()
+        return {
+            'current_year': datetime.datetime.now().year,
+            # Async views fetch the categories concurrently with their own queries
+            'categories': g.categories if 'categories' in g else (
+                catalog.categories if catalog else navigation_categories()
+            ),
+        }
+
+    # Admin filter for Jinja templates
+    @app.template_filter('nl2br')
+    def nl2br(value):
+        """Convert newlines to <br>"""
+        if not value:
+            return ''
+        return value.replace('\n', '<br>')
+
+    from commands import commands
+    for command in commands:
+        app.cli.add_command(command)
+
+    return app
+
+
+def precompile_templates(app):
+    """Load every template once so its compiled code lands in the bytecode cache"""
+    count = 0
+    for name in app.jinja_env.list_templates():
+        if name.endswith('.html'):
+            app.jinja_env.get_template(name)
+            count += 1
+    return count
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'floofofhearts-secret-key'  # Change this in production
-csrf = CSRFProtect(app)  # Initialize CSRF protection
 
 # Initialize the database connection (if needed, you can create a function to get connections)
 def init_db():
-    conn = sqlite3.connect('instance/floorofhearts.db')
-    conn.close()
+    migrate()
 
-# Create a contact form class
-class ContactForm(FlaskForm):
-    name = StringField('Name', validators=[DataRequired(), Length(min=2, max=100)])
-    email = StringField('Email', validators=[DataRequired(), Email()])
-    phone = StringField('Phone', validators=[Length(max=20)])
-    subject = StringField('Subject', validators=[DataRequired(), Length(min=2, max=100)])
-    message = TextAreaField('Message', validators=[DataRequired(), Length(min=10, max=1000)])
-    submit = SubmitField('Send Message')
 
-# Login form class for admin users
-class LoginForm(FlaskForm):
-    username = StringField('Username', validators=[DataRequired()])
-    password = PasswordField('Password', validators=[DataRequired()])
-    submit = SubmitField('Login')
+def __getattr__(name):
+    # `from app import app` (and `flask run`) get a default application,
+    # built on first access so importing create_app alone stays cheap
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Product Form for admin
-class ProductForm(FlaskForm):
-    product_id = StringField('Product ID', validators=[DataRequired(), Length(min=2, max=20)])
-    name = StringField('Name', validators=[DataRequired(), Length(min=2, max=100)])
-    description = TextAreaField('Description', validators=[DataRequired()])
-    category_id = SelectField('Category', coerce=int, validators=[DataRequired()])
-    product_type_id = SelectField('Product Type', coerce=int, validators=[Optional()])
-    price = FloatField('Price', validators=[Optional()])
-    image_url = StringField('Image URL', validators=[Optional(), Length(max=200)])
-    specifications = TextAreaField('Specifications (JSON)', validators=[Optional()])
-    features = TextAreaField('Features (JSON Array)', validators=[Optional()])
-    
-    def validate_specifications(self, field):
-        if field.data.strip():
-            try:
-                json.loads(field.data)
-            except json.JSONDecodeError:
-                raise ValidationError('Invalid JSON format for specifications')
-                
-    def validate_features(self, field):
-        if field.data.strip():
-            try:
-                features = json.loads(field.data)
-                if not isinstance(features, list):
-                    raise ValidationError('Features must be a JSON array')
-            except json.JSONDecodeError:
-                raise ValidationError('Invalid JSON format for features')
-
-# Login required decorator
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'admin_id' not in session:
-            flash('Please login to access this page', 'danger')
-            return redirect(url_for('admin_login'))
-        return f(*args, **kwargs)
-    return decorated_function
-
-# Context processor to add data to all templates
-@app.context_processor
-def inject_data():
-    return {
-        'current_year': datetime.datetime.now().year,
-        'categories': Category.query_all(),
-    }
-
-# Admin filter for Jinja templates
-@app.template_filter('nl2br')
-def nl2br(value):
-    """Convert newlines to <br>"""
-    if not value:
-        return ''
-    return value.replace('\n', '<br>')
-
-# Home route
-@app.route('/')
-def home():
-    return render_template('index.html')
-
-# About Us route
-@app.route('/about')
-def about():
-    return render_template('about.html')
-
-# Contact route
-@app.route('/contact', methods=['GET', 'POST'])
-def contact():
-    form = ContactForm()
-    if form.validate_on_submit():
-        # Connect to the database
-        try:
-            conn = sqlite3.connect('instance/floorofhearts.db')
-            cursor = conn.cursor()
-            
-            # Create contacts table if it doesn't exist
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS contacts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                email TEXT NOT NULL,
-                phone TEXT,
-                subject TEXT NOT NULL,
-                message TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-            
-            # Insert the form data into the database
-            cursor.execute('''
-            INSERT INTO contacts (name, email, phone, subject, message)
-            VALUES (?, ?, ?, ?, ?)
-            ''', (
-            form.name.data,
-            form.email.data,
-            form.phone.data,
-            form.subject.data,
-            form.message.data
-            ))
-            
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            flash(f'Error saving your message: {str(e)}', 'danger')
-            return redirect(url_for('contact'))
-        flash('Thank you for your message! We will get back to you soon.', 'success')
-        return redirect(url_for('contact'))
-    
-    return render_template('contact.html', form=form)
-
-# Category page route (e.g., LVT, Carpets, etc.)
-@app.route('/category/<string:category_name>')
-def category(category_name):
-    category = Category.filter_by(slug=category_name)
-    if not category:
-        return render_template('404.html'), 404
-        
-    product_types = ProductType.filter_by(category_id=category.id)
-    
-    # Filter by product type if specified in the query parameters
-    type_filter = request.args.get('type')
-    if type_filter:
-        product_type_list = [pt for pt in product_types if pt.slug == type_filter]
-        if product_type_list:
-            product_type = product_type_list[0]
-            products = Product.filter_by(category_id=category.id, product_type_id=product_type.id)
-        else:
-            products = Product.filter_by(category_id=category.id)
-    else:
-        products = Product.filter_by(category_id=category.id)
-    
-    return render_template(
-        'category.html', 
-        category=category, 
-        product_types=product_types, 
-        products=products,
-        active_category=category_name
-    )
-
-# Product page route
-@app.route('/product/<string:product_id>')
-def product(product_id):
-    products = Product.filter_by(product_id=product_id)
-    if not products:
-        return render_template('404.html'), 404
-        
-    product = products[0]
-    # Find the category for active menu highlighting
-    category = Category.get(product.category_id)
-    active_category = category.slug if category else None
-    
-    return render_template('product.html', product=product, active_category=active_category)
-
-# Search route
-@app.route('/search')
-def search():
-    query = request.args.get('search', '')
-    if not query:
-        return render_template('search.html', query='', results=[])
-    
-    # Search for products by name, description, or product_id
-    # Use SQLite LIKE for searching
-    condition = f"name LIKE '%{query}%' OR description LIKE '%{query}%' OR product_id LIKE '%{query}%'"
-    results = Product.filter(condition)
-    
-    return render_template('search.html', query=query, results=results)
-
-# ADMIN ROUTES
-
-# Admin login route
-@app.route('/admin/login', methods=['GET', 'POST'])
-def admin_login():
-    # If user is already logged in, redirect to dashboard
-    if 'admin_id' in session:
-        return redirect(url_for('admin_dashboard'))
-    
-    form = LoginForm()
-    if form.validate_on_submit():
-        username = form.username.data
-        password = form.password.data
-        
-        # Verify credentials
-        user = AdminUser.verify_password(username, password)
-        
-        if user:
-            # Store user ID in session
-            session['admin_id'] = user.id
-            session['admin_username'] = user.username
-            session['admin_name'] = user.name
-            
-            flash(f'Welcome back, {user.name}!', 'success')
-            return redirect(url_for('admin_dashboard'))
-        else:
-            flash('Invalid username or password', 'danger')
-    
-    return render_template('admin/login.html', form=form)
-
-# Admin logout route
-@app.route('/admin/logout')
-def admin_logout():
-    # Clear session data
-    session.pop('admin_id', None)
-    session.pop('admin_username', None)
-    session.pop('admin_name', None)
-    
-    flash('You have been logged out', 'success')
-    return redirect(url_for('admin_login'))
-
-# Admin dashboard route
-@app.route('/admin/dashboard')
-@login_required
-def admin_dashboard():
-    # Get statistics for dashboard
-    product_count = len(Product.query_all())
-    category_count = len(Category.query_all())
-    product_type_count = len(ProductType.query_all())
-    
-    # Get recent messages
-    recent_messages = ContactMessage.query_all()[:5]  # Get top 5 most recent messages
-    message_count = len(recent_messages)
-    
-    return render_template(
-        'admin/dashboard.html',
-        product_count=product_count,
-        category_count=category_count,
-        product_type_count=product_type_count,
-        message_count=message_count,
-        recent_messages=recent_messages
-    )
-
-# Admin products list route
-@app.route('/admin/products')
-@login_required
-def admin_products():
-    products = Product.query_all()
-    categories = Category.query_all()
-    product_types = ProductType.query_all()
-    
-    return render_template(
-        'admin/products.html',
-        products=products,
-        categories=categories,
-        product_types=product_types
-    )
-
-# Admin add product route
-@app.route('/admin/products/add', methods=['GET', 'POST'])
-@login_required
-def admin_add_product():
-    form = ProductForm()
-    
-    # Populate the category and product type dropdown lists
-    categories = Category.query_all()
-    form.category_id.choices = [(c.id, c.name) for c in categories]
-    
-    product_types = ProductType.query_all()
-    form.product_type_id.choices = [(0, 'None')] + [(pt.id, pt.name) for pt in product_types]
-    
-    if form.validate_on_submit():
-        # Create a new product
-        new_product = Product(
-            product_id=form.product_id.data,
-            name=form.name.data,
-            description=form.description.data,
-            category_id=form.category_id.data,
-            product_type_id=form.product_type_id.data if form.product_type_id.data > 0 else None,
-            image_url=form.image_url.data,
-            price=form.price.data,
-            specifications=form.specifications.data,
-            features=form.features.data
-        )
-        
-        Product.save(new_product)
-        flash('Product added successfully', 'success')
-        return redirect(url_for('admin_products'))
-    
-    return render_template('admin/product_form.html', form=form)
-
-# Admin edit product route
-@app.route('/admin/products/edit/<string:product_id>', methods=['GET', 'POST'])
-@login_required
-def admin_edit_product(product_id):
-    products = Product.filter_by(product_id=product_id)
-    if not products:
-        flash('Product not found', 'danger')
-        return redirect(url_for('admin_products'))
-        
-    product = products[0]
-    form = ProductForm(obj=product)
-    
-    # Populate the category and product type dropdown lists
-    categories = Category.query_all()
-    form.category_id.choices = [(c.id, c.name) for c in categories]
-    
-    product_types = ProductType.query_all()
-    form.product_type_id.choices = [(0, 'None')] + [(pt.id, pt.name) for pt in product_types]
-    
-    if form.validate_on_submit():
-        # Update the product
-        product.name = form.name.data
-        product.product_id = form.product_id.data
-        product.description = form.description.data
-        product.category_id = form.category_id.data
-        product.product_type_id = form.product_type_id.data if form.product_type_id.data > 0 else None
-        product.image_url = form.image_url.data
-        product.price = form.price.data
-        product.specifications = form.specifications.data
-        product.features = form.features.data
-        
-        Product.save(product)
-        flash('Product updated successfully', 'success')
-        return redirect(url_for('admin_products'))
-    
-    # Pre-fill the form
-    if product.specifications:
-        form.specifications.data = json.dumps(product.get_specifications(), indent=2)
-    if product.features:
-        form.features.data = json.dumps(product.get_features(), indent=2)
-    
-    return render_template('admin/product_form.html', form=form, product=product)
-
-# Admin delete product route
-@app.route('/admin/products/delete/<string:product_id>', methods=['POST'])
-@login_required
-def admin_delete_product(product_id):
-    products = Product.filter_by(product_id=product_id)
-    if not products:
-        flash('Product not found', 'danger')
-    else:
-        Product.delete(product_id)
-        flash('Product deleted successfully', 'success')
-    
-    return redirect(url_for('admin_products'))
-
-# Admin categories list route
-@app.route('/admin/categories')
-@login_required
-def admin_categories():
-    categories = Category.query_all()
-    return render_template('admin/categories.html', categories=categories)
-
-# Admin add category route
-@app.route('/admin/categories/add', methods=['POST'])
-@login_required
-def admin_add_category():
-    # Get form data
-    name = request.form.get('name')
-    slug = request.form.get('slug')
-    description = request.form.get('description')
-    image_url = request.form.get('image_url')
-    
-    if not name or not slug:
-        flash('Name and slug are required', 'danger')
-        return redirect(url_for('admin_categories'))
-    
-    # Create a new category
-    new_category = Category(
-        name=name,
-        slug=slug,
-        description=description,
-        image_url=image_url
-    )
-    
-    Category.save(new_category)
-    flash('Category added successfully', 'success')
-    return redirect(url_for('admin_categories'))
-
-# Admin edit category route
-@app.route('/admin/categories/edit/<int:category_id>', methods=['POST'])
-@login_required
-def admin_edit_category(category_id):
-    category = Category.get(category_id)
-    if not category:
-        flash('Category not found', 'danger')
-        return redirect(url_for('admin_categories'))
-    
-    # Get form data
-    name = request.form.get('name')
-    slug = request.form.get('slug')
-    description = request.form.get('description')
-    image_url = request.form.get('image_url')
-    
-    if not name or not slug:
-        flash('Name and slug are required', 'danger')
-        return redirect(url_for('admin_categories'))
-    
-    # Update the category
-    category.name = name
-    category.slug = slug
-    category.description = description
-    category.image_url = image_url
-    
-    Category.save(category)
-    flash('Category updated successfully', 'success')
-    return redirect(url_for('admin_categories'))
-
-# Admin delete category route
-@app.route('/admin/categories/delete/<int:category_id>', methods=['POST'])
-@login_required
-def admin_delete_category(category_id):
-    category = Category.get(category_id)
-    if not category:
-        flash('Category not found', 'danger')
-    else:
-        # Check if category has products
-        products = Product.filter_by(category_id=category_id)
-        if products:
-            flash(f'Cannot delete category: {len(products)} products are associated with it', 'danger')
-        else:
-            Category.delete(category_id)
-            flash('Category deleted successfully', 'success')
-    
-    return redirect(url_for('admin_categories'))
-
-# Admin product types list route
-@app.route('/admin/product-types')
-@login_required
-def admin_product_types():
-    product_types = ProductType.query_all()
-    categories = Category.query_all()
-    return render_template('admin/product_types.html', product_types=product_types, categories=categories)
-
-# Admin add product type route
-@app.route('/admin/product-types/add', methods=['POST'])
-@login_required
-def admin_add_product_type():
-    # Get form data
-    name = request.form.get('name')
-    slug = request.form.get('slug')
-    category_id = request.form.get('category_id')
-    description = request.form.get('description')
-    
-    if not name or not slug or not category_id:
-        flash('Name, slug, and category are required', 'danger')
-        return redirect(url_for('admin_product_types'))
-    
-    # Create a new product type
-    new_product_type = ProductType(
-        name=name,
-        slug=slug,
-        category_id=int(category_id),
-        description=description
-    )
-    
-    ProductType.save(new_product_type)
-    flash('Product type added successfully', 'success')
-    return redirect(url_for('admin_product_types'))
-
-# Admin edit product type route
-@app.route('/admin/product-types/edit/<int:product_type_id>', methods=['POST'])
-@login_required
-def admin_edit_product_type(product_type_id):
-    product_type = ProductType.get(product_type_id)
-    if not product_type:
-        flash('Product type not found', 'danger')
-        return redirect(url_for('admin_product_types'))
-    
-    # Get form data
-    name = request.form.get('name')
-    slug = request.form.get('slug')
-    category_id = request.form.get('category_id')
-    description = request.form.get('description')
-    
-    if not name or not slug or not category_id:
-        flash('Name, slug, and category are required', 'danger')
-        return redirect(url_for('admin_product_types'))
-    
-    # Update the product type
-    product_type.name = name
-    product_type.slug = slug
-    product_type.category_id = int(category_id)
-    product_type.description = description
-    
-    ProductType.save(product_type)
-    flash('Product type updated successfully', 'success')
-    return redirect(url_for('admin_product_types'))
-
-# Admin delete product type route
-@app.route('/admin/product-types/delete/<int:product_type_id>', methods=['POST'])
-@login_required
-def admin_delete_product_type(product_type_id):
-    product_type = ProductType.get(product_type_id)
-    if not product_type:
-        flash('Product type not found', 'danger')
-    else:
-        # Check if product type has products
-        products = Product.filter_by(product_type_id=product_type_id)
-        if products:
-            # Update products to remove the product type (set to NULL)
-            for product in products:
-                product.product_type_id = None
-                Product.save(product)
-        
-        ProductType.delete(product_type_id)
-        flash('Product type deleted successfully', 'success')
-    
-    return redirect(url_for('admin_product_types'))
-
-# Admin messages list route
-@app.route('/admin/messages')
-@login_required
-def admin_messages():
-    contact_messages = ContactMessage.query_all()
-    return render_template('admin/messages.html', contact_messages=contact_messages)
-
-# Admin view message route
-@app.route('/admin/messages/view/<int:message_id>')
-@login_required
-def admin_view_message(message_id):
-    message = ContactMessage.get(message_id)
-    if not message:
-        flash('Message not found', 'danger')
-        return redirect(url_for('admin_messages'))
-    
-    return render_template('admin/view_message.html', message=message)
-
-# Admin delete message route
-@app.route('/admin/messages/delete/<int:message_id>', methods=['POST'])
-@login_required
-def admin_delete_message(message_id):
-    message = ContactMessage.get(message_id)
-    if not message:
-        flash('Message not found', 'danger')
-    else:
-        ContactMessage.delete(message_id)
-        flash('Message deleted successfully', 'success')
-    
-    return redirect(url_for('admin_messages'))
-
-# API routes for admin functions
-@app.route('/api/products', methods=['GET'])
-def get_products():
-    products = Product.query_all()
-    return jsonify([product.to_dict() for product in products])
-
-@app.route('/api/products', methods=['POST'])
-def add_product():
-    # Add authentication here
-    data = request.json
-    
-    new_product = Product(
-        product_id=data['product_id'],
-        name=data['name'],
-        description=data['description'],
-        category_id=data['category_id'],
-        product_type_id=data.get('product_type_id'),
-        image_url=data.get('image_url', ''),
-        price=data.get('price'),
-        specifications=data.get('specifications', '{}'),
-        features=data.get('features', '[]')
-    )
-    
-    Product.save(new_product)
-    return jsonify(new_product.to_dict()), 201
-
-@app.route('/api/products/<string:product_id>', methods=['PUT'])
-def update_product(product_id):
-    # Add authentication here
-    products = Product.filter_by(product_id=product_id)
-    if not products:
-        return jsonify({"error": "Product not found"}), 404
-        
-    product = products[0]
-    data = request.json
-    
-    for key, value in data.items():
-        if hasattr(product, key):
-            setattr(product, key, value)
-    
-    Product.save(product)
-    return jsonify(product.to_dict())
-
-@app.route('/api/products/<string:product_id>', methods=['DELETE'])
-def delete_product(product_id):
-    # Add authentication here
-    products = Product.filter_by(product_id=product_id)
-    if not products:
-        return jsonify({"error": "Product not found"}), 404
-        
-    Product.delete(product_id)
-    return '', 204
 
+# Development server only; use serve.py for production
 if __name__ == '__main__':
+    app = create_app()
     init_db()  # Initialize the database connection
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,42 @@
+import asyncio
+
+from flask import current_app, g, render_template, request
+
+from api import product_list, product_list_params, product_list_response
+from db_executor import db_executor
+from models.product import PRODUCT_SORTS, Category
+from search_cache import search_cache
+from views import listing_params, next_page
+
+# Async variants of the read-only API and search. Model calls run on the
+# db_executor pool and independent queries are awaited together.
+# Requires Flask's async extra (asgiref).
+
+
+# Async product list API: the same parameters and responses as /api/products
+async def get_products_async():
+    error, params = product_list_params()
+    if error:
+        return error
+    products = await db_executor.run(product_list, **params)
+    return product_list_response(products, **params)
+
+
+# Async search route
+async def search_async():
+    query = request.args.get('search', '')
+    if not query:
+        g.categories = await db_executor.run(Category.query_all)
+        return render_template('search.html', query='', results=[])
+
+    listing = listing_params()
+    page_size = current_app.config['PRODUCTS_PAGE_SIZE']
+    # The results and the navigation categories do not depend on each other
+    results, g.categories = await asyncio.gather(
+        db_executor.run(search_cache.search, query, **listing, limit=page_size + 1),
+        db_executor.run(Category.query_all),
+    )
+    results, next_url = next_page(results, page_size, listing['sort'])
+    return render_template(
+        'search.html', query=query, results=results, listing=listing, sorts=PRODUCT_SORTS, next_url=next_url
+    )
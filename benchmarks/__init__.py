@@ -0,0 +1,8 @@
+"""Benchmark tooling for the storefront.
+
+    python -m benchmarks.catalog --products 100000 --db instance/bench.db
+    python -m benchmarks.runner --db instance/bench.db --out bench.json
+    python -m benchmarks.startup --db instance/bench.db
+    python -m benchmarks.async_compare --db instance/bench.db
+    python -m benchmarks.json_cache --db instance/bench.db
+"""
@@ -0,0 +1,126 @@
+"""Compare the sync routes with their async variants under slow clients.
+
+Serves the app from serve.py's pooled server in a background thread and
+drives each route pair with `--concurrency` clients that trickle their
+request out over `--client-delay` milliseconds, the way slow mobile
+clients do. Slow clients hold a server thread while their request is
+read, so this shows how much the async variants (which overlap their own
+queries on the DB executor) change throughput and tail latency when the
+server's threads are the scarce resource.
+
+    python -m benchmarks.async_compare --db instance/bench.db --threads 8 --concurrency 32
+"""
+import argparse
+import datetime
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.runner import positive_int, run_scenario  # noqa: E402
+
+# (scenario, sync path, async path)
+ROUTE_PAIRS = [
+    ('api_products', '/api/products', '/api/async/products'),
+    ('search', '/search?search=oak', '/async/search?search=oak'),
+    ('search_nomatch', '/search?search=nomatch', '/async/search?search=nomatch'),
+]
+
+
+class SlowClient:
+    """HTTP/1.0 client that sends its request in pieces with a pause between them"""
+
+    def __init__(self, host, port, delay):
+        self.host = host
+        self.port = port
+        self.delay = delay
+
+    def get(self, path):
+        pieces = [
+            f'GET {path} HTTP/1.0\r\n'.encode(),
+            f'Host: {self.host}:{self.port}\r\n'.encode(),
+            b'User-Agent: async-compare\r\n\r\n',
+        ]
+        with socket.create_connection((self.host, self.port)) as sock:
+            for piece in pieces:
+                sock.sendall(piece)
+                if self.delay:
+                    time.sleep(self.delay / len(pieces))
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        raw = b''.join(chunks)
+        head, _, body = raw.partition(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split()[1]) if lines and lines[0] else 599
+        timing = None
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            if name.lower() == 'server-timing':
+                timing = value.strip()
+        return status, len(body), timing
+
+
+def start_server(db_path, threads):
+    from app import create_app
+    from serve import PooledWSGIServer
+
+    app = create_app({
+        'DATABASE': db_path,
+        'METRICS_SERVER_TIMING': True,
+        'RATE_LIMIT_ENABLED': False,  # Every request comes from one address
+        'SEARCH_CACHE_SIZE': 0,  # Measure search itself, not cache hits
+    })
+    server = PooledWSGIServer('127.0.0.1', 0, app, threads)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark sync routes against their async variants')
+    parser.add_argument('--db', default='instance/bench.db', help='catalog database (see benchmarks.catalog)')
+    parser.add_argument('--threads', type=int, default=8, help='server request threads')
+    parser.add_argument('--concurrency', type=positive_int, default=32, help='concurrent slow clients')
+    parser.add_argument('--client-delay', type=float, default=50.0,
+                        help='milliseconds each client takes to send its request')
+    parser.add_argument('--requests', type=positive_int, default=200, help='requests per route')
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    server = start_server(args.db, args.threads)
+    client = SlowClient('127.0.0.1', server.server_port, args.client_delay / 1000.0)
+    results = {
+        'started_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'threads': args.threads,
+        'concurrency': args.concurrency,
+        'client_delay_ms': args.client_delay,
+        'scenarios': {},
+    }
+    try:
+        for name, sync_path, async_path in ROUTE_PAIRS:
+            for variant, path in (('sync', sync_path), ('async', async_path)):
+                client.get(path)  # warm up
+                result = run_scenario(client, [path], args.requests, args.concurrency)
+                results['scenarios'][f'{name}_{variant}'] = result
+                latency = result['latency_ms']
+                print(f"{name + ' ' + variant:22s} {result['throughput_rps']:8.1f} req/s  "
+                      f"p50 {latency['p50']:8.2f} ms  p99 {latency['p99']:8.2f} ms  "
+                      f"max {latency['max']:8.2f} ms  errors {result['errors']}")
+    finally:
+        server.shutdown()
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Synthetic catalog generator.
+
+Builds a database with the application schema (models/schema.py, the same
+tables init_db.py creates) and fills it with N categories, product types,
+products and contact messages using batched executemany inserts.
+Generation is seeded, so the same arguments always produce the same data.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.schema import create_schema
+
+COLOURS = ['Oak', 'Walnut', 'Ash', 'Grey', 'Taupe', 'Honey', 'Smoked', 'White', 'Charcoal', 'Natural']
+FINISHES = ['Rustic', 'Brushed', 'Limed', 'Matt', 'Satin', 'Distressed', 'Classic', 'Nordic']
+PATTERNS = ['Plank', 'Herringbone', 'Chevron', 'Tile', 'Wide Plank', 'Parquet']
+THICKNESSES = ['4mm', '5mm', '6mm', '8mm', '12mm', '14mm']
+WEAR_LAYERS = ['0.3mm', '0.5mm', '0.55mm', '0.7mm']
+INSTALLATIONS = ['Click-Lock System', 'Glue Down', 'Loose Lay', 'Tongue and Groove']
+FEATURES = [
+    'Easy-to-install click-lock system',
+    'Scratch-resistant and waterproof surface',
+    'Realistic wood grain texture',
+    'Perfect for both residential and commercial spaces',
+    'Suitable for underfloor heating',
+    'Pet-friendly and easy to clean',
+    'Durable wear layer for high-traffic areas',
+    'Made from recycled materials',
+]
+WORDS = ('warm timeless contemporary elegant durable natural stylish classic '
+         'modern rich subtle textured premium versatile practical').split()
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def generate(db_path, categories=20, types_per_category=5, products=100000,
+             messages=10000, seed=42, batch_size=5000):
+    """Create (or replace) `db_path` and fill it with a synthetic catalog"""
+    rng = random.Random(seed)
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    conn = sqlite3.connect(db_path)
+    # Bulk load: durability does not matter for a throwaway benchmark file
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    create_schema(conn)
+    conn.commit()
+
+    category_rows = [
+        (f'Category {i}', f'category-{i}', f'Synthetic category {i}', f'/static/images/categories/{i}.jpg')
+        for i in range(1, categories + 1)
+    ]
+    conn.executemany(
+        'INSERT INTO categories (name, slug, description, image_url) VALUES (?, ?, ?, ?)',
+        category_rows
+    )
+    category_ids = [row[0] for row in conn.execute('SELECT id FROM categories ORDER BY id')]
+
+    type_rows = []
+    for category_id in category_ids:
+        for j in range(types_per_category):
+            pattern = PATTERNS[j % len(PATTERNS)]
+            type_rows.append((pattern, f'{pattern.lower().replace(" ", "-")}-{j}', f'{pattern} flooring', category_id))
+    conn.executemany(
+        'INSERT INTO product_types (name, slug, description, category_id) VALUES (?, ?, ?, ?)',
+        type_rows
+    )
+    types_by_category = {}
+    for type_id, category_id in conn.execute('SELECT id, category_id FROM product_types'):
+        types_by_category.setdefault(category_id, []).append(type_id)
+
+    start = datetime.datetime(2023, 1, 1)
+    product_rows = []
+    for i in range(products):
+        category_id = rng.choice(category_ids)
+        type_ids = types_by_category.get(category_id) or [None]
+        colour = rng.choice(COLOURS)
+        name = f'{rng.choice(FINISHES)} {colour} {rng.choice(PATTERNS)}'
+        specifications = {
+            'Dimensions': f'{rng.choice([1200, 1220, 1500, 1830])}mm x {rng.choice([120, 180, 190, 220])}mm',
+            'Thickness': rng.choice(THICKNESSES),
+            'Wear Layer': rng.choice(WEAR_LAYERS),
+            'Colour': colour,
+            'Installation': rng.choice(INSTALLATIONS),
+            'Waterproof': rng.choice(['Yes', 'No']),
+        }
+        created = start + datetime.timedelta(minutes=rng.randrange(0, 60 * 24 * 600))
+        updated = created + datetime.timedelta(minutes=rng.randrange(0, 60 * 24 * 30))
+        product_rows.append((
+            f'SYN{i:06d}',
+            name,
+            ' '.join(rng.choice(WORDS) for _ in range(30)).capitalize() + '.',
+            category_id,
+            rng.choice(type_ids),
+            f'/static/images/SYN{i % 100:03d}.jpg',
+            json.dumps([f'/static/images/SYN{i % 100:03d}-{k}.jpg' for k in range(rng.randrange(0, 4))]),
+            None if rng.random() < 0.1 else round(rng.uniform(12, 90), 2),
+            json.dumps(specifications),
+            json.dumps(rng.sample(FEATURES, 4)),
+            created.isoformat(),
+            updated.isoformat(),
+        ))
+    for chunk in _chunks(product_rows, batch_size):
+        conn.executemany('''
+            INSERT INTO products (
+                product_id, name, description, category_id, product_type_id,
+                image_url, image_urls, price, specifications, features,
+                created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', chunk)
+        conn.commit()
+
+    message_rows = []
+    for i in range(messages):
+        sent = start + datetime.timedelta(minutes=rng.randrange(0, 60 * 24 * 600))
+        message_rows.append((
+            f'Customer {i}',
+            f'customer{i}@example.com',
+            f'07{rng.randrange(100000000, 999999999)}',
+            f'Question about {rng.choice(COLOURS).lower()} {rng.choice(PATTERNS).lower()}',
+            ' '.join(rng.choice(WORDS) for _ in range(40)),
+            sent.strftime('%Y-%m-%d %H:%M:%S'),
+        ))
+    for chunk in _chunks(message_rows, batch_size):
+        conn.executemany('''
+            INSERT INTO contacts (name, email, phone, subject, message, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', chunk)
+        conn.commit()
+
+    conn.execute('''
+        INSERT INTO admin_users (username, password_hash, name, email, is_active, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', ('testadmin', hashlib.sha256('testpass'.encode()).hexdigest(), 'Test Admin',
+          'testadmin@example.com', 1, datetime.datetime.now().isoformat()))
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic catalog database')
+    parser.add_argument('--db', default='instance/bench.db', help='database file to (re)create')
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--types-per-category', type=int, default=5)
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    generate(args.db, categories=args.categories, types_per_category=args.types_per_category,
+             products=args.products, messages=args.messages, seed=args.seed)
+    print(f'Wrote {args.products} products, {args.categories} categories and '
+          f'{args.messages} messages to {args.db} in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
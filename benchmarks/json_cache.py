@@ -0,0 +1,77 @@
+"""Measure the product JSON cache on the list endpoints.
+
+Runs the /api/products scenarios in-process twice, once with the cache
+disabled (every product encoded per request, as before the cache) and
+once with it warmed, and prints the throughput of each. The bodies are
+compared first, so the cache is known to return exactly what the
+uncached path did.
+
+    python -m benchmarks.json_cache --db instance/bench.db --requests 50
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.runner import InProcessClient, positive_int, run_scenario  # noqa: E402
+from product_json import product_json  # noqa: E402
+
+SCENARIOS = {
+    'api_products': ['/api/products'],
+    'api_products_page': ['/api/products?limit=100', '/api/products?limit=100&sort=price'],
+    'api_products_price': ['/api/products?price_max=40', '/api/products?price_min=40&sort=updated'],
+    'api_products_fields': ['/api/products?fields=product_id,name,price,image_url'],
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark /api/products with and without the product JSON cache')
+    parser.add_argument('--db', default='instance/bench.db', help='catalog database (see benchmarks.catalog)')
+    parser.add_argument('--requests', type=positive_int, default=50, help='requests per scenario and variant')
+    parser.add_argument('--concurrency', type=positive_int, default=1)
+    parser.add_argument('--cache-size', type=int, default=200000, help='cache entries for the cached run')
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    client = InProcessClient(args.db)
+    test_client = client.app.test_client()
+
+    def use_cache(size):
+        # The cache is a per-process singleton, so switch it rather than the app
+        product_json.max_entries = size
+        product_json.clear()
+
+    results = {
+        'started_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'scenarios': {},
+    }
+    for name, paths in SCENARIOS.items():
+        rates = {}
+        uncached_bodies = {}
+        for variant, size in (('uncached', 0), ('cached', args.cache_size)):
+            use_cache(size)
+            # Same bytes either way; this also warms the cache
+            for path in paths:
+                body = test_client.get(path).get_data()
+                if uncached_bodies.setdefault(path, body) != body:
+                    sys.exit(f'{path}: cached response differs from the uncached one')
+            result = run_scenario(client, paths, args.requests, args.concurrency)
+            results['scenarios'][f'{name}_{variant}'] = result
+            rates[variant] = result['throughput_rps']
+            latency = result['latency_ms']
+            print(f"{name + ' ' + variant:28s} {result['throughput_rps']:8.1f} req/s  "
+                  f"p50 {latency['p50']:8.2f} ms  p99 {latency['p99']:8.2f} ms  errors {result['errors']}")
+        print(f"{name:28s} {rates['cached'] / rates['uncached']:8.2f}x with the cache")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""Scenario runner for the storefront.
+
+Drives the Flask app either in-process through the test client (pointing
+the models at `--db`) or over HTTP against a running server (`--url`),
+with `--concurrency` client threads. For every scenario it reports
+latency percentiles, throughput and SQL statements per request, and the
+whole run is saved as JSON so runs can be compared with `--compare`.
+
+SQL counts come from the Server-Timing header added by metrics.py; when
+running over HTTP, start the server with METRICS_SERVER_TIMING enabled.
+"""
+import argparse
+import concurrent.futures
+import datetime
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+QUERY_COUNT = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1, not {number}')
+    return number
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def build_scenarios(db_path, seed=1, samples=50):
+    """Request paths for each scenario, sampled from the catalog in `db_path`"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    slugs = [row[0] for row in conn.execute('SELECT slug FROM categories')]
+    type_pairs = [tuple(row) for row in conn.execute('''
+        SELECT c.slug, t.slug FROM product_types t JOIN categories c ON c.id = t.category_id
+    ''')]
+    # In a fixed order, so the seeded sample is the same on every run
+    product_ids = [row[0] for row in conn.execute('SELECT product_id FROM products ORDER BY id')]
+    conn.close()
+    product_ids = rng.sample(product_ids, min(samples, len(product_ids)))
+    terms = ['oak', 'herringbone', 'grey', 'walnut', 'SYN0001', 'brushed', 'nomatch']
+
+    def pick(values, count=samples):
+        return [rng.choice(values) for _ in range(count)] if values else []
+
+    return {
+        'home': ['/'],
+        'category': [f'/category/{slug}' for slug in pick(slugs)],
+        'category_type': [f'/category/{c}?type={t}' for c, t in pick(type_pairs)],
+        'product': [f'/product/{product_id}' for product_id in product_ids],
+        'search': [f'/search?search={term}' for term in pick(terms)],
+        'api_products': ['/api/products'],
+    }
+
+
+class InProcessClient:
+    def __init__(self, db_path, config=None):
+        from app import create_app
+
+        self.app = create_app({
+            'DATABASE': db_path,
+            'METRICS_SERVER_TIMING': True,
+            'RATE_LIMIT_ENABLED': False,  # Every request comes from one address
+            'SEARCH_CACHE_SIZE': 0,  # Measure search itself, not cache hits
+            **(config or {}),
+        })
+        self._local = threading.local()
+
+    def get(self, path):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.get(path)
+        body = response.get_data()
+        return response.status_code, len(body), response.headers.get('Server-Timing')
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def get(self, path):
+        try:
+            with urllib.request.urlopen(self.base_url + path) as response:
+                body = response.read()
+                return response.status, len(body), response.headers.get('Server-Timing')
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, 0, e.headers.get('Server-Timing')
+
+
+def run_scenario(client, paths, requests, concurrency):
+    latencies = []
+    queries = []
+    errors = 0
+    sent_bytes = 0
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        nonlocal errors, sent_bytes
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            path = paths[i % len(paths)]
+            started = time.perf_counter()
+            status, size, timing = client.get(path)
+            elapsed = time.perf_counter() - started
+            match = QUERY_COUNT.search(timing or '')
+            with lock:
+                latencies.append(elapsed)
+                sent_bytes += size
+                if status >= 400:
+                    errors += 1
+                if match:
+                    queries.append(int(match.group(1)))
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'concurrency': concurrency,
+        'wall_seconds': wall,
+        'throughput_rps': len(latencies) / wall if wall else None,
+        'latency_ms': {
+            'p50': percentile(latencies, 0.50) * 1000,
+            'p90': percentile(latencies, 0.90) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'max': latencies[-1] * 1000,
+            'mean': sum(latencies) / len(latencies) * 1000,
+        },
+        'queries_per_request': sum(queries) / len(queries) if queries else None,
+        'bytes_per_response': sent_bytes / len(latencies) if latencies else None,
+    }
+
+
+def compare(previous_path, current):
+    with open(previous_path, encoding='utf-8') as f:
+        previous = json.load(f)
+    print(f"\nCompared with {previous_path} ({previous.get('started_at')}):")
+    for name, result in current['scenarios'].items():
+        before = previous.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        p50 = result['latency_ms']['p50'] / before['latency_ms']['p50'] - 1
+        p99 = result['latency_ms']['p99'] / before['latency_ms']['p99'] - 1
+        rps = result['throughput_rps'] / before['throughput_rps'] - 1
+        print(f'  {name:16s} p50 {p50:+7.1%}  p99 {p99:+7.1%}  throughput {rps:+7.1%}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run storefront benchmark scenarios')
+    parser.add_argument('--db', default='instance/bench.db', help='catalog database (see benchmarks.catalog)')
+    parser.add_argument('--url', help='benchmark a running server instead of the in-process test client')
+    parser.add_argument('--scenario', action='append', help='scenario to run (default: all)')
+    parser.add_argument('--requests', type=positive_int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=positive_int, default=4)
+    parser.add_argument('--seed', type=int, default=1, help='seed for the sampled paths, so runs compare')
+    parser.add_argument('--warmup', type=int, default=5, help='untimed requests per scenario')
+    parser.add_argument('--out', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args(argv)
+
+    scenarios = build_scenarios(args.db, seed=args.seed)
+    if args.scenario:
+        scenarios = {name: scenarios[name] for name in args.scenario}
+
+    client = HttpClient(args.url) if args.url else InProcessClient(args.db)
+    results = {
+        'started_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'mode': 'http' if args.url else 'in-process',
+        'target': args.url or args.db,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'seed': args.seed,
+        'scenarios': {},
+    }
+    for name, paths in scenarios.items():
+        if not paths:
+            continue
+        for path in paths[:args.warmup]:
+            client.get(path)
+        result = run_scenario(client, paths, args.requests, args.concurrency)
+        results['scenarios'][name] = result
+        latency = result['latency_ms']
+        queries = result['queries_per_request']
+        print(f"{name:16s} {result['throughput_rps']:8.1f} req/s  p50 {latency['p50']:8.2f} ms  "
+              f"p90 {latency['p90']:8.2f} ms  p99 {latency['p99']:8.2f} ms  "
+              f"queries {queries if queries is None else round(queries, 1)}  errors {result['errors']}")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f'Results written to {args.out}')
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Startup benchmark: import time, app creation and first-request latency.
+
+Each measurement runs in a fresh interpreter so module caches are cold.
+The first round runs with an empty Jinja bytecode cache, the following
+rounds reuse the cache the first one filled, which is the situation of a
+worker started after `flask compile-templates`.
+
+    python -m benchmarks.startup --db instance/bench.db --rounds 5 --out startup.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Runs in the child interpreter; prints one JSON line of timings in ms
+PROBE = r'''
+import json, sys, time
+started = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+app = app_module.create_app({'DATABASE': sys.argv[1], 'JINJA_CACHE_DIR': sys.argv[2] or None})
+created = time.perf_counter()
+with app.test_client() as client:
+    status = client.get(sys.argv[3]).status_code
+first = time.perf_counter()
+with app.test_client() as client:
+    client.get(sys.argv[3])
+second = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (first - created) * 1000,
+    'second_request_ms': (second - first) * 1000,
+    'status': status,
+    'modules': len(sys.modules),
+}))
+'''
+
+
+def probe(db_path, cache_dir, path):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, db_path, cache_dir or '', path],
+        cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    return {
+        key: round(statistics.median(run[key] for run in runs), 2)
+        for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'second_request_ms')
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure app startup and first-request time')
+    parser.add_argument('--db', default='instance/floorofhearts.db')
+    parser.add_argument('--path', default='/', help='page requested after startup')
+    parser.add_argument('--rounds', type=int, default=5, help='warm-cache runs')
+    parser.add_argument('--out', help='write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    db_path = os.path.abspath(args.db)
+    cache_dir = tempfile.mkdtemp(prefix='jinja_cache_')
+    try:
+        results = {
+            'path': args.path,
+            'no_cache': summarize([probe(db_path, None, args.path) for _ in range(args.rounds)]),
+            'cold_cache': summarize([probe(db_path, cache_dir, args.path)]),
+            'warm_cache': summarize([probe(db_path, cache_dir, args.path) for _ in range(args.rounds)]),
+        }
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    for name in ('no_cache', 'cold_cache', 'warm_cache'):
+        timings = results[name]
+        print(f"{name:12s} import {timings['import_ms']:7.1f} ms  create_app {timings['create_app_ms']:7.1f} ms  "
+              f"first request {timings['first_request_ms']:7.1f} ms  second {timings['second_request_ms']:6.1f} ms")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
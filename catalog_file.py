@@ -0,0 +1,324 @@
+import json
+import marshal
+import mmap
+import os
+import struct
+import threading
+import time
+
+from models import db
+from models.db import get_read_connection
+from models.product import Category, Product, ProductType
+
+# File layout (all integers little-endian):
+#
+#   header        MAGIC, format, version, then the section table below
+#   records       one marshal'd tuple per product, specs and features pre-parsed
+#   offsets       (offset, length) of every record, in product id order
+#   keys          product_id bytes of every record, sorted
+#   key index     (key offset, key length, record number) per sorted key
+#   groups        record numbers of each category and (category, type) group
+#   meta          marshal'd categories, product types and group table
+#
+# marshal is tied to the interpreter version, which is fine for a file the
+# workers read and the same deployment writes.
+MAGIC = b'FOHCAT\x00\x01'
+FORMAT = 1
+HEADER = struct.Struct('<8sIQ9I')
+OFFSET = struct.Struct('<II')
+KEY_ENTRY = struct.Struct('<IHI')
+MEMBER = struct.Struct('<I')
+
+# Order of the product fields stored in each record
+RECORD_FIELDS = (
+    'id', 'product_id', 'name', 'description', 'category_id', 'product_type_id',
+    'image_url', 'image_urls', 'price', 'specifications', 'features',
+    'created_at', 'updated_at',
+)
+PARSED_FIELDS = {'image_urls': [], 'specifications': {}, 'features': []}
+
+
+class CatalogProduct(Product):
+    """Product read from the catalog file, with its JSON fields already parsed"""
+
+    @classmethod
+    def from_record(cls, record):
+        product = cls.__new__(cls)
+        product.__dict__.update(zip(RECORD_FIELDS, record))
+        return product
+
+    def get_specifications(self):
+        return self.__dict__['specifications']
+
+    def get_features(self):
+        return self.__dict__['features']
+
+    def get_image_urls(self):
+        return self.__dict__['image_urls']
+
+
+def _parse(value, default):
+    if not value:
+        return default
+    try:
+        return json.loads(value)
+    except ValueError:
+        return default
+
+
+def export(path, version=None):
+    """Write the public catalog to `path` and atomically replace the old file"""
+    conn = get_read_connection()
+    try:
+        categories = [dict(row) for row in conn.execute('SELECT * FROM categories ORDER BY id')]
+        product_types = [dict(row) for row in conn.execute('SELECT * FROM product_types ORDER BY id')]
+        rows = conn.execute('SELECT * FROM products ORDER BY id').fetchall()
+    finally:
+        conn.close()
+
+    records = []
+    groups = {}
+    keys = []
+    for number, row in enumerate(rows):
+        values = []
+        for field in RECORD_FIELDS:
+            value = row[field]
+            if field in PARSED_FIELDS:
+                value = _parse(value, PARSED_FIELDS[field])
+            values.append(value)
+        records.append(marshal.dumps(tuple(values)))
+        keys.append((str(row['product_id']).encode('utf-8'), number))
+        groups.setdefault((row['category_id'], None), []).append(number)
+        groups.setdefault((row['category_id'], row['product_type_id']), []).append(number)
+    keys.sort()
+
+    body = bytearray()
+    records_offset = HEADER.size
+    offsets = bytearray()
+    for record in records:
+        offsets += OFFSET.pack(records_offset + len(body), len(record))
+        body += record
+
+    offsets_offset = records_offset + len(body)
+    body += offsets
+
+    keys_offset = records_offset + len(body)
+    key_index = bytearray()
+    for key, number in keys:
+        key_index += KEY_ENTRY.pack(records_offset + len(body), len(key), number)
+        body += key
+
+    key_index_offset = records_offset + len(body)
+    body += key_index
+
+    groups_offset = records_offset + len(body)
+    group_table = {}
+    for group, members in groups.items():
+        group_table[group] = (len(body) + records_offset, len(members))
+        for number in members:
+            body += MEMBER.pack(number)
+
+    meta_offset = records_offset + len(body)
+    meta = marshal.dumps({
+        'categories': categories,
+        'product_types': product_types,
+        'groups': group_table,
+        'exported_at': time.time(),
+    })
+    body += meta
+
+    version = version if version is not None else time.time_ns()
+    header = HEADER.pack(
+        MAGIC, FORMAT, version, len(records), offsets_offset, keys_offset,
+        key_index_offset, groups_offset, meta_offset, len(meta), 0, 0
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return {'path': path, 'version': version, 'products': len(records), 'bytes': len(header) + len(body)}
+
+
+class CatalogReader:
+    """Read-only view of one catalog file, mapped into memory.
+
+    The mapping is shared between every worker that opens the same file,
+    and records are decoded straight from it on lookup.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, file_format, self.version, self.count, self._offsets, self._keys,
+         self._key_index, self._groups, meta_offset, meta_length, _, _) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or file_format != FORMAT:
+            self.mm.close()
+            raise ValueError(f'{path} is not a catalog file this version can read')
+        self.view = memoryview(self.mm)
+        meta = marshal.loads(self.view[meta_offset:meta_offset + meta_length])
+        self.exported_at = meta['exported_at']
+        self.group_table = meta['groups']
+        self.categories = [Category(**row) for row in meta['categories']]
+        self.product_types = [ProductType(**row) for row in meta['product_types']]
+        self.categories_by_id = {category.id: category for category in self.categories}
+        self.categories_by_slug = {category.slug: category for category in self.categories}
+
+    def close(self):
+        self.view.release()
+        self.mm.close()
+
+    def record(self, number):
+        offset, length = OFFSET.unpack_from(self.mm, self._offsets + number * OFFSET.size)
+        return CatalogProduct.from_record(marshal.loads(self.view[offset:offset + length]))
+
+    def _key(self, position):
+        offset, length, number = KEY_ENTRY.unpack_from(self.mm, self._key_index + position * KEY_ENTRY.size)
+        return self.mm[offset:offset + length], number
+
+    def product(self, product_id):
+        """Binary search of the sorted product_id index"""
+        key = str(product_id).encode('utf-8')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            candidate, number = self._key(middle)
+            if candidate < key:
+                low = middle + 1
+            elif candidate > key:
+                high = middle
+            else:
+                return self.record(number)
+        return None
+
+    def products(self, category_id, product_type_id=None):
+        group = self.group_table.get((category_id, product_type_id))
+        if group is None:
+            return []
+        offset, count = group
+        members = MEMBER.iter_unpack(self.view[offset:offset + count * MEMBER.size])
+        return [self.record(number) for (number,) in members]
+
+    def facets(self, category_id, product_type_id=None, attributes=None, names=(), price_min=None, price_max=None):
+        """Matching products and facet counts in one pass over the category.
+
+        Same results as Product.filter_by_facets() and Product.facet_counts();
+        the products are in id order, for Product.sort_page().
+        """
+        attributes = attributes or {}
+        products = []
+        types = {}
+        values = {name: {} for name in names}
+        for product in self.products(category_id):
+            if price_min is not None and (product.price is None or product.price < price_min):
+                continue
+            if price_max is not None and (product.price is None or product.price > price_max):
+                continue
+            product_attributes = product.get_attributes()
+            mismatched = [name for name, value in attributes.items() if product_attributes.get(name) != value]
+            if len(mismatched) > 1:
+                continue
+            if not mismatched:
+                types[product.product_type_id] = types.get(product.product_type_id, 0) + 1
+            if product_type_id and product.product_type_id != product_type_id:
+                continue
+            if not mismatched:
+                products.append(product)
+            # A facet is counted without its own filter: a product failing only
+            # that filter still counts towards the facet's other values
+            for name in (mismatched or names):
+                if name in names and name in product_attributes:
+                    value = product_attributes[name]
+                    values[name][value] = values[name].get(value, 0) + 1
+        counts = {
+            'types': types,
+            'attributes': {name: sorted(value_counts.items()) for name, value_counts in values.items()},
+        }
+        return products, counts
+
+    def category(self, id):
+        return self.categories_by_id.get(id)
+
+    def category_by_slug(self, slug):
+        return self.categories_by_slug.get(slug)
+
+    def types_for(self, category_id):
+        return [product_type for product_type in self.product_types if product_type.category_id == category_id]
+
+
+class CatalogFile:
+    """Keeps each worker's CatalogReader current.
+
+    Admin pages and writes (db.live_reads) always read SQLite instead.
+
+    `current()` stats the file at most once every CATALOG_CHECK_INTERVAL
+    seconds; the exporter replaces the file atomically, so a new inode
+    means a new version and the old mapping is released once no request
+    is using it.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.path = 'instance/catalog.bin'
+        self.check_interval = 1.0
+        self.reader = None
+        self.reloads = 0
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CATALOG_FILE_ENABLED', False)
+        app.config.setdefault('CATALOG_FILE', 'instance/catalog.bin')
+        app.config.setdefault('CATALOG_CHECK_INTERVAL', 1.0)
+        self.enabled = app.config['CATALOG_FILE_ENABLED']
+        self.path = app.config['CATALOG_FILE']
+        self.check_interval = app.config['CATALOG_CHECK_INTERVAL']
+        app.extensions['catalog_file'] = self
+
+    def export(self):
+        return export(self.path)
+
+    def current(self):
+        """The reader for the newest catalog file, or None when disabled or missing"""
+        if not self.enabled or db.live_reads.get():
+            return None
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return self.reader
+        with self._lock:
+            self._checked = now
+            try:
+                inode = os.stat(self.path).st_ino
+            except OSError:
+                self.reader = None
+                return None
+            if self.reader is None or self.reader.inode != inode:
+                try:
+                    self.reader = CatalogReader(self.path)
+                    self.reloads += 1
+                except (OSError, ValueError):
+                    self.reader = None
+            return self.reader
+
+    def stats(self):
+        reader = self.reader
+        if reader is None:
+            return {'loaded': False, 'reloads': self.reloads}
+        return {
+            'loaded': True,
+            'version': reader.version,
+            'products': reader.count,
+            'bytes': len(reader.mm),
+            'reloads': self.reloads,
+        }
+
+
+catalog_file = CatalogFile()
@@ -0,0 +1,146 @@
+import os
+import sqlite3
+import threading
+
+from models import db
+
+# 'catalog' moves on every catalog change; 'all' is stamped when a snapshot
+# is published and means every scope may have changed
+CATALOG = 'catalog'
+ALL = 'all'
+
+
+def category_scope(category_id):
+    return f'category:{category_id}'
+
+
+def product_scope(product_id):
+    return f'product:{product_id}'
+
+
+class CatalogGeneration:
+    """Per-process view of the catalog generation counters.
+
+    Triggers (see models/schema.py) bump the 'catalog' generation on every
+    write to products, categories or product types and stamp the scopes the
+    write touched ('category:<id>', 'product:<product_id>') with the new
+    value. Before each request `check()` asks SQLite for PRAGMA data_version
+    on a long-lived connection, which only changes after another connection
+    has committed; only then is the 'catalog' row read, and only if that
+    moved are the changed scopes fetched. In-process caches either key
+    their entries on `current(scope)` or `subscribe()` to the changed scopes.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.generation = None
+        self.data_version = None
+        self.checks = 0
+        self.changes = 0
+        self._scopes = {}
+        self._listeners = []
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CATALOG_GENERATION_CHECK', True)
+        self.enabled = app.config['CATALOG_GENERATION_CHECK']
+        self._conn = None  # The app may point at a different database
+        app.extensions['catalog_generation'] = self
+        if self.enabled:
+            app.before_request(self._before_request)
+
+    def subscribe(self, callback):
+        """Call `callback(changed_scopes)` whenever a check finds changes"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def _connection(self):
+        # A plain connection, kept open so data_version can be compared
+        # between checks; recreated after a fork
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(db.DATABASE_PATH, check_same_thread=False)
+            self._pid = os.getpid()
+            self.data_version = None
+        return self._conn
+
+    def _before_request(self):
+        self.check()
+
+    def check(self):
+        """Pick up catalog changes committed by any process; returns the changed scopes"""
+        with self._lock:
+            self.checks += 1
+            try:
+                conn = self._connection()
+                data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+                if data_version == self.data_version:
+                    return set()
+                self.data_version = data_version
+                row = conn.execute(
+                    'SELECT generation FROM catalog_generations WHERE scope = ?', (CATALOG,)
+                ).fetchone()
+                generation = row[0] if row else 0
+                if generation == self.generation:
+                    return set()
+                changed = {CATALOG}
+                if self.generation is not None:
+                    changed.update(scope for (scope,) in conn.execute(
+                        'SELECT scope FROM catalog_generations WHERE generation > ?', (self.generation,)
+                    ))
+                    for scope in changed:
+                        self._scopes[scope] = generation
+                self.generation = generation
+                self.changes += 1
+            except sqlite3.Error:
+                # Not migrated yet: nothing can have been cached either
+                return set()
+        for callback in list(self._listeners):
+            callback(changed)
+        return changed
+
+    def current(self, scope=CATALOG):
+        """A value that changes whenever `scope` (or the whole catalog, on publish) changes.
+
+        Scopes that have not changed since this process started report 0.
+        Returns None when checking is disabled, so callers can skip caching.
+        """
+        if not self.enabled:
+            return None
+        base = self._scopes.get(ALL, 0)
+        if scope == CATALOG:
+            return self.generation
+        return max(self._scopes.get(scope, 0), base)
+
+    def stored(self, scope=CATALOG):
+        """The generation the database records for `scope` (or 'all', if newer).
+
+        Unlike current() this is the same in every process, so it can stamp
+        files that several workers share. Costs one indexed query.
+        """
+        with self._lock:
+            try:
+                row = self._connection().execute(
+                    'SELECT MAX(generation) FROM catalog_generations WHERE scope IN (?, ?)', (scope, ALL)
+                ).fetchone()
+            except sqlite3.Error:
+                return 0
+        return row[0] or 0
+
+    @staticmethod
+    def affects(changed, scope):
+        """Whether a set of changed scopes invalidates `scope`"""
+        return scope in changed or ALL in changed
+
+    def stats(self):
+        return {
+            'generation': self.generation,
+            'checks': self.checks,
+            'changes': self.changes,
+        }
+
+
+catalog_generation = CatalogGeneration()
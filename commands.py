@@ -0,0 +1,110 @@
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from catalog_file import catalog_file
+from models import db
+from models.product import ContactMessage
+from models.schema import migrate
+from slow_queries import slow_query_log
+
+
+# Retention job: run from cron with `flask archive-messages`
+@click.command('archive-messages')
+@with_appcontext
+def archive_messages_command():
+    """Move contact messages older than MESSAGE_RETENTION_DAYS into the archive"""
+    migrate()
+    moved = ContactMessage.archive_older_than(
+        current_app.config['MESSAGE_RETENTION_DAYS'],
+        batch_size=current_app.config['ARCHIVE_BATCH_SIZE']
+    )
+    print(f'Archived {moved} messages')
+
+
+# Report the worst entries in the slow query log: `flask slow-queries`
+@click.command('slow-queries')
+@with_appcontext
+def slow_queries_command():
+    """Print logged slow statements grouped by SQL, worst total time first"""
+    for query in slow_query_log.aggregate():
+        flag = ' [FULL SCAN]' if query['full_scan'] else ''
+        print(f"{query['total_ms']:10.1f} ms total  {query['count']:5d}x  "
+              f"avg {query['avg_ms']:.1f} ms  max {query['max_ms']:.1f} ms{flag}")
+        print(f"    {query['sql']}")
+        for step in query['plan']:
+            print(f'      {step}')
+
+
+# Fill the Jinja bytecode cache ahead of time: `flask compile-templates`
+@click.command('compile-templates')
+@with_appcontext
+def compile_templates_command():
+    """Compile every template into JINJA_CACHE_DIR"""
+    from app import precompile_templates
+
+    started = time.perf_counter()
+    count = precompile_templates(current_app)
+    print(f'Compiled {count} templates in {time.perf_counter() - started:.2f}s')
+
+
+# Publish the storefront snapshot after bulk edits: `flask publish`
+@click.command('publish')
+@with_appcontext
+def publish_command():
+    """Copy the live database to DB_SNAPSHOT_PATH (and CATALOG_FILE) and swap it in"""
+    if db.READ_MODE == 'snapshot':
+        result = db.publish_snapshot()
+        print(f"Published {result['path']} in {result['seconds']:.2f}s")
+    if catalog_file.enabled:
+        export_catalog_command.callback()
+
+
+# Rebuild the memory-mapped catalog file: `flask export-catalog`
+@click.command('export-catalog')
+@with_appcontext
+def export_catalog_command():
+    """Write the public catalog to CATALOG_FILE"""
+    started = time.perf_counter()
+    result = catalog_file.export()
+    print(f"Exported {result['products']} products ({result['bytes']} bytes) to {result['path']} "
+          f"in {time.perf_counter() - started:.2f}s")
+
+
+# Render the storefront to static HTML for nginx: `flask export-static`
+@click.command('export-static')
+@click.option('--full', is_flag=True, help='Render every page, not just the ones whose products changed')
+@click.option('--processes', type=int, default=None, help='Worker processes (default: one per CPU)')
+@with_appcontext
+def export_static_command(full, processes):
+    """Render the public pages into STATIC_EXPORT_DIR"""
+    from static_export import export_site
+
+    migrate()
+    result = export_site(current_app._get_current_object(), current_app.config['STATIC_EXPORT_DIR'],
+                         processes=processes, full=full)
+    print(f"Rendered {result['rendered']} of {result['pages']} pages, removed {result['removed']}, "
+          f"in {result['seconds']:.2f}s")
+    for url, error in sorted(result['errors'].items()):
+        print(f'  {url}: {error}')
+
+
+# Recompute similar products for the product pages: `flask related-products`
+@click.command('related-products')
+@click.option('--full', is_flag=True, help='Recompute every product, not just those affected by changes')
+@with_appcontext
+def related_products_command(full):
+    """Store the RELATED_PRODUCTS_K most similar products of each product"""
+    from related_products import refresh
+
+    migrate()
+    result = refresh(current_app.config['RELATED_PRODUCTS_K'], full=full)
+    kind = 'full' if result['full'] else 'incremental'
+    print(f"Run {result['run']} ({kind}): recomputed {result['recomputed']} of {result['products']} products "
+          f"in {result['seconds']:.2f}s")
+
+
+commands = [archive_messages_command, slow_queries_command, compile_templates_command, publish_command,
+            export_catalog_command, export_static_command, related_products_command]
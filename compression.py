@@ -0,0 +1,242 @@
+import threading
+import zlib
+
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli  # Optional: `pip install brotli` adds Content-Encoding: br
+except ImportError:
+    brotli = None
+
+# Content types worth compressing; images (other than SVG), fonts and
+# archives are compressed already
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+COMPRESSIBLE_SUFFIXES = ('+json', '+xml')
+
+# Statuses whose body must not be re-encoded
+UNCOMPRESSED_STATUSES = ('204', '206', '304')
+
+# Bodies of known length up to this size are compressed whole; longer ones
+# (large sitemaps and static files) are streamed
+BUFFER_LIMIT = 1024 * 1024
+
+
+def compressible(headers):
+    """Whether a response with these headers may be compressed, whatever its size"""
+    content_type = headers.get('content-type', '').split(';', 1)[0].strip().lower()
+    if not (content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith(COMPRESSIBLE_SUFFIXES)):
+        return False
+    if 'content-encoding' in headers or 'content-range' in headers:
+        return False
+    return 'no-transform' not in headers.get('cache-control', '').lower()
+
+
+class GzipEncoder:
+    name = 'gzip'
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip header and trailer
+
+    def chunk(self, data):
+        # A sync flush sends each chunk of a streamed response as soon as it is produced
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data=b''):
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class BrotliEncoder:
+    name = 'br'
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def chunk(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data=b''):
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class Compression:
+    """WSGI middleware compressing text responses with gzip, or brotli when installed.
+
+    Sits outside Flask (app.wsgi_app), so it sees exactly the bytes sent:
+    HTML pages, /api JSON, sitemaps and CSS. Responses smaller than
+    COMPRESSION_MIN_SIZE, already encoded, partial (206), or not of a
+    compressible type (images, fonts, archives) pass through untouched.
+
+    A response of known length (up to BUFFER_LIMIT) is compressed in one
+    go and keeps an exact Content-Length. A streamed response (a generator
+    body without Content-Length) is compressed chunk by chunk, flushing
+    after each one so the client still receives it progressively; until
+    COMPRESSION_MIN_SIZE bytes have been produced it is held back, so a
+    short stream is sent as it is.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.level = 6
+        self.brotli_quality = 4
+        self.min_size = 500
+        self.bytes_in = {}
+        self.bytes_out = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESSION_ENABLED', True)
+        app.config.setdefault('COMPRESSION_LEVEL', 6)
+        app.config.setdefault('COMPRESSION_BROTLI_QUALITY', 4)
+        app.config.setdefault('COMPRESSION_MIN_SIZE', 500)
+        self.enabled = app.config['COMPRESSION_ENABLED']
+        self.level = app.config['COMPRESSION_LEVEL']
+        self.brotli_quality = app.config['COMPRESSION_BROTLI_QUALITY']
+        self.min_size = app.config['COMPRESSION_MIN_SIZE']
+        app.extensions['compression'] = self
+        if self.enabled:
+            app.wsgi_app = self.wrap(app.wsgi_app)
+
+    def encoder(self, accept_encoding):
+        """A new encoder for the best coding the client accepts, or None"""
+        if not accept_encoding:
+            return None
+        accepted = parse_accept_header(accept_encoding)
+        gzip_quality = accepted.quality('gzip')
+        if brotli is not None and accepted.quality('br') and accepted.quality('br') >= gzip_quality:
+            return BrotliEncoder(self.brotli_quality)
+        if gzip_quality:
+            return GzipEncoder(self.level)
+        return None
+
+    def wrap(self, wsgi_app):
+        def compressed_app(environ, start_response):
+            return self(wsgi_app, environ, start_response)
+        return compressed_app
+
+    def __call__(self, wsgi_app, environ, start_response):
+        encoder = None
+        if environ['REQUEST_METHOD'] != 'HEAD':
+            encoder = self.encoder(environ.get('HTTP_ACCEPT_ENCODING'))
+        response = {}
+        written = []
+
+        def capture(status, headers, exc_info=None):
+            response.update(status=status, headers=headers, exc_info=exc_info)
+            return written.append  # Bodies passed to the legacy write() go first
+
+        body = wsgi_app(environ, capture)
+        status, headers = response['status'], response['headers']
+        names = {name.lower(): value for name, value in headers}
+        if status[:3] in UNCOMPRESSED_STATUSES or not compressible(names):
+            start_response(status, headers, response['exc_info'])
+            return self._chain(written, body)
+
+        headers = self._vary(headers)
+        if encoder is None:
+            start_response(status, headers, response['exc_info'])
+            return self._chain(written, body)
+
+        length = names.get('content-length')
+        if length is not None and length.isdigit():
+            if int(length) < self.min_size:
+                start_response(status, headers, response['exc_info'])
+                return self._chain(written, body)
+            if int(length) <= BUFFER_LIMIT:
+                try:
+                    data = b''.join(written) + b''.join(body)
+                finally:
+                    if hasattr(body, 'close'):
+                        body.close()
+                compressed = encoder.finish(data)
+                self._count(encoder.name, len(data), len(compressed))
+                start_response(status, self._encoded(headers, encoder.name, len(compressed)), response['exc_info'])
+                return [compressed]
+
+        # Streamed (or a file): hold chunks back until the minimum size is reached
+        chunks = iter(self._chain(written, body))
+        held = []
+        size = 0
+        for chunk in chunks:
+            held.append(chunk)
+            size += len(chunk)
+            if size >= self.min_size:
+                break
+        else:
+            start_response(status, headers, response['exc_info'])
+            return self._closing(held, body)
+
+        start_response(status, self._encoded(headers, encoder.name), response['exc_info'])
+        return self._closing(self._stream(encoder, held, chunks), body)
+
+    def _stream(self, encoder, held, chunks):
+        data = b''.join(held)
+        out = encoder.chunk(data)
+        self._count(encoder.name, len(data), len(out))
+        yield out
+        for chunk in chunks:
+            if chunk:
+                out = encoder.chunk(chunk)
+                self._count(encoder.name, len(chunk), len(out))
+                if out:
+                    yield out
+        out = encoder.finish()
+        self._count(encoder.name, 0, len(out))
+        yield out
+
+    @staticmethod
+    def _chain(written, body):
+        if not written:
+            return body
+        return Compression._closing(written + list(body), body)
+
+    @staticmethod
+    def _closing(chunks, body):
+        # The server closes what we return; pass that on to the app's iterable
+        try:
+            yield from chunks
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+    @staticmethod
+    def _vary(headers):
+        for i, (name, value) in enumerate(headers):
+            if name.lower() == 'vary':
+                if 'accept-encoding' not in value.lower():
+                    headers = list(headers)
+                    headers[i] = (name, f'{value}, Accept-Encoding')
+                return headers
+        return list(headers) + [('Vary', 'Accept-Encoding')]
+
+    @staticmethod
+    def _encoded(headers, coding, length=None):
+        encoded = []
+        for name, value in headers:
+            lower = name.lower()
+            if lower == 'content-length':
+                continue
+            if lower == 'etag' and not value.startswith('W/'):
+                value = f'W/{value}'  # The bytes differ from the identity representation
+            encoded.append((name, value))
+        encoded.append(('Content-Encoding', coding))
+        if length is not None:
+            encoded.append(('Content-Length', str(length)))
+        return encoded
+
+    def _count(self, coding, size_in, size_out):
+        with self._lock:
+            self.bytes_in[coding] = self.bytes_in.get(coding, 0) + size_in
+            self.bytes_out[coding] = self.bytes_out.get(coding, 0) + size_out
+
+    def stats(self):
+        with self._lock:
+            return {
+                'bytes_in': dict(self.bytes_in),
+                'bytes_out': dict(self.bytes_out),
+                'bytes_saved': {coding: self.bytes_in[coding] - self.bytes_out[coding] for coding in self.bytes_in},
+            }
+
+
+compression = Compression()
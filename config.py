@@ -0,0 +1,101 @@
+import os
+
+
+class Config:
+    """Default settings; pass overrides to create_app()"""
+
+    SECRET_KEY = 'floofofhearts-secret-key'  # Change this in production
+    DATABASE = 'instance/floorofhearts.db'  # SQLite database used by the models
+    JINJA_CACHE_DIR = 'instance/jinja_cache'  # Compiled template bytecode; None to disable
+    DB_READ_MODE = 'ro'  # Catalog reads: 'rw', 'ro' (mode=ro) or 'snapshot' (immutable published copy)
+    DB_SNAPSHOT_PATH = 'instance/floorofhearts.snapshot.db'  # Written by Publish on the admin dashboard
+
+    # Contact form write-behind queue (see contact_queue.py)
+    CONTACT_QUEUE_SIZE = 1000  # Pending contact messages held in memory
+    CONTACT_QUEUE_BATCH_SIZE = 50  # Messages written per transaction
+    CONTACT_SPILL_PATH = 'instance/contact_spill.jsonl'  # Used while the DB is locked
+
+    # Product listings (category pages, search and /api/products)
+    PRODUCTS_PAGE_SIZE = 48  # Products per category or search page
+    API_MAX_PAGE_SIZE = 500  # Largest ?limit= accepted by /api/products and the change feed
+    CHANGE_FEED_PAGE_SIZE = 500  # Changes per /api/products/changes page without ?limit=
+    API_MAX_LOOKUP_IDS = 500  # Most product_ids one ?ids= or /api/products/lookup request may ask for
+    PRODUCT_JSON_CACHE_SIZE = 20000  # Encoded products kept per worker for the list endpoints; 0 disables
+
+    # Search result cache (see search_cache.py)
+    SEARCH_CACHE_SIZE = 1000  # Result pages kept per worker; 0 disables
+    SEARCH_CACHE_TTL = 300  # Seconds a cached result is served, even without catalog changes
+    SEARCH_CACHE_TRACKED_QUERIES = 5000  # Distinct queries counted for the top queries list
+
+    # sitemap.xml (see sitemap.py)
+    SITEMAP_DIR = 'instance/sitemaps'  # Cached sitemap files, rebuilt when their catalog scope changes
+    SITEMAP_MAX_URLS = 50000  # URLs per child sitemap; larger categories are split into parts
+    SITEMAP_BASE_URL = None  # e.g. 'https://www.floorofhearts.co.uk'; None uses SERVER_NAME or the requested host; set one in production
+
+    # Static export (see static_export.py)
+    STATIC_EXPORT_DIR = 'instance/static_site'  # Written by `flask export-static`
+
+    # Rate limiting (see rate_limit.py): rule -> (requests, seconds) per client IP
+    RATE_LIMIT_ENABLED = True  # Answer clients over their limit with 429 and Retry-After
+    RATE_LIMITS = {
+        'search': (30, 60),  # Each search scans the products table
+        'search_async': (30, 60),
+        'POST contact': (5, 600),  # Each message takes the SQLite write lock
+        'add_product': (60, 60),
+        'update_product': (60, 60),
+        'delete_product': (60, 60),
+    }
+    RATE_LIMIT_MAX_BUCKETS = 10000  # Client buckets kept per worker (least recently used are dropped)
+    RATE_LIMIT_STORE = None  # e.g. 'instance/rate_limits.db' to share buckets between workers
+    RATE_LIMIT_PROXIES = 0  # Trusted proxies in front of the app (e.g. 1 behind nginx) for X-Forwarded-For
+
+    # Response compression (see compression.py)
+    COMPRESSION_ENABLED = True  # gzip (or brotli, if installed) for text responses the client accepts
+    COMPRESSION_LEVEL = 6  # gzip level, 1 (fastest) to 9 (smallest)
+    COMPRESSION_BROTLI_QUALITY = 4  # brotli quality, 0 to 11
+    COMPRESSION_MIN_SIZE = 500  # Smaller responses are sent as they are
+
+    # Related products (see related_products.py)
+    RELATED_PRODUCTS_K = 8  # Neighbours stored per product by `flask related-products`
+    RELATED_PRODUCTS_SHOWN = 4  # Of those, shown on the product page
+
+    # Category page facets: specification keys offered as filters, in display order
+    FACET_ATTRIBUTES = ['Thickness', 'Wear Layer', 'Colour', 'Installation', 'Waterproof']
+
+    # Catalog generation counters (see catalog_generation.py)
+    CATALOG_GENERATION_CHECK = True  # Check for catalog changes before each request
+
+    # Memory-mapped catalog file (see catalog_file.py)
+    CATALOG_FILE_ENABLED = False  # Serve category and product pages from the exported catalog file
+    CATALOG_FILE = 'instance/catalog.bin'  # Rewritten by Publish and `flask export-catalog`
+    CATALOG_CHECK_INTERVAL = 1.0  # Seconds between checks for a newer file
+
+    # Async views (see db_executor.py)
+    DB_EXECUTOR_THREADS = 8  # Threads running model calls for the async views
+
+    # Admin inbox
+    INBOX_PAGE_SIZE = 25  # Messages per admin inbox page
+    MESSAGE_RETENTION_DAYS = 365  # Older messages are moved to contacts_archive
+    ARCHIVE_BATCH_SIZE = 500  # Messages moved per transaction by the retention job
+
+    # Instrumentation (see metrics.py)
+    METRICS_ENABLED = True  # Set to False to skip all request/SQL/template instrumentation
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Bearer token for scraping /admin/metrics without a session
+    METRICS_SERVER_TIMING = False  # Add a Server-Timing header with DB/template time
+
+    # Slow query log (see slow_queries.py)
+    SLOW_QUERY_ENABLED = False  # Log statements slower than the threshold with their query plan
+    SLOW_QUERY_THRESHOLD_MS = 50
+    SLOW_QUERY_LOG = 'instance/slow_queries.jsonl'
+
+    # Request profiling (see profiling.py)
+    PROFILE_ENABLED = False  # Profile sampled requests with cProfile
+    PROFILE_SAMPLE_RATE = 100  # Profile one in this many requests
+    PROFILE_ENDPOINTS = []  # Endpoints to profile on every request, e.g. ['category']
+    PROFILE_HEADER = 'X-Profile'  # Logged-in admins can profile one request with this header
+    PROFILE_DIR = 'instance/profiles'
+
+    # Memory diagnostics (see memory_diagnostics.py)
+    MEMORY_TRACE_FRAMES = 1  # Stack depth recorded by tracemalloc
+    MEMORY_MAX_SNAPSHOTS = 10
+    MEMORY_PEAK_ENDPOINTS = ['get_products', 'admin_products']  # Measured per request while tracing
@@ -0,0 +1,275 @@
+import atexit
+import contextlib
+import datetime
+import fcntl
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+
+from models.db import writer
+from models.schema import migrate
+
+INSERT_CONTACT_SQL = '''
+    INSERT INTO contacts (name, email, phone, subject, message, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+# Columns written for each queued submission, in INSERT order
+CONTACT_FIELDS = ('name', 'email', 'phone', 'subject', 'message', 'created_at')
+
+logger = logging.getLogger(__name__)
+
+
+class ContactQueue:
+    """Bounded write-behind queue for contact form submissions.
+
+    Submissions are accepted into memory and written by a single background
+    thread in batched transactions, so the request never waits on the SQLite
+    write lock. If the database stays locked, the batch is appended to a
+    spill file and replayed on the next successful drain.
+    """
+
+    def __init__(self, maxsize=1000, batch_size=50, flush_interval=0.5,
+                 spill_path='instance/contact_spill.jsonl'):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.batches = 0
+        self.errors = 0
+
+    def init_app(self, app):
+        app.config.setdefault('CONTACT_QUEUE_SIZE', 1000)
+        app.config.setdefault('CONTACT_QUEUE_BATCH_SIZE', 50)
+        app.config.setdefault('CONTACT_SPILL_PATH', 'instance/contact_spill.jsonl')
+        with self._lock:
+            if self.maxsize != app.config['CONTACT_QUEUE_SIZE'] and self._thread is None:
+                self._queue = queue.Queue(maxsize=app.config['CONTACT_QUEUE_SIZE'])
+            self.maxsize = app.config['CONTACT_QUEUE_SIZE']
+            self.batch_size = app.config['CONTACT_QUEUE_BATCH_SIZE']
+            self.spill_path = app.config['CONTACT_SPILL_PATH']
+        app.extensions['contact_queue'] = self
+
+    def submit(self, name, email, phone, subject, message):
+        """Queue a submission. Returns False if the queue is full."""
+        self._ensure_started()
+        # Stamp the submission time now, so the stored message keeps the time
+        # it was sent rather than the time it was written
+        created_at = datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        row = (name, email, phone, subject, message, created_at)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'depth': self._queue.qsize(),
+                'capacity': self.maxsize,
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'spilled': self.spilled,
+                'spill_pending': self._spill_pending(),
+                'batches': self.batches,
+                'errors': self.errors,
+            }
+
+    def flush(self):
+        """Write everything currently queued (and any spilled rows) now."""
+        self._replay_spill()
+        while True:
+            batch = self._take_batch(block=False)
+            if not batch:
+                break
+            self._write(batch)
+
+    def shutdown(self, timeout=5.0):
+        """Stop the writer thread and flush whatever is still queued."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.flush()
+
+    def _ensure_started(self):
+        # Start lazily and once per process, so forked workers and the
+        # debug reloader each get their own writer thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Anything queued in the parent belongs to the parent
+                self._queue = queue.Queue(maxsize=self.maxsize)
+            self._stop.clear()
+            self._ensure_table()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='contact-writer', daemon=True
+            )
+            self._thread.start()
+        atexit.register(self.shutdown)
+
+    def _ensure_table(self):
+        # Applied once per writer start rather than on every submission
+        migrate()
+
+    def _run(self):
+        while not self._stop.is_set():
+            # The thread must outlive any one failure, or the queue fills and drops everything
+            try:
+                batch = self._take_batch(block=True)
+                if batch:
+                    self._replay_spill()
+                    self._write(batch)
+                elif self._spill_pending():
+                    self._replay_spill()
+            except Exception:
+                logger.exception('Contact writer failed; continuing')
+                with self._lock:
+                    self.errors += 1
+
+    def _take_batch(self, block):
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            else:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            with writer() as conn:
+                conn.executemany(INSERT_CONTACT_SQL, batch)
+        except sqlite3.DatabaseError:
+            # Database locked (or otherwise unwritable): keep the rows durable
+            # on disk and retry them on the next drain
+            self._spill(batch)
+            return False
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+        return True
+
+    def _spill(self, batch):
+        try:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Under the replay lock, so another worker cannot claim and delete
+            # the file while these rows are being appended to it
+            with self._spill_lock(), open(self.spill_path, 'a', encoding='utf-8') as f:
+                for row in batch:
+                    f.write(json.dumps(dict(zip(CONTACT_FIELDS, row))) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            with self._lock:
+                self.errors += 1
+                self.dropped += len(batch)
+            return
+        with self._lock:
+            self.spilled += len(batch)
+
+    def _spill_pending(self):
+        return (os.path.exists(self.spill_path)
+                or os.path.exists(self.spill_path + '.replay'))
+
+    @contextlib.contextmanager
+    def _spill_lock(self):
+        # Workers forked by serve.py share the spill file: serialise appends and
+        # replays within this process and across processes
+        with self._replay_lock, open(self.spill_path + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _replay_spill(self):
+        if not self._spill_pending():
+            return
+        # Replays hold the lock throughout, so no row is written twice
+        with self._spill_lock():
+            self._replay_spill_locked()
+
+    def _replay_spill_locked(self):
+        # Claim the file first so rows spilled while we replay go to a new one
+        replay_path = self.spill_path + '.replay'
+        if not os.path.exists(replay_path):
+            try:
+                os.replace(self.spill_path, replay_path)
+            except OSError:
+                return
+        rows = []
+        bad_lines = []
+        with open(replay_path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    rows.append(tuple(record.get(field) for field in CONTACT_FIELDS))
+                except (ValueError, AttributeError):
+                    # A line torn by a crash mid-write: set it aside, replay the rest
+                    bad_lines.append(line if line.endswith('\n') else line + '\n')
+        try:
+            with writer() as conn:
+                conn.executemany(INSERT_CONTACT_SQL, rows)
+        except sqlite3.OperationalError:
+            # Still locked: leave the replay file, bad lines included, for the
+            # next attempt; they are set aside once, when it succeeds
+            return
+        except sqlite3.DatabaseError:
+            # Rows the database rejects would block every later replay
+            logger.exception('Could not replay %s; moved to %s.bad', replay_path, self.spill_path)
+            bad_lines += [json.dumps(dict(zip(CONTACT_FIELDS, row))) + '\n' for row in rows]
+        else:
+            with self._lock:
+                self.written += len(rows)
+                self.batches += 1
+        if bad_lines:
+            self._quarantine(bad_lines)
+        os.remove(replay_path)
+
+    def _quarantine(self, lines):
+        logger.warning('Moved %d unreadable contact spill lines to %s.bad', len(lines), self.spill_path)
+        with open(self.spill_path + '.bad', 'a', encoding='utf-8') as f:
+            f.writelines(lines)
+        with self._lock:
+            self.errors += len(lines)
+
+
+contact_queue = ContactQueue()
@@ -0,0 +1,97 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import os
+import threading
+
+from metrics import metrics
+
+
+class DBExecutor:
+    """Bounded thread pool that runs blocking model calls for async views.
+
+    `await db_executor.run(Product.query_all)` runs the call on one of
+    DB_EXECUTOR_THREADS threads, so several independent queries of one
+    request can be awaited together with asyncio.gather(). Under a WSGI
+    server Flask still runs each async view to completion on the request's
+    worker thread; the gain is overlapping a request's own queries, not
+    freeing the worker while it waits.
+
+    The pool is created lazily in each process, so it is never inherited
+    across the fork in serve.py.
+    """
+
+    def __init__(self, app=None, max_workers=8):
+        self.max_workers = max_workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('DB_EXECUTOR_THREADS', 8)
+        self.max_workers = app.config['DB_EXECUTOR_THREADS']
+        app.extensions['db_executor'] = self
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='db'
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        """Run `fn(*args, **kwargs)` on the pool and return its result"""
+        loop = asyncio.get_running_loop()
+        # Copy the context so the call sees the current request (for the
+        # slow query log) like asyncio.to_thread() does
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, self._call, fn, args, kwargs)
+        with self._lock:
+            self.pending += 1
+        try:
+            result, counts = await loop.run_in_executor(self.executor, call)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+        metrics.add_offloaded(*counts)
+        return result
+
+    @staticmethod
+    def _call(fn, args, kwargs):
+        # Per-request SQL counters are thread-local, so count this call's
+        # statements here and hand them back to the request's thread
+        stats = metrics.request_stats
+        stats.active = True
+        stats.connections = 0
+        stats.statements = 0
+        stats.sql_seconds = 0.0
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            stats.active = False
+        return result, (stats.connections, stats.statements, stats.sql_seconds)
+
+    def stats(self):
+        return {
+            'threads': self.max_workers,
+            'pending': self.pending,
+            'completed': self.completed,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+db_executor = DBExecutor()
@@ -0,0 +1,47 @@
+from flask_wtf import FlaskForm
+from wtforms import StringField, TextAreaField, SubmitField, PasswordField, SelectField, FloatField
+from wtforms.validators import DataRequired, Email, Length, Optional, ValidationError
+import json
+
+# Create a contact form class
+class ContactForm(FlaskForm):
+    name = StringField('Name', validators=[DataRequired(), Length(min=2, max=100)])
+    email = StringField('Email', validators=[DataRequired(), Email()])
+    phone = StringField('Phone', validators=[Length(max=20)])
+    subject = StringField('Subject', validators=[DataRequired(), Length(min=2, max=100)])
+    message = TextAreaField('Message', validators=[DataRequired(), Length(min=10, max=1000)])
+    submit = SubmitField('Send Message')
+
+# Login form class for admin users
+class LoginForm(FlaskForm):
+    username = StringField('Username', validators=[DataRequired()])
+    password = PasswordField('Password', validators=[DataRequired()])
+    submit = SubmitField('Login')
+
+# Product Form for admin
+class ProductForm(FlaskForm):
+    product_id = StringField('Product ID', validators=[DataRequired(), Length(min=2, max=20)])
+    name = StringField('Name', validators=[DataRequired(), Length(min=2, max=100)])
+    description = TextAreaField('Description', validators=[DataRequired()])
+    category_id = SelectField('Category', coerce=int, validators=[DataRequired()])
+    product_type_id = SelectField('Product Type', coerce=int, validators=[Optional()])
+    price = FloatField('Price', validators=[Optional()])
+    image_url = StringField('Image URL', validators=[Optional(), Length(max=200)])
+    specifications = TextAreaField('Specifications (JSON)', validators=[Optional()])
+    features = TextAreaField('Features (JSON Array)', validators=[Optional()])
+    
+    def validate_specifications(self, field):
+        if field.data.strip():
+            try:
+                json.loads(field.data)
+            except json.JSONDecodeError:
+                raise ValidationError('Invalid JSON format for specifications')
+                
+    def validate_features(self, field):
+        if field.data.strip():
+            try:
+                features = json.loads(field.data)
+                if not isinstance(features, list):
+                    raise ValidationError('Features must be a JSON array')
+            except json.JSONDecodeError:
+                raise ValidationError('Invalid JSON format for features')
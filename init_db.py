@@ -8,18 +8,17 @@ import datetime
 # Add the parent directory to the path so we can import our modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-def get_db_connection():
-    conn = sqlite3.connect('instance/floorofhearts.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+from models import db
+from models.db import get_db_connection
+from models.schema import create_schema
 
-def seed_database():
+def seed_database(database=None):
     """Seed the database with initial data"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    if database:
+        db.DATABASE_PATH = database
 
     # Ensure the instance directory and DB file exist before proceeding
-    db_abspath = os.path.abspath('instance/floorofhearts.db')
+    db_abspath = os.path.abspath(db.DATABASE_PATH)
     db_dir = os.path.dirname(db_abspath)
 
     if not os.path.isdir(db_dir):
@@ -30,75 +29,11 @@ def seed_database():
         # but ensuring the directory exists and touching the file is safe)
         open(db_abspath, 'a').close()
     
-    # Check if categories table exists, if not create it
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS categories (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        slug TEXT NOT NULL UNIQUE,
-        description TEXT,
-        image_url TEXT
-    )
-    ''')
-    
-    # Check if product_types table exists, if not create it
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS product_types (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        slug TEXT NOT NULL,
-        description TEXT,
-        category_id INTEGER,
-        FOREIGN KEY (category_id) REFERENCES categories (id)
-    )
-    ''')
+    conn = get_db_connection()
+    cursor = conn.cursor()
     
-    # Check if products table exists, if not create it
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS products (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        product_id TEXT NOT NULL UNIQUE,
-        name TEXT NOT NULL,
-        description TEXT,
-        category_id INTEGER,
-        product_type_id INTEGER,
-        image_url TEXT,
-        image_urls TEXT,
-        price REAL,
-        specifications TEXT,
-        features TEXT,
-        created_at TEXT,
-        updated_at TEXT,
-        FOREIGN KEY (category_id) REFERENCES categories (id),
-        FOREIGN KEY (product_type_id) REFERENCES product_types (id)
-    )
-    ''')
-
-    # Check if admin_users table exists, if not create it
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS admin_users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL UNIQUE,
-        password_hash TEXT NOT NULL,
-        name TEXT NOT NULL,
-        email TEXT NOT NULL UNIQUE,
-        is_active BOOLEAN NOT NULL DEFAULT 1,
-        created_at TEXT
-    )
-    ''')
-
-    # Create contacts table (used by ContactMessage)
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS contacts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        email TEXT NOT NULL,
-        phone TEXT,
-        subject TEXT NOT NULL,
-        message TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
+    # Create any missing tables, indexes and triggers (see models/schema.py)
+    create_schema(conn)
 
     conn.commit()
 
@@ -389,4 +324,5 @@ def seed_database():
     print("Database seeded successfully!")
 
 if __name__ == '__main__':
-    seed_database()
\ No newline at end of file
+    # Optional argument: path of the database to seed (default instance/floorofhearts.db)
+    seed_database(sys.argv[1] if len(sys.argv) > 1 else None)
\ No newline at end of file
@@ -0,0 +1,154 @@
+import collections
+import datetime
+import threading
+import tracemalloc
+
+from flask import g, request
+
+# Allocations made by tracemalloc itself or the import machinery are noise
+SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+
+class MemoryDiagnostics:
+    """Admin-driven tracemalloc control: named snapshots, diffs and per-request peaks.
+
+    Snapshots live in the memory of the worker process that took them, so
+    compare snapshots taken through the same worker. Per-request peaks use
+    the process-wide tracemalloc peak, so concurrent requests in the same
+    process inflate each other's figures; read them as upper bounds.
+    """
+
+    def __init__(self, app=None):
+        self.frames = 1
+        self.max_snapshots = 10
+        self.peak_endpoints = set()
+        self.snapshots = collections.OrderedDict()
+        self.peaks = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MEMORY_TRACE_FRAMES', 1)
+        app.config.setdefault('MEMORY_MAX_SNAPSHOTS', 10)
+        app.config.setdefault('MEMORY_PEAK_ENDPOINTS', [])
+        self.frames = app.config['MEMORY_TRACE_FRAMES']
+        self.max_snapshots = app.config['MEMORY_MAX_SNAPSHOTS']
+        self.peak_endpoints = set(app.config['MEMORY_PEAK_ENDPOINTS'])
+        app.extensions['memory_diagnostics'] = self
+
+        if self.peak_endpoints:
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=None):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames or self.frames)
+
+    def stop(self):
+        # Stopping discards every trace, so old snapshots can no longer be
+        # compared with new ones
+        tracemalloc.stop()
+        with self._lock:
+            self.snapshots.clear()
+
+    def traced_memory(self):
+        if not tracemalloc.is_tracing():
+            return None
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'current': current,
+            'peak': peak,
+            'overhead': tracemalloc.get_tracemalloc_memory(),
+        }
+
+    def take_snapshot(self, name=None):
+        if not tracemalloc.is_tracing():
+            raise RuntimeError('tracemalloc is not running')
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        name = name or datetime.datetime.now().strftime('%H:%M:%S')
+        with self._lock:
+            self.snapshots.pop(name, None)
+            self.snapshots[name] = {
+                'name': name,
+                'taken_at': datetime.datetime.now().isoformat(timespec='seconds'),
+                'size': sum(stat.size for stat in snapshot.statistics('filename')),
+                'snapshot': snapshot,
+            }
+            while len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popitem(last=False)
+        return name
+
+    def delete_snapshot(self, name):
+        with self._lock:
+            self.snapshots.pop(name, None)
+
+    def list_snapshots(self):
+        with self._lock:
+            return [
+                {key: value for key, value in entry.items() if key != 'snapshot'}
+                for entry in self.snapshots.values()
+            ]
+
+    def diff(self, old_name, new_name, group_by='lineno', limit=50):
+        """Allocation growth from one snapshot to another, largest first.
+
+        `group_by` is "lineno" (file and line) or "filename".
+        """
+        with self._lock:
+            old = self.snapshots.get(old_name)
+            new = self.snapshots.get(new_name)
+        if old is None or new is None:
+            return None
+        stats = new['snapshot'].compare_to(old['snapshot'], group_by)
+        rows = []
+        for stat in stats[:limit]:
+            frame = stat.traceback[0]
+            rows.append({
+                'location': frame.filename if group_by == 'filename' else f'{frame.filename}:{frame.lineno}',
+                'size': stat.size,
+                'size_diff': stat.size_diff,
+                'count': stat.count,
+                'count_diff': stat.count_diff,
+            })
+        return rows
+
+    def _before_request(self):
+        if request.endpoint not in self.peak_endpoints or not tracemalloc.is_tracing():
+            return
+        tracemalloc.reset_peak()
+        g.memory_baseline = tracemalloc.get_traced_memory()[0]
+
+    def _after_request(self, response):
+        baseline = g.pop('memory_baseline', None)
+        if baseline is None or not tracemalloc.is_tracing():
+            return response
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        with self._lock:
+            entry = self.peaks.setdefault(
+                request.endpoint, {'endpoint': request.endpoint, 'requests': 0, 'max': 0, 'total': 0, 'last': 0}
+            )
+            entry['requests'] += 1
+            entry['last'] = peak
+            entry['total'] += peak
+            entry['max'] = max(entry['max'], peak)
+        return response
+
+    def request_peaks(self):
+        with self._lock:
+            return [
+                dict(entry, avg=entry['total'] / entry['requests'])
+                for entry in sorted(self.peaks.values(), key=lambda e: e['max'], reverse=True)
+            ]
+
+
+memory_diagnostics = MemoryDiagnostics()
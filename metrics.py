@@ -0,0 +1,289 @@
+import hmac
+import threading
+import time
+
+from flask import Response, abort, current_app, g, has_request_context, request, session
+from jinja2 import Template
+
+from models import db
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _format_labels(labels):
+    labels = list(labels)
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram with one series per label set"""
+
+    def __init__(self, name, help, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for label_values, (counts, total, count) in items:
+            labels = list(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", bound)])} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", "+Inf")])} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, label_names):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f'{self.name}{_format_labels(zip(self.label_names, label_values))} {value}')
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback when the metrics are scraped.
+
+    The callback returns either a number or a dict mapping label value
+    tuples to numbers.
+    """
+
+    def __init__(self, name, help, label_names, callback):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.callback = callback
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(zip(self.label_names, label_values))} {value}')
+        return lines
+
+
+class RequestStats(threading.local):
+    """Per-thread counters for the request being served"""
+    active = False
+    connections = 0
+    statements = 0
+    sql_seconds = 0.0
+    template_seconds = 0.0
+
+
+class Metrics:
+    """Request, SQL and template instrumentation exposed at /admin/metrics.
+
+    Nothing is hooked into the app unless METRICS_ENABLED is set, so a
+    disabled instance adds no per-request or per-statement work.
+    """
+
+    def __init__(self, app=None, prefix='floorofhearts'):
+        self.prefix = prefix
+        self.enabled = False
+        self.request_stats = RequestStats()
+        self.gauges = {}
+
+        self.request_latency = Histogram(
+            f'{prefix}_request_duration_seconds',
+            'Time spent handling a request',
+            ('endpoint', 'method'))
+        self.requests = Counter(
+            f'{prefix}_requests_total',
+            'Requests handled, by endpoint and status code',
+            ('endpoint', 'status'))
+        self.request_statements = Histogram(
+            f'{prefix}_request_sql_statements',
+            'SQL statements executed per request',
+            ('endpoint',), buckets=COUNT_BUCKETS)
+        self.request_connections = Histogram(
+            f'{prefix}_request_db_connections',
+            'Database connections opened per request',
+            ('endpoint',), buckets=COUNT_BUCKETS)
+        self.request_sql_time = Histogram(
+            f'{prefix}_request_sql_duration_seconds',
+            'Time spent in SQL statements per request',
+            ('endpoint',))
+        self.template_render = Histogram(
+            f'{prefix}_template_render_seconds',
+            'Time spent rendering a template',
+            ('template',))
+        self.statements = Counter(
+            f'{prefix}_sql_statements_total',
+            'SQL statements executed, including outside requests',
+            ())
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', False)
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.config.setdefault('METRICS_SERVER_TIMING', False)
+        self.enabled = app.config['METRICS_ENABLED']
+        self.server_timing = app.config['METRICS_SERVER_TIMING']
+        app.extensions['metrics'] = self
+
+        if not self.enabled:
+            return
+
+        db.add_hook(self)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.jinja_env.template_class = self._timed_template_class()
+
+    def add_gauge(self, name, help, callback, label_names=()):
+        """Expose a value computed at scrape time, e.g. a queue depth"""
+        self.gauges[name] = Gauge(f'{self.prefix}_{name}', help, label_names, callback)
+
+    # Connection layer hooks (see models.db)
+    def on_connect(self, conn):
+        if self.request_stats.active:
+            self.request_stats.connections += 1
+
+    def on_statement(self, conn, sql, params, seconds):
+        self.statements.inc(1)
+        stats = self.request_stats
+        if stats.active:
+            stats.statements += 1
+            stats.sql_seconds += seconds
+
+    def add_offloaded(self, connections=0, statements=0, sql_seconds=0.0, template_seconds=0.0):
+        """Count work done on another thread (async views, see db_executor) towards the current request"""
+        if not self.enabled or not has_request_context():
+            return
+        totals = g.setdefault('metrics_offloaded', [0, 0, 0.0, 0.0])
+        totals[0] += connections
+        totals[1] += statements
+        totals[2] += sql_seconds
+        totals[3] += template_seconds
+
+    def _before_request(self):
+        stats = self.request_stats
+        stats.active = True
+        stats.connections = 0
+        stats.statements = 0
+        stats.sql_seconds = 0.0
+        stats.template_seconds = 0.0
+        g.metrics_started = time.perf_counter()
+
+    def _after_request(self, response):
+        started = g.pop('metrics_started', None)
+        stats = self.request_stats
+        if started is None or not stats.active:
+            return response
+        stats.active = False
+        elapsed = time.perf_counter() - started
+        offloaded = g.pop('metrics_offloaded', None)
+        if offloaded:
+            stats.connections += offloaded[0]
+            stats.statements += offloaded[1]
+            stats.sql_seconds += offloaded[2]
+            stats.template_seconds += offloaded[3]
+        endpoint = request.endpoint or 'unmatched'
+
+        self.request_latency.observe(elapsed, endpoint, request.method)
+        self.requests.inc(1, endpoint, str(response.status_code))
+        self.request_statements.observe(stats.statements, endpoint)
+        self.request_connections.observe(stats.connections, endpoint)
+        self.request_sql_time.observe(stats.sql_seconds, endpoint)
+
+        if self.server_timing:
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={stats.sql_seconds * 1000:.2f};desc="{stats.statements} queries", '
+                f'tpl;dur={stats.template_seconds * 1000:.2f}, '
+                f'total;dur={elapsed * 1000:.2f}'
+            )
+        return response
+
+    def _timed_template_class(self):
+        metrics = self
+
+        class TimedTemplate(Template):
+            def render(self, *args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return super().render(*args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    metrics.template_render.observe(elapsed, self.name or '<string>')
+                    if metrics.request_stats.active:
+                        metrics.request_stats.template_seconds += elapsed
+                    else:
+                        # Async views render on the event loop's thread
+                        metrics.add_offloaded(template_seconds=elapsed)
+
+        return TimedTemplate
+
+    def render(self):
+        lines = []
+        for metric in (self.request_latency, self.requests, self.request_statements,
+                       self.request_connections, self.request_sql_time,
+                       self.template_render, self.statements):
+            lines.extend(metric.render())
+        for gauge in self.gauges.values():
+            lines.extend(gauge.render())
+        return '\n'.join(lines) + '\n'
+
+    def view(self):
+        """Prometheus text exposition; admin session or METRICS_TOKEN required"""
+        if not self.enabled:
+            abort(404)
+        token = current_app.config['METRICS_TOKEN']
+        authorized = 'admin_id' in session or (
+            # Constant time, so the token cannot be guessed a character at a time
+            token and hmac.compare_digest(request.headers.get('Authorization', '').encode('utf-8'),
+                                          f'Bearer {token}'.encode('utf-8'))
+        )
+        if not authorized:
+            abort(403)
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+metrics = Metrics()
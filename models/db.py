@@ -0,0 +1,241 @@
+import contextlib
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+import urllib.request
+import weakref
+
+DATABASE_PATH = 'instance/floorofhearts.db'
+
+# How catalog reads connect (see get_read_connection):
+#   'rw'        the read-write database, like writes
+#   'ro'        the live database opened with mode=ro
+#   'snapshot'  the published snapshot opened with immutable=1, falling
+#               back to 'ro' until a snapshot has been published
+READ_MODE = 'ro'
+SNAPSHOT_PATH = 'instance/floorofhearts.snapshot.db'
+
+# Set for admin pages and API writes, which must see their own edits
+# before they are published
+live_reads = contextvars.ContextVar('live_reads', default=False)
+
+# Serialises writers within the process; SQLite serialises across processes
+_write_lock = threading.Lock()
+
+# Objects notified about connections and statements (see add_hook). While
+# the list is empty connections are plain sqlite3 connections, so the
+# instrumentation costs nothing when it is switched off.
+hooks = []
+
+
+def add_hook(hook):
+    """Register an object with `on_connect(conn)` and
+    `on_statement(conn, sql, params, seconds)` methods"""
+    if hook not in hooks:
+        hooks.append(hook)
+
+
+def remove_hook(hook):
+    if hook in hooks:
+        hooks.remove(hook)
+
+
+def _notify_statement(conn, sql, params, seconds):
+    for hook in hooks:
+        hook.on_statement(conn, sql, params, seconds)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Times each statement from execute() until its last row is read.
+
+    execute() only steps SQLite to the first row; the rest of a scan runs
+    as rows are fetched. So the time spent in execute() and in every fetch
+    is added up, and the statement reported once the cursor is exhausted,
+    re-executed, closed or collected (or its connection closed).
+    """
+    _statement = None
+
+    def _finish(self):
+        statement, self._statement = self._statement, None
+        if statement is not None:
+            _notify_statement(self.connection, *statement)
+
+    def _timed(self, fetch, *args):
+        started = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            if self._statement is not None:
+                self._statement[2] += time.perf_counter() - started
+
+    def execute(self, sql, params=()):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            super().execute(sql, params)
+        except BaseException:
+            _notify_statement(self.connection, sql, params, time.perf_counter() - started)
+            raise
+        self._statement = [sql, params, time.perf_counter() - started]
+        if self.description is None:
+            self._finish()  # No rows to read: it has run to completion
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            _notify_statement(self.connection, sql, None, time.perf_counter() - started)
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            return self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cursors = weakref.WeakSet()
+
+    def cursor(self, factory=InstrumentedCursor):
+        cursor = super().cursor(factory)
+        self._cursors.add(cursor)
+        return cursor
+
+    def close(self):
+        # Report statements whose rows were never all read while the
+        # connection can still explain them
+        for cursor in list(self._cursors):
+            cursor._finish()
+        super().close()
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+def _connect(database, uri=False):
+    if hooks:
+        conn = sqlite3.connect(database, uri=uri, factory=InstrumentedConnection)
+        for hook in hooks:
+            hook.on_connect(conn)
+    else:
+        conn = sqlite3.connect(database, uri=uri)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _uri(path, **params):
+    query = '&'.join(f'{key}={value}' for key, value in params.items())
+    return f'file:{urllib.request.pathname2url(os.path.abspath(path))}?{query}'
+
+
+# Helper function to get database connection
+def get_db_connection():
+    return _connect(DATABASE_PATH)
+
+
+def get_read_connection():
+    """Connection for catalog reads, as configured by READ_MODE.
+
+    Read-only connections cannot take the write lock, and an immutable
+    snapshot is read without any locking or change detection at all.
+    """
+    if READ_MODE == 'rw' or live_reads.get():
+        return get_db_connection()
+    if READ_MODE == 'snapshot' and os.path.exists(SNAPSHOT_PATH):
+        return _connect(_uri(SNAPSHOT_PATH, mode='ro', immutable=1), uri=True)
+    return _connect(_uri(DATABASE_PATH, mode='ro'), uri=True)
+
+
+@contextlib.contextmanager
+def writer():
+    """The single read-write connection used for model writes.
+
+    Commits when the block completes and rolls back if it raises.
+    """
+    with _write_lock:
+        conn = get_db_connection()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def publish_snapshot():
+    """Copy the live database to SNAPSHOT_PATH and atomically swap it in.
+
+    Connections already reading the old snapshot keep their open file, so
+    the swap never disturbs a request in flight.
+    """
+    directory = os.path.dirname(os.path.abspath(SNAPSHOT_PATH))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{SNAPSHOT_PATH}.{os.getpid()}.tmp'
+    started = time.perf_counter()
+    source = sqlite3.connect(DATABASE_PATH)
+    target = sqlite3.connect(tmp_path)
+    try:
+        source.backup(target)
+        # An immutable file must not expect a WAL alongside it
+        target.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        target.close()
+        source.close()
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, SNAPSHOT_PATH)
+
+    # Every worker's caches were filled from the old snapshot: mark the
+    # whole catalog as changed (see catalog_generation.py)
+    with writer() as conn:
+        conn.execute("UPDATE catalog_generations SET generation = generation + 1 WHERE scope = 'catalog'")
+        conn.execute('''
+            INSERT INTO catalog_generations (scope, generation)
+            SELECT 'all', generation FROM catalog_generations WHERE scope = 'catalog'
+            ON CONFLICT (scope) DO UPDATE SET generation = excluded.generation
+        ''')
+    return {'path': SNAPSHOT_PATH, 'seconds': time.perf_counter() - started}
+
+
+def snapshot_info():
+    """When the snapshot was published and how big it is, or None"""
+    try:
+        stat = os.stat(SNAPSHOT_PATH)
+    except OSError:
+        return None
+    return {'path': SNAPSHOT_PATH, 'published_at': stat.st_mtime, 'size': stat.st_size}
@@ -2,12 +2,29 @@ import json
 import sqlite3
 import datetime
 import hashlib
+import heapq
 
-# Helper function to get database connection
-def get_db_connection():
-    conn = sqlite3.connect('instance/floorofhearts.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+from models.db import get_db_connection, get_read_connection, writer
+
+# Sort orders for product listings: sort parameter -> (column, descending).
+# Ties are broken on id in the same direction, so (value, id) identifies a
+# position for keyset pagination
+PRODUCT_SORTS = {
+    'price': ('price', False),
+    'name': ('name', False),
+    'updated': ('updated_at', True),
+}
+
+# product_ids bound per query by Product.get_many(), well under SQLite's
+# limit on host parameters
+LOOKUP_CHUNK_SIZE = 500
+
+# Columns of products, which are also the keys of Product.to_dict()
+PRODUCT_FIELDS = (
+    'id', 'product_id', 'name', 'description', 'category_id', 'product_type_id',
+    'image_url', 'image_urls', 'price', 'specifications', 'features',
+    'created_at', 'updated_at',
+)
 
 # Admin User class for authentication
 class AdminUser:
@@ -46,17 +63,14 @@ class AdminUser:
             return False, "Username already exists"
         
         # Create a new admin user
-        conn = get_db_connection()
-        now = datetime.datetime.now().isoformat()
-        password_hash = hashlib.sha256(password.encode()).hexdigest()
-        
-        conn.execute('''
-            INSERT INTO admin_users (username, password_hash, name, email, is_active, created_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (username, password_hash, name, email, True, now))
+        with writer() as conn:
+            now = datetime.datetime.now().isoformat()
+            password_hash = hashlib.sha256(password.encode()).hexdigest()
         
-        conn.commit()
-        conn.close()
+            conn.execute('''
+                INSERT INTO admin_users (username, password_hash, name, email, is_active, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (username, password_hash, name, email, True, now))
         return True, "Admin user created successfully"
     
     def to_dict(self):
@@ -79,14 +93,14 @@ class Category:
 
     @staticmethod
     def query_all():
-        conn = get_db_connection()
+        conn = get_read_connection()
         categories = conn.execute('SELECT * FROM categories').fetchall()
         conn.close()
         return [Category(**dict(category)) for category in categories]
 
     @staticmethod
     def filter_by(slug=None):
-        conn = get_db_connection()
+        conn = get_read_connection()
         if slug:
             category = conn.execute(
                 'SELECT * FROM categories WHERE slug = ?', (slug,)
@@ -99,7 +113,7 @@ class Category:
     def get(id):
         if id is None:
             return None
-        conn = get_db_connection()
+        conn = get_read_connection()
         category = conn.execute(
             'SELECT * FROM categories WHERE id = ?', (id,)
         ).fetchone()
@@ -108,38 +122,32 @@ class Category:
 
     @staticmethod
     def save(category):
-        conn = get_db_connection()
-        
-        if category.id:
-            # Update existing category
-            conn.execute('''
-                UPDATE categories SET 
-                name = ?, slug = ?, description = ?, image_url = ?
-                WHERE id = ?
-            ''', (
-                category.name, category.slug, category.description, 
-                category.image_url, category.id
-            ))
-        else:
-            # Create new category
-            cursor = conn.execute('''
-                INSERT INTO categories (name, slug, description, image_url)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                category.name, category.slug, category.description, category.image_url
-            ))
-            category.id = cursor.lastrowid
-            
-        conn.commit()
-        conn.close()
+        with writer() as conn:
+            if category.id:
+                # Update existing category
+                conn.execute('''
+                    UPDATE categories SET 
+                    name = ?, slug = ?, description = ?, image_url = ?
+                    WHERE id = ?
+                ''', (
+                    category.name, category.slug, category.description, 
+                    category.image_url, category.id
+                ))
+            else:
+                # Create new category
+                cursor = conn.execute('''
+                    INSERT INTO categories (name, slug, description, image_url)
+                    VALUES (?, ?, ?, ?)
+                ''', (
+                    category.name, category.slug, category.description, category.image_url
+                ))
+                category.id = cursor.lastrowid
         return category
         
     @staticmethod
     def delete(category_id):
-        conn = get_db_connection()
-        conn.execute('DELETE FROM categories WHERE id = ?', (category_id,))
-        conn.commit()
-        conn.close()
+        with writer() as conn:
+            conn.execute('DELETE FROM categories WHERE id = ?', (category_id,))
 
     def to_dict(self):
         return {
@@ -160,14 +168,14 @@ class ProductType:
 
     @staticmethod
     def query_all():
-        conn = get_db_connection()
+        conn = get_read_connection()
         types = conn.execute('SELECT * FROM product_types').fetchall()
         conn.close()
         return [ProductType(**dict(product_type)) for product_type in types]
         
     @staticmethod
     def filter_by(slug=None, category_id=None):
-        conn = get_db_connection()
+        conn = get_read_connection()
         query = 'SELECT * FROM product_types WHERE 1=1'
         params = []
         
@@ -188,7 +196,7 @@ class ProductType:
     def get(id):
         if id is None:
             return None
-        conn = get_db_connection()
+        conn = get_read_connection()
         product_type = conn.execute(
             'SELECT * FROM product_types WHERE id = ?', (id,)
         ).fetchone()
@@ -197,38 +205,32 @@ class ProductType:
         
     @staticmethod
     def save(product_type):
-        conn = get_db_connection()
-        
-        if product_type.id:
-            # Update existing product type
-            conn.execute('''
-                UPDATE product_types SET 
-                name = ?, slug = ?, description = ?, category_id = ?
-                WHERE id = ?
-            ''', (
-                product_type.name, product_type.slug, product_type.description, 
-                product_type.category_id, product_type.id
-            ))
-        else:
-            # Create new product type
-            cursor = conn.execute('''
-                INSERT INTO product_types (name, slug, description, category_id)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                product_type.name, product_type.slug, product_type.description, product_type.category_id
-            ))
-            product_type.id = cursor.lastrowid
-            
-        conn.commit()
-        conn.close()
+        with writer() as conn:
+            if product_type.id:
+                # Update existing product type
+                conn.execute('''
+                    UPDATE product_types SET 
+                    name = ?, slug = ?, description = ?, category_id = ?
+                    WHERE id = ?
+                ''', (
+                    product_type.name, product_type.slug, product_type.description, 
+                    product_type.category_id, product_type.id
+                ))
+            else:
+                # Create new product type
+                cursor = conn.execute('''
+                    INSERT INTO product_types (name, slug, description, category_id)
+                    VALUES (?, ?, ?, ?)
+                ''', (
+                    product_type.name, product_type.slug, product_type.description, product_type.category_id
+                ))
+                product_type.id = cursor.lastrowid
         return product_type
         
     @staticmethod
     def delete(product_type_id):
-        conn = get_db_connection()
-        conn.execute('DELETE FROM product_types WHERE id = ?', (product_type_id,))
-        conn.commit()
-        conn.close()
+        with writer() as conn:
+            conn.execute('DELETE FROM product_types WHERE id = ?', (product_type_id,))
 
     def to_dict(self):
         return {
@@ -260,14 +262,14 @@ class Product:
         
     @staticmethod
     def query_all():
-        conn = get_db_connection()
+        conn = get_read_connection()
         products = conn.execute('SELECT * FROM products').fetchall()
         conn.close()
         return [Product(**dict(product)) for product in products]
         
     @staticmethod
     def filter_by(product_id=None, category_id=None, product_type_id=None):
-        conn = get_db_connection()
+        conn = get_read_connection()
         query = 'SELECT * FROM products WHERE 1=1'
         params = []
         
@@ -288,9 +290,292 @@ class Product:
         
         return [Product(**dict(product)) for product in products]
         
+    @staticmethod
+    def iter_lastmod(category_id, offset=0, limit=-1):
+        """Yield (product_id, updated_at) for a category in id order, straight from the cursor"""
+        conn = get_read_connection()
+        try:
+            yield from conn.execute(
+                'SELECT product_id, updated_at FROM products WHERE category_id = ? ORDER BY id LIMIT ? OFFSET ?',
+                (category_id, limit, offset)
+            )
+        finally:
+            conn.close()
+        
+    @staticmethod
+    def category_summary(category_id=None):
+        """{category_id: (product count, latest updated_at)} in one grouped query"""
+        query = 'SELECT category_id, COUNT(*) AS count, MAX(updated_at) AS updated_at FROM products'
+        params = []
+        if category_id:
+            query += ' WHERE category_id = ?'
+            params.append(category_id)
+        conn = get_read_connection()
+        rows = conn.execute(query + ' GROUP BY category_id', params).fetchall()
+        conn.close()
+        return {row['category_id']: (row['count'], row['updated_at']) for row in rows}
+        
+    @staticmethod
+    def related(id, limit=4):
+        """The products most similar to product `id`, best first (see related_products.py)"""
+        conn = get_read_connection()
+        try:
+            products = conn.execute('''
+                SELECT p.* FROM related_products r JOIN products p ON p.id = r.related_id
+                WHERE r.product_id = ? ORDER BY r.rank LIMIT ?
+            ''', (id, limit)).fetchall()
+        except sqlite3.OperationalError:
+            # The snapshot predates the table; nothing has been computed yet
+            return []
+        finally:
+            conn.close()
+        return [Product(**dict(product)) for product in products]
+        
+    @staticmethod
+    def get_many(product_ids, fields=None):
+        """The products with these product_ids, in the order given; unknown ids are skipped.
+
+        Looked up with one `IN (...)` query per LOOKUP_CHUNK_SIZE ids, all on
+        one connection. `fields` limits the columns read, as in listing().
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        columns = Product._select_columns(fields and ('product_id', *fields))
+        found = {}
+        conn = get_read_connection()
+        try:
+            for start in range(0, len(product_ids), LOOKUP_CHUNK_SIZE):
+                chunk = product_ids[start:start + LOOKUP_CHUNK_SIZE]
+                placeholders = ', '.join('?' * len(chunk))
+                for row in conn.execute(
+                    f'SELECT {columns} FROM products p WHERE p.product_id IN ({placeholders})', chunk
+                ):
+                    found[row['product_id']] = Product(**dict(row))
+        finally:
+            conn.close()
+        return [found[product_id] for product_id in product_ids if product_id in found]
+        
+    @staticmethod
+    def search(term, price_min=None, price_max=None, sort=None, after=None, limit=None):
+        """Products whose name, description or product_id contains `term`"""
+        pattern = f'%{term}%'
+        conditions, params = Product._price_conditions(price_min, price_max)
+        conditions.insert(0, '(p.name LIKE ? OR p.description LIKE ? OR p.product_id LIKE ?)')
+        params[:0] = [pattern, pattern, pattern]
+        return Product.listing(' AND '.join(conditions), params, sort, after, limit)
+        
+    @staticmethod
+    def filter_by_price(price_min=None, price_max=None, sort=None, after=None, limit=None, fields=None):
+        """Every product in the price range, for the API"""
+        conditions, params = Product._price_conditions(price_min, price_max)
+        return Product.listing(' AND '.join(conditions) or '1=1', params, sort, after, limit, fields)
+        
+    @staticmethod
+    def _price_conditions(price_min=None, price_max=None):
+        # Products priced on request (NULL) never match a price range
+        conditions = []
+        params = []
+        if price_min is not None:
+            conditions.append('p.price >= ?')
+            params.append(price_min)
+        if price_max is not None:
+            conditions.append('p.price <= ?')
+            params.append(price_max)
+        return conditions, params
+        
+    @staticmethod
+    def listing(where, params, sort=None, after=None, limit=None, fields=None):
+        """One keyset page of the products matching `where` (over `products p`).
+
+        `sort` is a PRODUCT_SORTS key, or None for id order. `after` is the
+        `(value, id)` position of the last product on the previous page (see
+        page_cursor()), so a deep page costs the same index range scan as
+        the first. Products without a value for the sort column, such as
+        those priced on request, come after all the others in id order.
+        
+        `fields` limits the columns read to those PRODUCT_FIELDS (plus id,
+        updated_at and the sort column); the others are left as None.
+        """
+        columns = Product._select_columns(fields, sort)
+        conn = get_read_connection()
+        try:
+            if sort not in PRODUCT_SORTS:
+                query = f'SELECT {columns} FROM products p WHERE {where}'
+                query_params = list(params)
+                if after:
+                    query += ' AND p.id > ?'
+                    query_params.append(after[1])
+                query += ' ORDER BY p.id'
+                if limit is not None:
+                    query += ' LIMIT ?'
+                    query_params.append(limit)
+                rows = conn.execute(query, query_params).fetchall()
+                return [Product(**dict(product)) for product in rows]
+            
+            column, descending = PRODUCT_SORTS[sort]
+            rows = []
+            # Products with a value, along the (category_id, column) index
+            if not after or after[0] is not None:
+                query = f'SELECT {columns} FROM products p WHERE {where} AND p.{column} IS NOT NULL'
+                query_params = list(params)
+                if after:
+                    query += f' AND (p.{column}, p.id) {"<" if descending else ">"} (?, ?)'
+                    query_params.extend(after)
+                direction = 'DESC' if descending else 'ASC'
+                query += f' ORDER BY p.{column} {direction}, p.id {direction}'
+                if limit is not None:
+                    query += ' LIMIT ?'
+                    query_params.append(limit)
+                rows = conn.execute(query, query_params).fetchall()
+            # Then the ones without, if the page is not full yet
+            if limit is None or len(rows) < limit:
+                query = f'SELECT {columns} FROM products p WHERE {where} AND p.{column} IS NULL'
+                query_params = list(params)
+                if after and after[0] is None:
+                    query += ' AND p.id > ?'
+                    query_params.append(after[1])
+                query += ' ORDER BY p.id'
+                if limit is not None:
+                    query += ' LIMIT ?'
+                    query_params.append(limit - len(rows))
+                rows += conn.execute(query, query_params).fetchall()
+            return [Product(**dict(product)) for product in rows]
+        finally:
+            conn.close()
+        
+    @staticmethod
+    def _select_columns(fields=None, sort=None):
+        if fields is None:
+            return 'p.*'
+        # id and updated_at key the JSON cache; the sort column makes the cursor
+        wanted = {'id', 'updated_at', *fields}
+        if sort in PRODUCT_SORTS:
+            wanted.add(PRODUCT_SORTS[sort][0])
+        return ', '.join(f'p.{field}' for field in PRODUCT_FIELDS if field in wanted)
+        
+    @staticmethod
+    def sort_page(products, sort=None, after=None, limit=None):
+        """Order, cursor and limit already-loaded products exactly like listing()"""
+        if sort not in PRODUCT_SORTS:
+            ordered = sorted(products, key=lambda product: product.id)
+            if after:
+                ordered = [product for product in ordered if product.id > after[1]]
+            return ordered if limit is None else ordered[:limit]
+        
+        column, descending = PRODUCT_SORTS[sort]
+        valued = [product for product in products if getattr(product, column) is not None]
+        valued.sort(key=lambda product: (getattr(product, column), product.id), reverse=descending)
+        missing = sorted((product for product in products if getattr(product, column) is None),
+                         key=lambda product: product.id)
+        if after:
+            if after[0] is None:
+                valued = []
+                missing = [product for product in missing if product.id > after[1]]
+            elif descending:
+                valued = [product for product in valued if (getattr(product, column), product.id) < tuple(after)]
+            else:
+                valued = [product for product in valued if (getattr(product, column), product.id) > tuple(after)]
+        ordered = valued + missing
+        return ordered if limit is None else ordered[:limit]
+        
+    @staticmethod
+    def page_cursor(product, sort=None):
+        """Cursor for the listing page after `product`: "<value>|<id>", or "<id>" in id order"""
+        if sort not in PRODUCT_SORTS:
+            return str(product.id)
+        value = getattr(product, PRODUCT_SORTS[sort][0])
+        return f'{"" if value is None else value}|{product.id}'
+        
+    @staticmethod
+    def parse_page_cursor(cursor, sort=None):
+        """The `(value, id)` position encoded by page_cursor(), or None if malformed"""
+        if not cursor:
+            return None
+        if sort not in PRODUCT_SORTS:
+            return (None, int(cursor)) if cursor.isdigit() else None
+        value, _, product_id = cursor.rpartition('|')
+        if not product_id.isdigit():
+            return None
+        if value == '':
+            return (None, int(product_id))
+        if sort == 'price':
+            try:
+                value = float(value)
+            except ValueError:
+                return None
+        return (value, int(product_id))
+        
+    @staticmethod
+    def _facet_conditions(category_id, product_type_id=None, attributes=None, price_min=None, price_max=None):
+        conditions, params = Product._price_conditions(price_min, price_max)
+        conditions.insert(0, 'p.category_id = ?')
+        params.insert(0, category_id)
+        if product_type_id:
+            conditions.append('p.product_type_id = ?')
+            params.append(product_type_id)
+        for name, value in (attributes or {}).items():
+            conditions.append('p.id IN (SELECT product_id FROM product_attributes WHERE name = ? AND value = ?)')
+            params.extend([name, value])
+        return ' AND '.join(conditions), params
+        
+    @staticmethod
+    def filter_by_facets(category_id, product_type_id=None, attributes=None, price_min=None, price_max=None,
+                         sort=None, after=None, limit=None):
+        """Products of a category with every `attributes` name/value pair, as a listing() page"""
+        where, params = Product._facet_conditions(category_id, product_type_id, attributes, price_min, price_max)
+        return Product.listing(where, params, sort, after, limit)
+        
+    @staticmethod
+    def facet_counts(category_id, product_type_id=None, attributes=None, names=(), price_min=None, price_max=None):
+        """Facet counts for a category page, in one grouped query.
+
+        Returns `{'types': {product_type_id: count}, 'attributes': {name:
+        [(value, count), ...]}}`. Each facet is counted over the products
+        matching every filter except its own, so the other values of a
+        chosen type or attribute can still be picked.
+        """
+        attributes = attributes or {}
+        type_where, type_params = Product._facet_conditions(category_id, None, attributes, price_min, price_max)
+        query = f'''
+            SELECT 'type' AS kind, NULL AS name, p.product_type_id AS value, COUNT(*) AS count
+            FROM products p WHERE {type_where}
+            GROUP BY p.product_type_id
+        '''
+        query_params = list(type_params)
+        # Facets without a filter of their own share one branch; each filtered one gets its own
+        unfiltered = [name for name in names if name not in attributes]
+        branches = [(unfiltered, attributes)] if unfiltered else []
+        branches += [([name], {key: value for key, value in attributes.items() if key != name})
+                     for name in names if name in attributes]
+        for branch_names, branch_attributes in branches:
+            where, params = Product._facet_conditions(
+                category_id, product_type_id, branch_attributes, price_min, price_max
+            )
+            placeholders = ', '.join('?' * len(branch_names))
+            query += f'''
+                UNION ALL
+                SELECT 'attribute', a.name, a.value, COUNT(*)
+                FROM products p JOIN product_attributes a ON a.product_id = p.id
+                WHERE a.name IN ({placeholders}) AND {where}
+                GROUP BY a.name, a.value
+            '''
+            query_params += list(branch_names) + params
+        conn = get_read_connection()
+        rows = conn.execute(query, query_params).fetchall()
+        conn.close()
+        
+        counts = {'types': {}, 'attributes': {name: [] for name in names}}
+        for row in rows:
+            if row['kind'] == 'type':
+                counts['types'][row['value']] = row['count']
+            else:
+                counts['attributes'][row['name']].append((row['value'], row['count']))
+        for values in counts['attributes'].values():
+            values.sort()
+        return counts
+        
     @staticmethod
     def filter(condition):
-        conn = get_db_connection()
+        conn = get_read_connection()
         query = 'SELECT * FROM products WHERE ' + condition
         products = conn.execute(query).fetchall()
         conn.close()
@@ -298,47 +583,114 @@ class Product:
     
     @staticmethod
     def save(product):
-        conn = get_db_connection()
-        now = datetime.datetime.now().isoformat()
+        with writer() as conn:
+            now = datetime.datetime.now().isoformat()
         
-        if product.id:
-            # Update existing product
-            conn.execute('''
-                UPDATE products SET 
-                product_id = ?, name = ?, description = ?, category_id = ?,
-                product_type_id = ?, image_url = ?, image_urls = ?, price = ?,
-                specifications = ?, features = ?, updated_at = ?
-                WHERE id = ?
-            ''', (
-                product.product_id, product.name, product.description, product.category_id,
-                product.product_type_id, product.image_url, product.image_urls, product.price,
-                product.specifications, product.features, now, product.id
-            ))
-        else:
-            # Create new product
-            cursor = conn.execute('''
-                INSERT INTO products (
-                    product_id, name, description, category_id, product_type_id,
-                    image_url, image_urls, price, specifications, features,
-                    created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                product.product_id, product.name, product.description, product.category_id,
-                product.product_type_id, product.image_url, product.image_urls, product.price,
-                product.specifications, product.features, now, now
-            ))
-            product.id = cursor.lastrowid
-            
-        conn.commit()
-        conn.close()
+            if product.id:
+                # A changed product_id deletes the old one as far as the change feed is concerned
+                old = conn.execute('SELECT product_id FROM products WHERE id = ?', (product.id,)).fetchone()
+                
+                # Update existing product
+                conn.execute('''
+                    UPDATE products SET 
+                    product_id = ?, name = ?, description = ?, category_id = ?,
+                    product_type_id = ?, image_url = ?, image_urls = ?, price = ?,
+                    specifications = ?, features = ?, updated_at = ?
+                    WHERE id = ?
+                ''', (
+                    product.product_id, product.name, product.description, product.category_id,
+                    product.product_type_id, product.image_url, product.image_urls, product.price,
+                    product.specifications, product.features, now, product.id
+                ))
+                if old and old['product_id'] != product.product_id:
+                    Product._tombstone(conn, old['product_id'], product.id, now)
+            else:
+                # Create new product
+                cursor = conn.execute('''
+                    INSERT INTO products (
+                        product_id, name, description, category_id, product_type_id,
+                        image_url, image_urls, price, specifications, features,
+                        created_at, updated_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    product.product_id, product.name, product.description, product.category_id,
+                    product.product_type_id, product.image_url, product.image_urls, product.price,
+                    product.specifications, product.features, now, now
+                ))
+                product.id = cursor.lastrowid
         return product
         
     @staticmethod
     def delete(product_id):
-        conn = get_db_connection()
-        conn.execute('DELETE FROM products WHERE product_id = ?', (product_id,))
-        conn.commit()
-        conn.close()
+        with writer() as conn:
+            row = conn.execute('SELECT id FROM products WHERE product_id = ?', (product_id,)).fetchone()
+            conn.execute('DELETE FROM products WHERE product_id = ?', (product_id,))
+            if row:
+                Product._tombstone(conn, product_id, row['id'], datetime.datetime.now().isoformat())
+        
+    @staticmethod
+    def _tombstone(conn, product_id, id, deleted_at):
+        # Runs after the write, so the triggers have already bumped the
+        # 'catalog' generation this transaction commits as
+        conn.execute('''
+            INSERT INTO product_tombstones (product_id, id, change_seq, deleted_at)
+            SELECT ?, ?, generation, ? FROM catalog_generations WHERE scope = 'catalog'
+            ON CONFLICT (product_id) DO UPDATE SET
+                id = excluded.id, change_seq = excluded.change_seq, deleted_at = excluded.deleted_at
+        ''', (product_id, id, deleted_at))
+        
+    @staticmethod
+    def changes(since=None, limit=500):
+        """Products upserted or deleted after change sequence `since`, in commit order.
+
+        The change sequence is the 'catalog' generation, which the triggers
+        bump inside each write transaction, so unlike updated_at it follows
+        commit order across processes. Upserts come from the 'product:'
+        scope rows (one per product, at its latest change) and deletions
+        from product_tombstones. Returns `(changes, cursor, has_more)`:
+        `changes` is a list of `(change_seq, 'upsert', Product)` and
+        `(change_seq, 'delete', tombstone dict)` tuples, and `cursor` is the
+        `since` to pass next. Without `since` the feed starts at the
+        beginning.
+        """
+        since = -1 if since is None else since
+        conn = get_read_connection()
+        try:
+            # One read transaction, so both queries see the same commits
+            conn.execute('BEGIN')
+            upserts = conn.execute('''
+                SELECT g.generation AS change_seq, p.*
+                FROM catalog_generations g JOIN products p ON p.product_id = substr(g.scope, 9)
+                WHERE g.generation > ? AND g.scope LIKE 'product:%'
+                ORDER BY g.generation LIMIT ?
+            ''', (since, limit + 1)).fetchall()
+            deletes = conn.execute(
+                'SELECT * FROM product_tombstones WHERE change_seq > ? ORDER BY change_seq LIMIT ?',
+                (since, limit + 1)
+            ).fetchall()
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        
+        merged = list(heapq.merge(
+            ((row['change_seq'], 'delete', dict(row)) for row in deletes),
+            ((row['change_seq'], 'upsert', row) for row in upserts),
+            key=lambda change: (change[0], change[1]),
+        ))
+        # A renamed product is deleted and upserted at the same sequence:
+        # never end a page between changes that share one
+        end = min(limit, len(merged))
+        while 0 < end < len(merged) and merged[end][0] == merged[end - 1][0]:
+            end += 1
+        page = []
+        for change_seq, op, row in merged[:end]:
+            if op == 'upsert':
+                row = dict(row)
+                del row['change_seq']
+                row = Product(**row)
+            page.append((change_seq, op, row))
+        cursor = page[-1][0] if page else since
+        return page, (None if cursor < 0 else cursor), end < len(merged)
         
     def get_specifications(self):
         if self.specifications:
@@ -350,12 +702,36 @@ class Product:
             return json.loads(self.features)
         return []
     
+    def get_attributes(self):
+        """Scalar specifications as text, as stored in product_attributes"""
+        specifications = self.get_specifications()
+        if not isinstance(specifications, dict):
+            return {}
+        attributes = {}
+        for name, value in specifications.items():
+            if isinstance(value, bool):
+                attributes[name] = 'true' if value else 'false'
+            elif value is not None and not isinstance(value, (dict, list)):
+                attributes[name] = str(value)
+        return attributes
+    
     def get_image_urls(self):
         if self.image_urls:
             return json.loads(self.image_urls)
         return []
     
-    def to_dict(self):
+    def to_dict(self, fields=None):
+        if fields is not None:
+            # Only the requested fields, so unrequested JSON columns are never parsed
+            parsed = {
+                'image_urls': self.get_image_urls,
+                'specifications': self.get_specifications,
+                'features': self.get_features,
+            }
+            return {
+                field: parsed[field]() if field in parsed else getattr(self, field)
+                for field in fields
+            }
         return {
             'id': self.id,
             'product_id': self.product_id,
@@ -389,6 +765,70 @@ class ContactMessage:
         conn.close()
         return [ContactMessage(**dict(msg)) for msg in messages]
     
+    @staticmethod
+    def page(before=None, search=None, limit=25):
+        """Return up to `limit` messages older than the `before` cursor, newest first.
+
+        `before` is a `(created_at, id)` pair taken from the last message of the
+        previous page, so every page is an index range scan however deep it is.
+        `search` is matched against the full-text index over subject, name,
+        email and message.
+        """
+        query = 'SELECT * FROM contacts WHERE 1=1'
+        params = []
+        
+        if search:
+            match = ContactMessage.match_expression(search)
+            if match:
+                query += ' AND id IN (SELECT rowid FROM contacts_fts WHERE contacts_fts MATCH ?)'
+                params.append(match)
+        
+        if before:
+            query += ' AND (created_at, id) < (?, ?)'
+            params.extend(before)
+            
+        query += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+        params.append(limit)
+        
+        conn = get_db_connection()
+        messages = conn.execute(query, params).fetchall()
+        conn.close()
+        return [ContactMessage(**dict(msg)) for msg in messages]
+    
+    @staticmethod
+    def match_expression(search):
+        """Turn free text into an FTS5 query: every word must match as a prefix"""
+        terms = [term.replace('"', '""') for term in search.split()]
+        return ' '.join(f'"{term}"*' for term in terms if term)
+    
+    @staticmethod
+    def archive_older_than(days, batch_size=500):
+        """Move messages older than `days` into contacts_archive.
+
+        Works in batches of `batch_size`, each in its own short transaction, so
+        the inbox is never locked for long. Returns the number of messages moved.
+        """
+        cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        moved = 0
+        while True:
+            with writer() as conn:
+                ids = [row['id'] for row in conn.execute(
+                    'SELECT id FROM contacts WHERE created_at < ? ORDER BY created_at, id LIMIT ?',
+                    (cutoff, batch_size)
+                )]
+                if not ids:
+                    break
+                placeholders = ', '.join('?' * len(ids))
+                conn.execute(f'''
+                    INSERT OR REPLACE INTO contacts_archive
+                        (id, name, email, phone, subject, message, created_at)
+                    SELECT id, name, email, phone, subject, message, created_at
+                    FROM contacts WHERE id IN ({placeholders})
+                ''', ids)
+                conn.execute(f'DELETE FROM contacts WHERE id IN ({placeholders})', ids)
+            moved += len(ids)
+        return moved
+    
     @staticmethod
     def get(id):
         if id is None:
@@ -400,10 +840,8 @@ class ContactMessage:
     
     @staticmethod
     def delete(id):
-        conn = get_db_connection()
-        conn.execute('DELETE FROM contacts WHERE id = ?', (id,))
-        conn.commit()
-        conn.close()
+        with writer() as conn:
+            conn.execute('DELETE FROM contacts WHERE id = ?', (id,))
     
     def to_dict(self):
         return {
@@ -0,0 +1,304 @@
+from models.db import get_db_connection
+
+# Base tables. Every statement is idempotent, so the schema can be applied
+# to a fresh file or to an existing database on every start.
+TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        slug TEXT NOT NULL UNIQUE,
+        description TEXT,
+        image_url TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS product_types (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        slug TEXT NOT NULL,
+        description TEXT,
+        category_id INTEGER,
+        FOREIGN KEY (category_id) REFERENCES categories (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id TEXT NOT NULL UNIQUE,
+        name TEXT NOT NULL,
+        description TEXT,
+        category_id INTEGER,
+        product_type_id INTEGER,
+        image_url TEXT,
+        image_urls TEXT,
+        price REAL,
+        specifications TEXT,
+        features TEXT,
+        created_at TEXT,
+        updated_at TEXT,
+        FOREIGN KEY (category_id) REFERENCES categories (id),
+        FOREIGN KEY (product_type_id) REFERENCES product_types (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS admin_users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        password_hash TEXT NOT NULL,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL UNIQUE,
+        is_active BOOLEAN NOT NULL DEFAULT 1,
+        created_at TEXT
+    )
+    ''',
+    # Contacts table (used by ContactMessage)
+    '''
+    CREATE TABLE IF NOT EXISTS contacts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        phone TEXT,
+        subject TEXT NOT NULL,
+        message TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    # Scalar specification values of each product, for faceted filtering.
+    # Filled from products.specifications by triggers (see ATTRIBUTE_TRIGGERS)
+    '''
+    CREATE TABLE IF NOT EXISTS product_attributes (
+        product_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        value TEXT NOT NULL,
+        PRIMARY KEY (product_id, name)
+    ) WITHOUT ROWID
+    ''',
+    # Catalog generation counters (see catalog_generation.py). The
+    # 'catalog' row counts every catalog change; the other rows record the
+    # 'catalog' value at which their scope last changed
+    '''
+    CREATE TABLE IF NOT EXISTS catalog_generations (
+        scope TEXT PRIMARY KEY,
+        generation INTEGER NOT NULL
+    )
+    ''',
+    "INSERT OR IGNORE INTO catalog_generations (scope, generation) VALUES ('catalog', 0)",
+    # Deleted products, for the change feed (see Product.changes). change_seq
+    # is the 'catalog' generation of the transaction that deleted the product
+    '''
+    CREATE TABLE IF NOT EXISTS product_tombstones (
+        product_id TEXT PRIMARY KEY,
+        id INTEGER,
+        change_seq INTEGER NOT NULL,
+        deleted_at TEXT
+    )
+    ''',
+    # Nearest neighbours of each product, written by the related products
+    # job (see related_products.py); run_id is the run that wrote the row
+    '''
+    CREATE TABLE IF NOT EXISTS related_products (
+        product_id INTEGER NOT NULL,
+        rank INTEGER NOT NULL,
+        related_id INTEGER NOT NULL,
+        score REAL NOT NULL,
+        run_id INTEGER NOT NULL,
+        PRIMARY KEY (product_id, rank)
+    ) WITHOUT ROWID
+    ''',
+    # One row per related products run; the next run starts from change_seq
+    '''
+    CREATE TABLE IF NOT EXISTS related_product_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        change_seq INTEGER,
+        products INTEGER NOT NULL,
+        seconds REAL NOT NULL,
+        finished_at TEXT NOT NULL
+    )
+    ''',
+    # Messages moved out of the inbox by the retention job
+    '''
+    CREATE TABLE IF NOT EXISTS contacts_archive (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        phone TEXT,
+        subject TEXT NOT NULL,
+        message TEXT NOT NULL,
+        created_at TIMESTAMP,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+]
+
+INDEXES = [
+    # Keyset pagination of the admin inbox, newest first
+    'CREATE INDEX IF NOT EXISTS idx_contacts_created_at ON contacts (created_at, id)',
+    'CREATE INDEX IF NOT EXISTS idx_contacts_archive_created_at ON contacts_archive (created_at, id)',
+    # Category pages and their facet counts
+    'CREATE INDEX IF NOT EXISTS idx_products_category ON products (category_id, product_type_id)',
+    # Sorted and price-filtered listings (see Product.listing); the implicit
+    # trailing rowid makes each a (column, id) keyset index
+    'CREATE INDEX IF NOT EXISTS idx_products_category_price ON products (category_id, price)',
+    'CREATE INDEX IF NOT EXISTS idx_products_category_name ON products (category_id, name)',
+    'CREATE INDEX IF NOT EXISTS idx_products_category_updated_at ON products (category_id, updated_at)',
+    'CREATE INDEX IF NOT EXISTS idx_products_price ON products (price)',
+    'CREATE INDEX IF NOT EXISTS idx_products_name ON products (name)',
+    'CREATE INDEX IF NOT EXISTS idx_products_updated_at ON products (updated_at)',
+    # Facet filters: products with a given attribute value
+    'CREATE INDEX IF NOT EXISTS idx_product_attributes_value ON product_attributes (name, value, product_id)',
+    # Scopes changed since a given generation, also the change feed's upserts
+    'CREATE INDEX IF NOT EXISTS idx_catalog_generations_generation ON catalog_generations (generation)',
+    # The change feed's deletions
+    'CREATE INDEX IF NOT EXISTS idx_product_tombstones_change_seq ON product_tombstones (change_seq)',
+]
+
+# Full-text index over the inbox, kept in sync with contacts by triggers
+CONTACTS_FTS = '''
+    CREATE VIRTUAL TABLE contacts_fts USING fts5(
+        subject, name, email, message,
+        content='contacts', content_rowid='id'
+    )
+'''
+
+CONTACTS_FTS_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_insert AFTER INSERT ON contacts BEGIN
+        INSERT INTO contacts_fts (rowid, subject, name, email, message)
+        VALUES (new.id, new.subject, new.name, new.email, new.message);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_delete AFTER DELETE ON contacts BEGIN
+        INSERT INTO contacts_fts (contacts_fts, rowid, subject, name, email, message)
+        VALUES ('delete', old.id, old.subject, old.name, old.email, old.message);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_update AFTER UPDATE ON contacts BEGIN
+        INSERT INTO contacts_fts (contacts_fts, rowid, subject, name, email, message)
+        VALUES ('delete', old.id, old.subject, old.name, old.email, old.message);
+        INSERT INTO contacts_fts (rowid, subject, name, email, message)
+        VALUES (new.id, new.subject, new.name, new.email, new.message);
+    END
+    ''',
+]
+
+
+# Scalar top-level specification values as text; booleans become
+# 'true'/'false' (see Product.get_attributes for the Python side)
+ATTRIBUTE_ROWS = """
+    SELECT {id}, key,
+           CASE type WHEN 'true' THEN 'true' WHEN 'false' THEN 'false' ELSE CAST(value AS TEXT) END
+    FROM json_each(CASE WHEN json_valid({specs}) AND json_type({specs}) = 'object' THEN {specs} ELSE '{{}}' END)
+    WHERE type NOT IN ('object', 'array', 'null')
+"""
+
+ATTRIBUTE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_attributes_insert AFTER INSERT ON products BEGIN
+        INSERT INTO product_attributes (product_id, name, value)
+        {ATTRIBUTE_ROWS.format(id='new.id', specs='new.specifications')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_attributes_update AFTER UPDATE OF specifications ON products BEGIN
+        DELETE FROM product_attributes WHERE product_id = old.id;
+        INSERT INTO product_attributes (product_id, name, value)
+        {ATTRIBUTE_ROWS.format(id='new.id', specs='new.specifications')};
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_attributes_delete AFTER DELETE ON products BEGIN
+        DELETE FROM product_attributes WHERE product_id = old.id;
+    END
+    """,
+]
+
+# Bump the 'catalog' generation, then stamp each scope with the new value
+BUMP_CATALOG = "UPDATE catalog_generations SET generation = generation + 1 WHERE scope = 'catalog';"
+STAMP_SCOPE = """
+        INSERT INTO catalog_generations (scope, generation)
+        SELECT {scope}, generation FROM catalog_generations
+        WHERE scope = 'catalog' AND {scope} IS NOT NULL
+        ON CONFLICT (scope) DO UPDATE SET generation = excluded.generation;"""
+
+
+def _generation_trigger(name, event, table, scopes):
+    body = BUMP_CATALOG + ''.join(STAMP_SCOPE.format(scope=scope) for scope in scopes)
+    return f"""
+    CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table} BEGIN
+        {body}
+    END
+    """
+
+
+# Every catalog write bumps the generation counters, whichever code path
+# (models, API, scripts) made it
+CATALOG_GENERATION_TRIGGERS = [
+    _generation_trigger('products_generation_insert', 'INSERT', 'products', [
+        "'category:' || new.category_id", "'product:' || new.product_id"]),
+    _generation_trigger('products_generation_update', 'UPDATE', 'products', [
+        "'category:' || old.category_id", "'category:' || new.category_id",
+        "'product:' || old.product_id", "'product:' || new.product_id"]),
+    _generation_trigger('products_generation_delete', 'DELETE', 'products', [
+        "'category:' || old.category_id", "'product:' || old.product_id"]),
+    _generation_trigger('categories_generation_insert', 'INSERT', 'categories', ["'category:' || new.id"]),
+    _generation_trigger('categories_generation_update', 'UPDATE', 'categories', ["'category:' || new.id"]),
+    _generation_trigger('categories_generation_delete', 'DELETE', 'categories', ["'category:' || old.id"]),
+    _generation_trigger('product_types_generation_insert', 'INSERT', 'product_types', [
+        "'category:' || new.category_id"]),
+    _generation_trigger('product_types_generation_update', 'UPDATE', 'product_types', [
+        "'category:' || old.category_id", "'category:' || new.category_id"]),
+    _generation_trigger('product_types_generation_delete', 'DELETE', 'product_types', [
+        "'category:' || old.category_id"]),
+]
+
+
+def _table_exists(conn, name):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def create_schema(conn):
+    """Create any missing tables, indexes and triggers on an open connection"""
+    backfill_attributes = not _table_exists(conn, 'product_attributes')
+    backfill_changes = not _table_exists(conn, 'product_tombstones')
+    for statement in TABLES + INDEXES:
+        conn.execute(statement)
+
+    if backfill_attributes:
+        # Extract the attributes of the products stored before the table existed
+        conn.execute(
+            'INSERT OR REPLACE INTO product_attributes (product_id, name, value) '
+            + ATTRIBUTE_ROWS.format(id='products.id', specs='products.specifications').replace(
+                'FROM json_each', 'FROM products, json_each')
+        )
+
+    if backfill_changes:
+        # Give products stored before the change feed existed a 'product:'
+        # scope at generation 0, so a feed read from the start includes them
+        conn.execute('''
+            INSERT INTO catalog_generations (scope, generation)
+            SELECT 'product:' || product_id, 0 FROM products WHERE true
+            ON CONFLICT (scope) DO NOTHING
+        ''')
+
+    if not _table_exists(conn, 'contacts_fts'):
+        conn.execute(CONTACTS_FTS)
+        # Index the messages that were stored before the FTS table existed
+        conn.execute("INSERT INTO contacts_fts (contacts_fts) VALUES ('rebuild')")
+    for statement in CONTACTS_FTS_TRIGGERS + ATTRIBUTE_TRIGGERS + CATALOG_GENERATION_TRIGGERS:
+        conn.execute(statement)
+
+
+def migrate():
+    """Bring the database up to the current schema"""
+    conn = get_db_connection()
+    try:
+        create_schema(conn)
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,78 @@
+import collections
+import threading
+
+from flask import current_app, json
+
+
+class ProductJSONCache:
+    """Bounded LRU of each product's encoded JSON, keyed by (id, updated_at, fields).
+
+    Product.save() stamps a new updated_at on every change, so a changed
+    product simply misses and its old entry ages out; nothing has to be
+    invalidated. List endpoints join the cached fragments into the response
+    body instead of parsing the JSON columns and re-encoding every product.
+    The bytes are exactly what jsonify() would have produced.
+    """
+
+    def __init__(self, app=None, max_entries=20000):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PRODUCT_JSON_CACHE_SIZE', 20000)
+        self.max_entries = app.config['PRODUCT_JSON_CACHE_SIZE']
+        self.clear()
+        app.extensions['product_json'] = self
+
+    def encode(self, product, fields=None):
+        """The product's to_dict(fields) as compact JSON bytes"""
+        key = (product.id, product.updated_at, fields)
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+
+        # Same separators and key order as jsonify() outside debug mode
+        fragment = json.dumps(product.to_dict(fields), separators=(',', ':')).encode('utf-8')
+        if self.max_entries:
+            with self._lock:
+                self._entries[key] = fragment
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return fragment
+
+    def encode_list(self, products, fields=None):
+        """A JSON array of the products, as bytes"""
+        return b'[' + b','.join(self.encode(product, fields) for product in products) + b']\n'
+
+    def response(self, products, fields=None):
+        """Drop-in for jsonify([product.to_dict(fields) for product in products])"""
+        return current_app.response_class(
+            self.encode_list(products, fields), mimetype=current_app.config['JSONIFY_MIMETYPE']
+        )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'bytes': sum(len(fragment) for fragment in list(self._entries.values())),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else None,
+        }
+
+
+product_json = ProductJSONCache()
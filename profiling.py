@@ -0,0 +1,177 @@
+import cProfile
+import fcntl
+import itertools
+import json
+import os
+import pstats
+import re
+import threading
+
+from flask import g, request, session
+
+
+def _profile_name(endpoint):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', endpoint or 'unmatched')
+
+
+class RequestProfiler:
+    """Samples requests with cProfile and merges the results per endpoint.
+
+    A request is profiled when PROFILE_ENABLED is set and it is one in
+    PROFILE_SAMPLE_RATE requests (or its endpoint is in PROFILE_ENDPOINTS),
+    or when a logged-in admin sends the PROFILE_HEADER header. Each
+    endpoint's profiles are merged into `<PROFILE_DIR>/<endpoint>.prof`,
+    which can be read with pstats or snakeviz as well as the admin view.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.sample_rate = 100
+        self.endpoints = set()
+        self.header = 'X-Profile'
+        self.profile_dir = 'instance/profiles'
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILE_ENABLED', False)
+        app.config.setdefault('PROFILE_SAMPLE_RATE', 100)
+        app.config.setdefault('PROFILE_ENDPOINTS', [])
+        app.config.setdefault('PROFILE_HEADER', 'X-Profile')
+        app.config.setdefault('PROFILE_DIR', 'instance/profiles')
+        self.enabled = app.config['PROFILE_ENABLED']
+        self.sample_rate = app.config['PROFILE_SAMPLE_RATE']
+        self.endpoints = set(app.config['PROFILE_ENDPOINTS'])
+        self.header = app.config['PROFILE_HEADER']
+        self.profile_dir = app.config['PROFILE_DIR']
+        app.extensions['profiler'] = self
+
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def should_profile(self):
+        if self.header and request.headers.get(self.header) and 'admin_id' in session:
+            return True
+        if not self.enabled:
+            return False
+        if request.endpoint in self.endpoints:
+            return True
+        return bool(self.sample_rate) and next(self._counter) % self.sample_rate == 0
+
+    def _before_request(self):
+        if not self.should_profile():
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            return
+        g.profiler = profiler
+
+    def _teardown_request(self, exc):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        self.merge(request.endpoint, profiler)
+
+    def path_for(self, endpoint):
+        return os.path.join(self.profile_dir, _profile_name(endpoint) + '.prof')
+
+    def merge(self, endpoint, profiler):
+        """Add one request's profile to the endpoint's merged pstats file"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = self.path_for(endpoint)
+        meta_path = path[:-len('.prof')] + '.json'
+        stats = pstats.Stats(profiler)
+
+        # Serialise merges within this process and across worker processes
+        with self._lock, open(os.path.join(self.profile_dir, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if os.path.exists(path):
+                    try:
+                        stats.add(path)
+                    except (EOFError, ValueError, TypeError):
+                        pass  # Corrupt or incompatible file: start over
+                tmp_path = f'{path}.{os.getpid()}.tmp'
+                stats.dump_stats(tmp_path)
+                os.replace(tmp_path, path)
+
+                meta = self._read_meta(meta_path)
+                meta['endpoint'] = endpoint
+                meta['samples'] = meta.get('samples', 0) + 1
+                with open(meta_path, 'w', encoding='utf-8') as f:
+                    json.dump(meta, f)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read_meta(meta_path):
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def profiles(self):
+        """Summary of every endpoint with a merged profile"""
+        if not os.path.isdir(self.profile_dir):
+            return []
+        summaries = []
+        for filename in sorted(os.listdir(self.profile_dir)):
+            if not filename.endswith('.prof'):
+                continue
+            path = os.path.join(self.profile_dir, filename)
+            meta = self._read_meta(path[:-len('.prof')] + '.json')
+            try:
+                stats = pstats.Stats(path)
+            except (EOFError, ValueError, TypeError, OSError):
+                continue
+            samples = meta.get('samples', 0)
+            summaries.append({
+                'name': filename[:-len('.prof')],
+                'endpoint': meta.get('endpoint', filename[:-len('.prof')]),
+                'samples': samples,
+                'total_time': stats.total_tt,
+                'avg_time': stats.total_tt / samples if samples else None,
+            })
+        return summaries
+
+    def top_functions(self, name, limit=40, match=None):
+        """Functions of a merged profile sorted by cumulative time.
+
+        `match` keeps only functions whose file or name contains the text,
+        e.g. "sqlite3", "json" or "jinja2".
+        """
+        path = os.path.join(self.profile_dir, _profile_name(name) + '.prof')
+        if not os.path.exists(path):
+            return None
+        stats = pstats.Stats(path)
+        rows = []
+        for (filename, lineno, funcname), (cc, nc, tt, ct, callers) in stats.stats.items():
+            location = f'{filename}:{lineno}({funcname})'
+            if match and match.lower() not in location.lower():
+                continue
+            rows.append({
+                'function': location,
+                'ncalls': nc if nc == cc else f'{nc}/{cc}',
+                'tottime': tt,
+                'cumtime': ct,
+                'percall': ct / cc if cc else 0.0,
+            })
+        rows.sort(key=lambda row: row['cumtime'], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        if not os.path.isdir(self.profile_dir):
+            return
+        for filename in os.listdir(self.profile_dir):
+            if filename.endswith(('.prof', '.json')):
+                os.remove(os.path.join(self.profile_dir, filename))
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,228 @@
+import collections
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import jsonify, render_template, request
+from werkzeug.exceptions import TooManyRequests
+
+BUCKETS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+        key TEXT PRIMARY KEY,
+        rule TEXT NOT NULL,
+        tokens REAL NOT NULL,
+        updated REAL NOT NULL
+    ) WITHOUT ROWID
+'''
+
+# Refill the bucket, then take a token only if one is left; no row comes
+# back (and nothing changes) when the client is over its limit
+TAKE_SQL = '''
+    INSERT INTO rate_limit_buckets (key, rule, tokens, updated) VALUES (:key, :rule, :capacity - 1, :now)
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = MIN(:capacity, tokens + (:now - updated) * :rate) - 1,
+        updated = :now
+    WHERE MIN(:capacity, tokens + (:now - updated) * :rate) >= 1
+    RETURNING tokens
+'''
+
+# Shared buckets are pruned once every this many requests
+PRUNE_INTERVAL = 1000
+
+
+def parse_rule(name):
+    """'POST contact' -> ('POST', 'contact'); 'search' -> (None, 'search')"""
+    method, _, endpoint = name.rpartition(' ')
+    return method or None, endpoint
+
+
+class RateLimiter:
+    """Token buckets per client IP and rule, checked before each request.
+
+    RATE_LIMITS maps a rule to `(requests, seconds)`: a client may burst
+    `requests` requests, and earns them back evenly over `seconds`. A rule
+    is an endpoint name, optionally preceded by a method ('POST contact'
+    leaves the contact page itself unlimited). A client over its limit
+    gets a 429 with Retry-After: JSON for /api, the 429.html page
+    otherwise.
+
+    Buckets live in a per-worker LRU of at most RATE_LIMIT_MAX_BUCKETS
+    entries; a bucket evicted for being least recently used would have
+    refilled anyway, unless the LRU is far too small for the traffic.
+    With RATE_LIMIT_STORE set they are kept instead in that small SQLite
+    file (not the catalog database, so limiting never waits on its write
+    lock), shared by every worker, and taking a token is one UPSERT. If
+    the store is unavailable requests are allowed.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.rules = {}
+        self.limits = {}
+        self.max_buckets = 10000
+        self.store = None
+        self.proxies = 0
+        self.rejected = {}
+        self._buckets = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._calls = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATE_LIMIT_ENABLED', True)
+        app.config.setdefault('RATE_LIMITS', {})
+        app.config.setdefault('RATE_LIMIT_MAX_BUCKETS', 10000)
+        app.config.setdefault('RATE_LIMIT_STORE', None)
+        app.config.setdefault('RATE_LIMIT_PROXIES', 0)
+        self.enabled = app.config['RATE_LIMIT_ENABLED']
+        self.rules = {}
+        self.limits = {}
+        for name, (requests, seconds) in app.config['RATE_LIMITS'].items():
+            method, endpoint = parse_rule(name)
+            self.limits[name] = (requests, requests / seconds)
+            self.rules.setdefault(endpoint, []).append((name, method, requests, requests / seconds))
+        self.max_buckets = app.config['RATE_LIMIT_MAX_BUCKETS']
+        self.store = app.config['RATE_LIMIT_STORE']
+        self.proxies = app.config['RATE_LIMIT_PROXIES']
+        self._conn = None
+        with self._lock:
+            self._buckets.clear()
+            self.rejected = {}
+        app.extensions['rate_limiter'] = self
+        if self.enabled and self.rules:
+            app.before_request(self._before_request)
+            app.register_error_handler(TooManyRequests, self._too_many_requests)
+
+    @staticmethod
+    def _too_many_requests(error):
+        # The site's page instead of Werkzeug's, keeping Retry-After
+        retry_after = getattr(error, 'retry_after', None)
+        response = render_template('429.html', retry_after=retry_after), 429
+        headers = [(name, value) for name, value in error.get_headers() if name == 'Retry-After']
+        return response + (headers,) if headers else response
+
+    def client(self):
+        """The client's address; behind RATE_LIMIT_PROXIES proxies, the one they saw"""
+        if self.proxies:
+            forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+            if len(forwarded) >= self.proxies:
+                return forwarded[-self.proxies]
+        return request.remote_addr or 'unknown'
+
+    def _before_request(self):
+        for name, method, capacity, rate in self.rules.get(request.endpoint, ()):
+            if method and request.method != method:
+                continue
+            wait = self.take(name, self.client(), capacity, rate)
+            if wait:
+                with self._lock:
+                    self.rejected[name] = self.rejected.get(name, 0) + 1
+                retry_after = math.ceil(wait)
+                if request.path.startswith('/api/'):
+                    response = jsonify({"error": "Too many requests", "retry_after": retry_after})
+                    response.status_code = 429
+                    response.headers['Retry-After'] = str(retry_after)
+                    return response
+                raise TooManyRequests(retry_after=retry_after)
+
+    def take(self, rule, client, capacity, rate):
+        """Take a token from the client's bucket; returns 0, or the seconds until one is available"""
+        key = f'{rule}|{client}'
+        if self.store:
+            return self._take_shared(key, rule, capacity, rate)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def _connection(self):
+        # One connection per process, kept open and recreated after a fork
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.store)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.store, timeout=1, isolation_level=None, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=OFF')  # Losing a few buckets in a crash is harmless
+            self._conn.execute(BUCKETS_TABLE)
+            self._pid = os.getpid()
+        return self._conn
+
+    def _take_shared(self, key, rule, capacity, rate):
+        now = time.time()  # Wall clock: the buckets are shared between processes
+        with self._lock:
+            try:
+                conn = self._connection()
+                params = {'key': key, 'rule': rule, 'capacity': capacity, 'rate': rate, 'now': now}
+                if conn.execute(TAKE_SQL, params).fetchall():
+                    wait = 0
+                else:
+                    tokens, updated = conn.execute(
+                        'SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?', (key,)
+                    ).fetchone()
+                    wait = (1 - min(capacity, tokens + (now - updated) * rate)) / rate
+                self._calls += 1
+                if self._calls % PRUNE_INTERVAL == 0:
+                    self._prune(conn, now)
+            except sqlite3.Error:
+                return 0
+        return max(wait, 0)
+
+    def _prune(self, conn, now):
+        # A bucket idle for its whole refill period is full again: same as having no row
+        for name, (capacity, rate) in self.limits.items():
+            conn.execute('DELETE FROM rate_limit_buckets WHERE rule = ? AND updated < ?', (name, now - capacity / rate))
+        conn.execute(f"DELETE FROM rate_limit_buckets WHERE rule NOT IN ({', '.join('?' * len(self.limits))})",
+                     list(self.limits))
+
+    def _buckets_by_rule(self):
+        """{rule: [tokens now, ...]} for every tracked bucket"""
+        found = {name: [] for name in self.limits}
+        if self.store:
+            now = time.time()
+            with self._lock:
+                try:
+                    rows = self._connection().execute('SELECT rule, tokens, updated FROM rate_limit_buckets').fetchall()
+                except sqlite3.Error:
+                    rows = []
+        else:
+            now = time.monotonic()
+            with self._lock:
+                rows = [(key.split('|', 1)[0], tokens, updated) for key, (tokens, updated) in self._buckets.items()]
+        for name, tokens, updated in rows:
+            if name in self.limits:
+                capacity, rate = self.limits[name]
+                found[name].append(min(capacity, tokens + (now - updated) * rate))
+        return found
+
+    def stats(self):
+        """Occupancy of the buckets, by rule.
+
+        `buckets` counts tracked clients, `limited` those with no token
+        left, and `fill` the mean share of their burst they have used.
+        """
+        rules = {}
+        for name, levels in self._buckets_by_rule().items():
+            capacity = self.limits[name][0]
+            rules[name] = {
+                'buckets': len(levels),
+                'limited': sum(1 for tokens in levels if tokens < 1),
+                'fill': sum(1 - tokens / capacity for tokens in levels) / len(levels) if levels else 0.0,
+                'rejected': self.rejected.get(name, 0),
+            }
+        return {'shared': bool(self.store), 'max_buckets': self.max_buckets, 'rules': rules}
+
+
+rate_limiter = RateLimiter()
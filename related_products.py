@@ -0,0 +1,270 @@
+"""Related products: top-K nearest neighbours by content similarity.
+
+Each product becomes a vector of weighted tokens from four blocks:
+
+    c:<category_id>         its category
+    t:<product_type_id>     its product type
+    s:<name>=<value>        each scalar specification (as in product_attributes)
+    f:<word>                the words of its features
+
+Tokens are weighted by inverse document frequency, each block is
+normalised and scaled by BLOCK_WEIGHTS, and the whole vector normalised,
+so the dot product of two rows is their cosine similarity. Vectors are
+kept sparse (each product's tokens and weights), so they grow with the
+tokens in the catalog rather than products times vocabulary. Neighbours
+are found a batch of rows against a chunk of columns at a time, both made
+dense over just the tokens of that batch, keeping a running top K per
+row; the blocks held in memory do not grow with the catalog. The best
+RELATED_PRODUCTS_K per product are stored in related_products for the
+product page to read with one indexed query.
+
+Runs are incremental. The change feed (Product.changes) gives the products
+saved or deleted since the previous run; besides those, only the products
+whose stored neighbours included one of them, or whose K-th score one of
+them now beats, are recomputed. Vocabulary and weights are rebuilt from
+the whole catalog on every run, so scores of untouched products drift
+slightly as the catalog grows; `--full` recomputes everything.
+
+    flask related-products [--full]
+"""
+import datetime
+import re
+import time
+
+import numpy as np
+
+from catalog_generation import CATALOG
+from models import db
+from models.db import get_db_connection, writer
+from models.product import Product
+
+BLOCK_WEIGHTS = {'c': 1.0, 't': 1.0, 's': 1.0, 'f': 0.5}
+
+# Words that say nothing about a floor
+STOPWORDS = frozenset('and for the with from into all any our your are this that its'.split())
+WORD = re.compile(r'[a-z0-9]+')
+
+# Rows by catalog columns scored per matrix product: at most
+# BATCH_SIZE x COLUMN_CHUNK scores (8MB) plus their partition indices
+BATCH_SIZE = 256
+COLUMN_CHUNK = 8192
+
+# Columns per chunk are fewer when the batch has many tokens, so a chunk
+# made dense over them stays within this many cells (8MB)
+CHUNK_CELLS = 2 * 1024 * 1024
+
+# Above this share of the catalog an incremental run recomputes everything
+FULL_RUN_FRACTION = 0.25
+
+
+def tokens(product):
+    """Block-prefixed tokens of one product"""
+    found = []
+    if product.category_id is not None:
+        found.append(f'c:{product.category_id}')
+    if product.product_type_id is not None:
+        found.append(f't:{product.product_type_id}')
+    for name, value in product.get_attributes().items():
+        found.append(f's:{name}={value.lower()}')
+    features = product.get_features()
+    if isinstance(features, list):
+        words = WORD.findall(' '.join(str(feature) for feature in features).lower())
+        found.extend(f'f:{word}' for word in set(words) if len(word) > 2 and word not in STOPWORDS)
+    return found
+
+
+class Vectors:
+    """Sparse unit-length rows, one per product.
+
+    Row i has the tokens `tokens[offsets[i]:offsets[i + 1]]` (vocabulary
+    indices) with `weights` alongside.
+    """
+
+    def __init__(self, offsets, tokens, weights, vocabulary_size):
+        self.offsets = offsets
+        self.tokens = tokens
+        self.weights = weights
+        self.vocabulary_size = vocabulary_size
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def entries(self, rows):
+        """(index into rows, token, weight) of every token of `rows`"""
+        rows = np.asarray(rows, dtype=np.int64)
+        lengths = self.offsets[rows + 1] - self.offsets[rows]
+        # Each entry's position: its row's offset plus its place within the row
+        starts = np.cumsum(lengths) - lengths
+        positions = np.repeat(self.offsets[rows] - starts, lengths) + np.arange(lengths.sum())
+        return np.repeat(np.arange(len(rows)), lengths), self.tokens[positions], self.weights[positions]
+
+    def dense(self, rows, columns, width):
+        """`rows` as a float32 block over the tokens `columns` maps (token -> column, -1 to leave out)"""
+        index, found, weights = self.entries(rows)
+        found = columns[found]
+        kept = found >= 0
+        block = np.zeros((len(rows), width), dtype=np.float32)
+        block[index[kept], found[kept]] = weights[kept]
+        return block
+
+
+def vectorise(products):
+    """Vectors of unit length, one per product"""
+    product_tokens = [list(dict.fromkeys(tokens(product))) for product in products]
+    vocabulary = {}
+    for found in product_tokens:
+        for token in found:
+            vocabulary.setdefault(token, len(vocabulary))
+
+    lengths = np.array([len(found) for found in product_tokens], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    rows = np.repeat(np.arange(len(products)), lengths)
+    columns = np.fromiter((vocabulary[token] for found in product_tokens for token in found),
+                          dtype=np.int64, count=len(rows))
+
+    # Inverse document frequency, so tokens every product shares count for little
+    frequency = np.bincount(columns, minlength=len(vocabulary))
+    weights = np.log((1 + len(products)) / (1 + frequency))[columns] + 1.0
+
+    # Normalise each block of each row, via (row, block) sums of squares
+    names = list(BLOCK_WEIGHTS)
+    blocks = np.array([names.index(token[0]) for token in vocabulary], dtype=np.int64)[columns]
+    keys = rows * len(names) + blocks
+    norms = np.sqrt(np.bincount(keys, weights=weights ** 2, minlength=len(products) * len(names)))[keys]
+    weights *= np.array(list(BLOCK_WEIGHTS.values()))[blocks] / np.maximum(norms, 1e-12)
+    weights /= np.maximum(np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(products)))[rows], 1e-12)
+    return Vectors(offsets, columns, weights.astype(np.float32), len(vocabulary))
+
+
+def _scores(vectors, batch):
+    """Yield (first column, scores of `batch` against each product from there)"""
+    _, found, _ = vectors.entries(batch)
+    batch_tokens = np.unique(found)
+    columns = np.full(vectors.vocabulary_size, -1, dtype=np.int64)
+    columns[batch_tokens] = np.arange(len(batch_tokens))
+    rows = vectors.dense(batch, columns, len(batch_tokens))
+    step = max(1, min(COLUMN_CHUNK, CHUNK_CELLS // max(len(batch_tokens), 1)))
+    for column in range(0, len(vectors), step):
+        chunk = vectors.dense(np.arange(column, min(column + step, len(vectors))), columns, len(batch_tokens))
+        yield column, rows @ chunk.T
+
+
+def top_k(vectors, rows, k):
+    """Yield (row, [(neighbour row, score), ...]) best first for each of `rows`"""
+    k = min(k, len(vectors) - 1)
+    if k < 1:
+        return
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = np.asarray(rows[start:start + BATCH_SIZE])
+        best = np.full((len(batch), k), -1, dtype=np.int64)
+        best_scores = np.full((len(batch), k), -np.inf, dtype=np.float32)
+        for column, scores in _scores(vectors, batch):
+            own = (batch >= column) & (batch < column + scores.shape[1])
+            scores[own.nonzero()[0], batch[own] - column] = -np.inf  # Never related to itself
+            # The running top k competes with this chunk's scores
+            candidates = np.concatenate((best_scores, scores), axis=1)
+            top = np.argpartition(-candidates, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(candidates, top, axis=1)
+            best = np.where(top < k, np.take_along_axis(best, np.minimum(top, k - 1), axis=1), column + top - k)
+        order = np.lexsort((best, -best_scores), axis=1)
+        for i, row in enumerate(batch):
+            yield int(row), [(int(best[i, j]), float(best_scores[i, j])) for j in order[i]]
+
+
+def _stored(conn):
+    neighbours = {}
+    for row in conn.execute('SELECT product_id, related_id, score FROM related_products ORDER BY product_id, rank'):
+        neighbours.setdefault(row['product_id'], []).append((row['related_id'], row['score']))
+    return neighbours
+
+
+def _last_run(conn):
+    return conn.execute('SELECT * FROM related_product_runs ORDER BY id DESC LIMIT 1').fetchone()
+
+
+def _affected(vectors, ids, stored, touched_rows, gone, k):
+    """Rows whose neighbour lists can change because of the touched products"""
+    affected = set(touched_rows)
+    touched_ids = {ids[row] for row in touched_rows} | gone
+    best_new = np.full(len(vectors), -np.inf, dtype=np.float32)
+    for start in range(0, len(touched_rows), BATCH_SIZE):
+        for column, scores in _scores(vectors, np.asarray(touched_rows[start:start + BATCH_SIZE])):
+            chunk = best_new[column:column + scores.shape[1]]
+            np.maximum(chunk, scores.max(axis=0), out=chunk)
+    for row, id in enumerate(ids):
+        neighbours = stored.get(id, [])
+        if (len(neighbours) < min(k, len(ids) - 1) or best_new[row] >= neighbours[-1][1]
+                or any(related_id in touched_ids for related_id, _ in neighbours)):
+            affected.add(row)
+    return sorted(affected)
+
+
+def refresh(k=8, full=False):
+    """Recompute the related products that may have changed; returns a summary"""
+    started = time.perf_counter()
+    token = db.live_reads.set(True)  # Read the live catalog, not the published snapshot
+    try:
+        conn = get_db_connection()
+        try:
+            last = _last_run(conn)
+            full = full or last is None
+            stored = {} if full else _stored(conn)
+            # Read before the products, so a change made meanwhile is picked up next run
+            cursor = conn.execute(
+                'SELECT generation FROM catalog_generations WHERE scope = ?', (CATALOG,)
+            ).fetchone()
+            cursor = cursor[0] if cursor else None
+        finally:
+            conn.close()
+
+        # What changed since the last run
+        changed, gone = set(), set()
+        if not full:
+            cursor = last['change_seq']
+            while True:
+                changes, cursor, has_more = Product.changes(cursor, limit=5000)
+                for _, op, record in changes:
+                    if op == 'upsert':
+                        changed.add(record.id)
+                    elif record['id'] is not None:
+                        gone.add(record['id'])
+                if not has_more:
+                    break
+
+        products = Product.listing('1=1', [], fields=(
+            'id', 'category_id', 'product_type_id', 'specifications', 'features'))
+    finally:
+        db.live_reads.reset(token)
+
+    ids = [product.id for product in products]
+    vectors = vectorise(products)
+    touched_rows = [row for row, id in enumerate(ids) if id in changed]
+    if full or len(touched_rows) > FULL_RUN_FRACTION * len(ids):
+        rows = list(range(len(ids)))
+        full = True
+    elif touched_rows or gone:
+        rows = _affected(vectors, ids, stored, touched_rows, gone, k)
+    else:
+        rows = []
+
+    with writer() as conn:
+        run_id = conn.execute('''
+            INSERT INTO related_product_runs (change_seq, products, seconds, finished_at) VALUES (?, ?, 0, ?)
+        ''', (cursor, len(rows), datetime.datetime.now().isoformat())).lastrowid
+        if full:
+            conn.execute('DELETE FROM related_products')
+        else:
+            stale = sorted({ids[row] for row in rows} | gone)
+            for start in range(0, len(stale), 500):
+                chunk = stale[start:start + 500]
+                conn.execute(f"DELETE FROM related_products WHERE product_id IN ({', '.join('?' * len(chunk))})",
+                             chunk)
+        conn.executemany(
+            'INSERT INTO related_products (product_id, rank, related_id, score, run_id) VALUES (?, ?, ?, ?, ?)',
+            ((ids[row], rank, ids[neighbour], score, run_id)
+             for row, neighbours in top_k(vectors, rows, k)
+             for rank, (neighbour, score) in enumerate(neighbours))
+        )
+        seconds = time.perf_counter() - started
+        conn.execute('UPDATE related_product_runs SET seconds = ? WHERE id = ?', (seconds, run_id))
+    return {'run': run_id, 'full': full, 'products': len(ids), 'recomputed': len(rows), 'seconds': seconds}
@@ -0,0 +1,123 @@
+import collections
+import threading
+import time
+
+from catalog_generation import CATALOG, catalog_generation
+from models import db
+from models.product import Product
+
+
+def collapse_whitespace(query):
+    """'  Oak   Herringbone ' -> 'Oak Herringbone', the term actually searched"""
+    return ' '.join(query.split())
+
+
+def normalise_query(query):
+    """'  Oak   Herringbone ' -> 'oak herringbone', for counting and cache keys"""
+    return collapse_whitespace(query).casefold()
+
+
+class SearchCache:
+    """Bounded LRU of search results, as product_id lists, with a TTL.
+
+    Entries are keyed by the normalised query and the listing parameters
+    (price range, sort, page cursor and size), so a page is cached as its
+    own list. A hit costs one primary-key lookup of the page's products
+    (Product.get_many) instead of the LIKE scan. Any product, category or
+    type write moves the catalog generation (see catalog_generation.py),
+    which empties the cache in every worker at its next request; the TTL
+    bounds how long a result can outlive a missed check.
+
+    Every search also counts towards its normalised query, so the stats
+    show which queries are worth pre-warming. At most
+    SEARCH_CACHE_TRACKED_QUERIES queries are counted; past that the
+    rarest half is forgotten.
+    """
+
+    def __init__(self, app=None):
+        self.max_entries = 1000
+        self.ttl = 300
+        self.max_tracked = 5000
+        self.hits = 0
+        self.misses = 0
+        self.queries = collections.Counter()
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SEARCH_CACHE_SIZE', 1000)
+        app.config.setdefault('SEARCH_CACHE_TTL', 300)
+        app.config.setdefault('SEARCH_CACHE_TRACKED_QUERIES', 5000)
+        self.max_entries = app.config['SEARCH_CACHE_SIZE']
+        self.ttl = app.config['SEARCH_CACHE_TTL']
+        self.max_tracked = app.config['SEARCH_CACHE_TRACKED_QUERIES']
+        self.clear()
+        catalog_generation.subscribe(self._catalog_changed)
+        app.extensions['search_cache'] = self
+
+    def _catalog_changed(self, changed):
+        if catalog_generation.affects(changed, CATALOG):
+            self.clear()
+
+    def search(self, query, price_min=None, price_max=None, sort=None, after=None, limit=None):
+        """Product.search() for the whitespace-collapsed query, served from the cache when possible"""
+        term = collapse_whitespace(query)
+        normalised = normalise_query(term)
+        # SQLite's LIKE ignores case for ASCII only, so other terms keep theirs in the key
+        key = (normalised if term.isascii() else term, price_min, price_max, sort, after, limit)
+        # Without generation checks a write would not clear the cache; admin reads bypass it
+        cacheable = self.max_entries and catalog_generation.enabled and not db.live_reads.get()
+        now = time.monotonic()
+        with self._lock:
+            self._count(normalised)
+            entry = self._entries.get(key) if cacheable else None
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                product_ids = entry[1]
+            else:
+                self.misses += 1
+                product_ids = None
+        if product_ids is not None:
+            return Product.get_many(product_ids)
+
+        products = Product.search(term, price_min, price_max, sort, after, limit)
+        if cacheable:
+            with self._lock:
+                self._entries[key] = (now + self.ttl, [product.product_id for product in products])
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return products
+
+    def _count(self, term):
+        self.queries[term] += 1
+        if len(self.queries) > self.max_tracked:
+            self.queries = collections.Counter(dict(self.queries.most_common(self.max_tracked // 2)))
+
+    def top_queries(self, count=10):
+        """[(normalised query, searches), ...], most searched first"""
+        with self._lock:
+            return self.queries.most_common(count)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            entries, hits, misses = len(self._entries), self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else None,
+            'top_queries': self.top_queries(),
+        }
+
+
+search_cache = SearchCache()
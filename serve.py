@@ -0,0 +1,267 @@
+"""Production server: a preloaded, pre-forking WSGI server for the app.
+
+    python serve.py --bind 0.0.0.0:8000 --workers 4 --threads 8 --max-requests 2000
+
+The parent imports the app once, applies migrations, warms the Jinja
+template cache and the first-request hooks, then forks `--workers`
+processes that share the listening socket. Each worker serves requests
+from a bounded pool of `--threads` threads and retires itself after
+`--max-requests` requests (plus a little jitter, so workers do not all
+restart at once); the parent replaces any worker that exits.
+
+Signals sent to the parent:
+    SIGHUP           rolling restart: fork fresh workers, then drain the old ones
+    SIGTTIN/SIGTTOU  add or remove a worker
+    SIGTERM/SIGINT   graceful shutdown: stop accepting, finish in-flight requests
+
+Workers are forked from the preloaded parent, so a SIGHUP picks up
+database and snapshot changes but not code changes; restart the parent to
+deploy new code.
+"""
+import argparse
+import atexit
+import concurrent.futures
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server that hands each connection to a bounded thread pool"""
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads, fd=None):
+        super().__init__(host, port, app, handler=QuietRequestHandler, fd=fd)
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='wsgi'
+        )
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request_thread, request, client_address)
+
+    def _process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        # Let in-flight requests finish before the worker exits
+        self.executor.shutdown(wait=True)
+        super().server_close()
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        if os.environ.get('SERVE_ACCESS_LOG'):
+            super().log_request(*args, **kwargs)
+
+
+class RequestLimit:
+    """WSGI middleware that asks the worker to retire after `limit` requests"""
+
+    def __init__(self, app, limit, on_limit):
+        self.app = app
+        self.limit = limit
+        self.on_limit = on_limit
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.count += 1
+            reached = self.limit and self.count == self.limit
+        if reached:
+            self.on_limit()
+        return self.app(environ, start_response)
+
+
+def load_app():
+    """Import the app, bring the schema up to date and warm it up once"""
+    from app import create_app, precompile_templates
+    from models.schema import migrate
+
+    app = create_app()
+    migrate()
+
+    # Compile every template so the workers inherit the compiled code
+    precompile_templates(app)
+
+    # Run the first-request hooks and fill any per-process caches
+    with app.test_client() as client:
+        client.get('/')
+    return app
+
+
+def bind_socket(bind, backlog):
+    host, _, port = bind.rpartition(':')
+    host = host or '0.0.0.0'
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host.strip('[]'), int(port)))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return host, sock
+
+
+def run_worker(app, host, sock, threads, max_requests):
+    """Body of a forked worker process; returns when the worker should exit"""
+    for signum in (signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+        signal.signal(signum, signal.SIG_IGN)
+    random.seed()
+
+    server = None
+
+    def stop(*_):
+        # shutdown() waits for serve_forever() to return, so it cannot be
+        # called from the thread (or signal handler) that is running it
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    limit = 0
+    if max_requests:
+        limit = max_requests + random.randint(0, max(1, max_requests // 10))
+    wsgi_app = RequestLimit(app, limit, stop)
+
+    server = PooledWSGIServer(host, 0, wsgi_app, threads, fd=sock.fileno())
+    # serve_forever() closes the server (draining the pool) when it returns
+    server.serve_forever()
+
+
+class Arbiter:
+    """Parent process: forks, supervises and replaces the workers"""
+
+    def __init__(self, app, host, sock, workers, threads, max_requests, graceful_timeout):
+        self.app = app
+        self.host = host
+        self.sock = sock
+        self.num_workers = workers
+        self.threads = threads
+        self.max_requests = max_requests
+        self.graceful_timeout = graceful_timeout
+        self.workers = {}  # pid -> generation
+        self.generation = 0
+        self.stopping = False
+        self.pending = []
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = self.generation
+            return pid
+
+        # Child
+        code = 0
+        try:
+            run_worker(self.app, self.host, self.sock, self.threads, self.max_requests)
+        except Exception:
+            traceback.print_exc()
+            code = 1
+        finally:
+            atexit._run_exitfuncs()
+            os._exit(code)
+
+    def kill(self, pids, signum=signal.SIGTERM):
+        for pid in pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                self.workers.pop(pid, None)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            self.workers.pop(pid, None)
+
+    def handle_signal(self, signum, frame):
+        self.pending.append(signum)
+
+    def reload(self):
+        """Rolling restart: start a new generation, then drain the old one"""
+        old = [pid for pid, generation in self.workers.items() if generation == self.generation]
+        self.generation += 1
+        for _ in range(self.num_workers):
+            self.spawn()
+        self.kill(old)
+
+    def shutdown(self):
+        self.stopping = True
+        self.kill(list(self.workers))
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        self.kill(list(self.workers), signal.SIGKILL)
+        self.reap()
+
+    def run(self):
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, self.handle_signal)
+
+        for _ in range(self.num_workers):
+            self.spawn()
+        print(f'Serving on {self.host}:{self.sock.getsockname()[1]} with {self.num_workers} workers '
+              f'x {self.threads} threads (parent pid {os.getpid()})', flush=True)
+
+        while True:
+            while self.pending:
+                signum = self.pending.pop(0)
+                if signum in (signal.SIGTERM, signal.SIGINT):
+                    self.shutdown()
+                    return
+                if signum == signal.SIGHUP:
+                    self.reload()
+                elif signum == signal.SIGTTIN:
+                    self.num_workers += 1
+                elif signum == signal.SIGTTOU and self.num_workers > 1:
+                    self.num_workers -= 1
+                    current = [pid for pid, g in self.workers.items() if g == self.generation]
+                    self.kill(current[:1])
+
+            self.reap()
+            # Replace retired or crashed workers of the current generation
+            current = [pid for pid, g in self.workers.items() if g == self.generation]
+            for _ in range(self.num_workers - len(current)):
+                self.spawn()
+            time.sleep(0.2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the app with preloaded, forked workers')
+    parser.add_argument('--bind', default='127.0.0.1:8000', help='host:port to listen on')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=8, help='request threads per worker')
+    parser.add_argument('--max-requests', type=int, default=0,
+                        help='recycle a worker after this many requests (0 = never)')
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--graceful-timeout', type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    app = load_app()
+    host, sock = bind_socket(args.bind, args.backlog)
+    arbiter = Arbiter(app, host, sock, args.workers, args.threads,
+                      args.max_requests, args.graceful_timeout)
+    arbiter.run()
+    sock.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import hashlib
+import os
+import re
+import threading
+import urllib.parse
+from xml.sax.saxutils import escape
+
+from flask import url_for
+
+from catalog_generation import CATALOG, catalog_generation, category_scope
+from models.product import Category, Product
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# First line after the declaration of every cached file; the generation it
+# was built at and a digest of the base URL of its links decide whether it
+# is still current
+STAMP = '<!-- generation {} base {} -->\n'
+STAMP_PATTERN = re.compile(r'<!-- generation (\d+) base ([0-9a-f]+) -->')
+
+# Child sitemap names: 'pages', 'category-<slug>' and 'category-<slug>.<part>'
+# for the second and later parts of a large category
+CHILD_NAME = re.compile(r'^(pages|category-(?P<slug>[^.]+)(?:\.(?P<part>\d+))?)$')
+
+
+class Sitemaps:
+    """sitemap.xml and its child sitemaps, cached on disk.
+
+    /sitemap.xml is an index of one child sitemap per category (split into
+    parts of SITEMAP_MAX_URLS) plus one for the fixed pages. Each file is
+    written by streaming rows straight from the cursor into a temporary file
+    that replaces the cached one, and is stamped with the catalog generation
+    it was built at: the index with the 'catalog' generation, a category's
+    sitemap with its 'category:<id>' scope. A request only rebuilds a file
+    whose stamp is older than the database's, so crawlers re-reading an
+    unchanged catalog are served the same files (with ETags) by any worker.
+
+    Links start with SITEMAP_BASE_URL, or else the host Flask builds
+    external URLs for (SERVER_NAME, or the request's Host header). The
+    stamp also records that base, so a file built for another host is
+    rebuilt rather than served; set SITEMAP_BASE_URL in production so a
+    forged Host header cannot even cause a rebuild.
+    """
+
+    def __init__(self, app=None):
+        self.directory = 'instance/sitemaps'
+        self.max_urls = 50000
+        self.base_url = None
+        self.builds = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SITEMAP_DIR', 'instance/sitemaps')
+        app.config.setdefault('SITEMAP_MAX_URLS', 50000)
+        app.config.setdefault('SITEMAP_BASE_URL', None)
+        self.directory = app.config['SITEMAP_DIR']
+        self.max_urls = app.config['SITEMAP_MAX_URLS']
+        self.base_url = app.config['SITEMAP_BASE_URL']
+        app.extensions['sitemaps'] = self
+
+    def _base(self):
+        """Scheme, host and script root every link starts with"""
+        if self.base_url:
+            return self.base_url.rstrip('/') + url_for('home').rstrip('/')
+        return url_for('home', _external=True).rstrip('/')
+
+    def _url(self, endpoint, **values):
+        if self.base_url:
+            return self.base_url.rstrip('/') + url_for(endpoint, **values)
+        return url_for(endpoint, _external=True, **values)
+
+    def parts(self, count):
+        # The category page itself is the first URL of part 1
+        return max(1, -(-(count + 1) // self.max_urls))
+
+    def _path(self, name):
+        return os.path.join(self.directory, f'{name}.xml')
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                f.readline()
+                match = STAMP_PATTERN.match(f.readline())
+        except OSError:
+            return None
+        return (int(match.group(1)), match.group(2)) if match else None
+
+    def _wanted(self, generation):
+        return generation, hashlib.sha1(self._base().encode('utf-8')).hexdigest()[:16]
+
+    def _current(self, name, generation):
+        path = self._path(name)
+        return path if self._stamp(path) == self._wanted(generation) else None
+
+    def _cached(self, name, generation, build):
+        """Path of an up-to-date file for `name`, rebuilt with `build(f)` if stale"""
+        path = self._path(name)
+        wanted = self._wanted(generation)
+        if self._stamp(path) == wanted:
+            return path
+        with self._lock:
+            if self._stamp(path) == wanted:
+                return path
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(XML_DECLARATION)
+                f.write(STAMP.format(*wanted))
+                build(f)
+            os.replace(tmp_path, path)
+            self.builds += 1
+        return path
+
+    def index(self):
+        """Path of the sitemap index"""
+        return self._cached('sitemap', catalog_generation.stored(CATALOG), self._build_index)
+
+    def child(self, name):
+        """Path of a child sitemap, or None if there is no such sitemap"""
+        match = CHILD_NAME.match(name)
+        if not match:
+            return None
+        if name == 'pages':
+            # Fixed pages: only a new base URL makes the file stale
+            return self._cached(name, 0, self._build_pages)
+
+        category = Category.filter_by(slug=match.group('slug'))
+        part = int(match.group('part') or 1)
+        if not category or part < 1 or (match.group('part') and part == 1):
+            return None
+        generation = catalog_generation.stored(category_scope(category.id))
+        path = self._current(name, generation)
+        if path:
+            return path
+        # Only count when rebuilding: a current file was a valid part when it was built
+        count = Product.category_summary(category.id).get(category.id, (0, None))[0]
+        if part > self.parts(count):
+            return None
+        return self._cached(name, generation, lambda f: self._build_category(f, category, part))
+
+    def _build_index(self, f):
+        summary = Product.category_summary()
+        f.write(f'<sitemapindex xmlns="{SITEMAP_NS}">\n')
+        f.write(f'<sitemap><loc>{escape(self._url("sitemap", name="pages"))}</loc></sitemap>\n')
+        for category in Category.query_all():
+            count, updated_at = summary.get(category.id, (0, None))
+            lastmod = f'<lastmod>{escape(updated_at[:10])}</lastmod>' if updated_at else ''
+            for part in range(1, self.parts(count) + 1):
+                name = f'category-{category.slug}' + (f'.{part}' if part > 1 else '')
+                f.write(f'<sitemap><loc>{escape(self._url("sitemap", name=name))}</loc>{lastmod}</sitemap>\n')
+        f.write('</sitemapindex>\n')
+
+    def _build_pages(self, f):
+        f.write(f'<urlset xmlns="{SITEMAP_NS}">\n')
+        for endpoint in ('home', 'about', 'contact'):
+            f.write(f'<url><loc>{escape(self._url(endpoint))}</loc></url>\n')
+        f.write('</urlset>\n')
+
+    def _build_category(self, f, category, part):
+        f.write(f'<urlset xmlns="{SITEMAP_NS}">\n')
+        limit = self.max_urls
+        if part == 1:
+            f.write(f'<url><loc>{escape(self._url("category", category_name=category.slug))}</loc></url>\n')
+            limit -= 1
+        offset = (part - 1) * self.max_urls - (1 if part > 1 else 0)
+        # url_for() once; each product only substitutes its quoted id
+        prefix = self._url('product', product_id='0')[:-1]
+        for product_id, updated_at in Product.iter_lastmod(category.id, offset, limit):
+            loc = escape(prefix + urllib.parse.quote(product_id, safe=''))
+            lastmod = f'<lastmod>{escape(updated_at[:10])}</lastmod>' if updated_at else ''
+            f.write(f'<url><loc>{loc}</loc>{lastmod}</url>\n')
+        f.write('</urlset>\n')
+
+    def stats(self):
+        return {'builds': self.builds}
+
+
+sitemaps = Sitemaps()
@@ -0,0 +1,162 @@
+import datetime
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from flask import has_request_context, request
+
+from models import db
+
+# Statements worth explaining; DDL, PRAGMAs and transaction control are not
+EXPLAINABLE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|REPLACE)\b', re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    """Collapse whitespace so the same statement always aggregates together"""
+    return ' '.join(sql.split())
+
+
+def is_full_scan(detail):
+    # "SCAN products" is a full table scan; "SEARCH ..." uses an index and
+    # scans of FTS virtual tables are index lookups in disguise
+    return detail.startswith('SCAN ') and 'VIRTUAL TABLE' not in detail
+
+
+class SlowQueryLog:
+    """Connection-layer hook that records statements slower than a threshold.
+
+    Each slow statement is appended to a JSON lines file with its SQL, bound
+    parameters, duration and EXPLAIN QUERY PLAN output, so several worker
+    processes can share one log and `aggregate()` can rank the worst offenders.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.threshold = 0.05
+        self.log_path = 'instance/slow_queries.jsonl'
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_QUERY_ENABLED', False)
+        app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', 50)
+        app.config.setdefault('SLOW_QUERY_LOG', 'instance/slow_queries.jsonl')
+        self.enabled = app.config['SLOW_QUERY_ENABLED']
+        self.threshold = app.config['SLOW_QUERY_THRESHOLD_MS'] / 1000.0
+        self.log_path = app.config['SLOW_QUERY_LOG']
+        app.extensions['slow_queries'] = self
+        if self.enabled:
+            db.add_hook(self)
+
+    def on_connect(self, conn):
+        pass
+
+    def on_statement(self, conn, sql, params, seconds):
+        if seconds < self.threshold or not EXPLAINABLE.match(sql):
+            return
+        plan = self.explain(conn, sql, params)
+        entry = {
+            'at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'endpoint': request.endpoint if has_request_context() else None,
+            'sql': normalize_sql(sql),
+            'params': self._jsonable(params),
+            'ms': round(seconds * 1000, 3),
+            'plan': plan,
+            'full_scan': any(is_full_scan(detail) for detail in plan),
+        }
+        self._append(entry)
+
+    @staticmethod
+    def explain(conn, sql, params):
+        if params is None:
+            # executemany: there is no single parameter set to explain with
+            return []
+        try:
+            # A plain cursor, so the EXPLAIN itself is not instrumented
+            cursor = sqlite3.Cursor(conn)
+            rows = cursor.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+        except sqlite3.Error as e:
+            return [f'EXPLAIN failed: {e}']
+        return [row[3] for row in rows]
+
+    @staticmethod
+    def _jsonable(params):
+        if params is None:
+            return None
+        if isinstance(params, dict):
+            return {key: SlowQueryLog._jsonable_value(value) for key, value in params.items()}
+        return [SlowQueryLog._jsonable_value(value) for value in params]
+
+    @staticmethod
+    def _jsonable_value(value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return f'<{len(value)} bytes>'
+        return value
+
+    def _append(self, entry):
+        line = json.dumps(entry, default=str) + '\n'
+        with self._lock:
+            try:
+                directory = os.path.dirname(self.log_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            except OSError:
+                pass
+
+    def entries(self):
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def aggregate(self, limit=25):
+        """Group logged statements by SQL, worst total time first"""
+        groups = {}
+        for entry in self.entries():
+            group = groups.get(entry['sql'])
+            if group is None:
+                group = groups[entry['sql']] = {
+                    'sql': entry['sql'],
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'full_scan': False,
+                    'plan': entry['plan'],
+                    'endpoints': set(),
+                    'example_params': entry['params'],
+                    'last_seen': entry['at'],
+                }
+            group['count'] += 1
+            group['total_ms'] += entry['ms']
+            if entry['ms'] >= group['max_ms']:
+                group['max_ms'] = entry['ms']
+                group['example_params'] = entry['params']
+                group['plan'] = entry['plan']
+            group['full_scan'] = group['full_scan'] or entry['full_scan']
+            group['last_seen'] = max(group['last_seen'], entry['at'])
+            if entry.get('endpoint'):
+                group['endpoints'].add(entry['endpoint'])
+
+        worst = sorted(groups.values(), key=lambda g: g['total_ms'], reverse=True)[:limit]
+        for group in worst:
+            group['avg_ms'] = group['total_ms'] / group['count']
+            group['endpoints'] = sorted(group['endpoints'])
+        return worst
+
+    def clear(self):
+        with self._lock:
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+
+
+slow_query_log = SlowQueryLog()
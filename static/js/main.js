@@ -56,26 +56,17 @@ function changeMainImage(src) {
     // but we declare it here to avoid errors in other pages
 }
 
-// Product filtering
+// Category filters: reload the page with the chosen type and facet values
 document.addEventListener("DOMContentLoaded", () => {
     const filterForm = document.getElementById("filter-form");
     if (!filterForm) return;
 
-    const products = document.querySelectorAll(".product");
-
     filterForm.addEventListener("change", () => {
-        const selectedFilters = Array.from(
-            filterForm.querySelectorAll("input[type='checkbox']:checked")
-        ).map((checkbox) => checkbox.value);
-
-        products.forEach((product) => {
-            const productCategory = product.getAttribute("data-category");
-            if (selectedFilters.length === 0 || selectedFilters.includes(productCategory)) {
-                product.style.display = "block"; // Show product
-            } else {
-                product.style.display = "none"; // Hide product
-            }
+        const url = new URL(filterForm.action, window.location.href);
+        new FormData(filterForm).forEach((value, key) => {
+            if (value) url.searchParams.set(key, value);
         });
+        window.location.href = url;
     });
 });
 
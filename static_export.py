@@ -0,0 +1,230 @@
+"""Static HTML export of the public storefront.
+
+Renders the home and about pages, every category page (with each ?type=
+variant) and every product page through the app into STATIC_EXPORT_DIR,
+so nginx can serve them without Python:
+
+    index.html                          /
+    about/index.html                    /about
+    category/<slug>/index.html          /category/<slug>
+    category/<slug>/type-<type>.html    /category/<slug>?type=<type>
+    product/<product_id>/index.html     /product/<product_id>
+
+Anything else (later pages, sorts, facets, search, contact, admin, API)
+falls through to the app, e.g.:
+
+    location /static/ { alias /srv/floorofhearts/static/; }
+    location ~ ^/category/(?<slug>[^/]+)$ {
+        # Named: the regex in the if would reset $1
+        if ($args ~ "^type=[a-z0-9-]+$") { rewrite ^ /category/$slug/type-$arg_type.html break; }
+        try_files /category/$slug/index.html @app;
+    }
+    location / { try_files $uri/index.html $uri @app; }
+
+Exports are incremental. The manifest records the generation each page
+was rendered at: a category page and its variants follow the category's
+'category:<id>' scope and a product page its 'product:<product_id>' scope
+(see catalog_generation.py). Only pages whose scope moved since the last
+export are rendered again, and pages of deleted products are removed.
+A product page also records the related products run that last wrote
+its similar products (see related_products.py), the newest generation
+among those products and how many of them still exist, so it is rendered
+again when that job changes the list or when a product in it is edited,
+renamed or deleted.
+Every page shows the navigation (categories and their types) and is built
+from the templates, so a change to either re-renders everything.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+import urllib.parse
+
+from catalog_generation import category_scope, product_scope
+from models.db import get_read_connection
+from models.product import Category, Product, ProductType
+
+MANIFEST = '.manifest.json'
+
+# Pages per task handed to a worker process
+CHUNK_SIZE = 100
+
+
+def export_path(url):
+    """File under the export directory that serves `url`"""
+    path, _, query = url.partition('?')
+    parts = [urllib.parse.unquote(part) for part in path.strip('/').split('/') if part]
+    if any(part.startswith('.') or os.sep in part for part in parts):
+        raise ValueError(f'{url} cannot be exported')
+    if query:
+        name, _, value = query.partition('=')
+        return os.path.join(*parts, f'{name}-{urllib.parse.unquote(value)}.html')
+    return os.path.join(*parts, 'index.html')
+
+
+def build_key(app, categories, product_types):
+    """Changes with the navigation, the templates or the year in the footer"""
+    digest = hashlib.sha1()
+    digest.update(str(time.localtime().tm_year).encode())
+    for category in categories:
+        digest.update(repr((category.id, category.name, category.slug)).encode())
+    for product_type in product_types:
+        digest.update(repr((product_type.id, product_type.name, product_type.slug, product_type.category_id)).encode())
+    template_dir = os.path.join(app.root_path, app.template_folder)
+    for root, dirs, files in os.walk(template_dir):
+        dirs.sort()
+        for name in sorted(files):
+            with open(os.path.join(root, name), 'rb') as f:
+                digest.update(name.encode())
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def public_pages():
+    """{url: scope} for every exported page"""
+    categories = Category.query_all()
+    product_types = ProductType.query_all()
+    pages = {'/': None, '/about': None}
+    for category in categories:
+        scope = category_scope(category.id)
+        pages[f'/category/{category.slug}'] = scope
+        for product_type in product_types:
+            if product_type.category_id == category.id:
+                pages[f'/category/{category.slug}?type={urllib.parse.quote(product_type.slug)}'] = scope
+    for product in Product.listing('1=1', [], fields=('product_id',)):
+        pages[f'/product/{urllib.parse.quote(product.product_id, safe="")}'] = product_scope(product.product_id)
+    return pages, categories, product_types
+
+
+def scope_generations():
+    """{scope: generation} as seen by the catalog read path.
+
+    Read from the same database the pages are rendered from, so with
+    DB_READ_MODE = 'snapshot' the stamps describe the published snapshot
+    and an export after publishing only re-renders what the snapshot changed.
+    """
+    conn = get_read_connection()
+    try:
+        return dict(conn.execute('SELECT scope, generation FROM catalog_generations').fetchall())
+    finally:
+        conn.close()
+
+
+def related_stamps():
+    """{product scope: [run, related generation, related count]} for each product with similar products.
+
+    The run is the related products run that last wrote the product's list,
+    the generation the newest 'product:' scope among the products in it and
+    the count how many of them still exist.
+    """
+    conn = get_read_connection()
+    try:
+        rows = conn.execute('''
+            SELECT p.product_id, MAX(r.run_id), MAX(g.generation), COUNT(related.id)
+            FROM related_products r
+            JOIN products p ON p.id = r.product_id
+            LEFT JOIN products related ON related.id = r.related_id
+            LEFT JOIN catalog_generations g ON g.scope = 'product:' || related.product_id
+            GROUP BY r.product_id
+        ''').fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+    return {product_scope(product_id): [run, generation or 0, count] for product_id, run, generation, count in rows}
+
+
+def _load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+# Worker processes: each builds its own app and renders through its test client
+_worker = {}
+
+
+def _init_worker(config, directory):
+    from app import create_app
+
+    _worker['app'] = create_app(config)
+    _worker['client'] = _worker['app'].test_client()
+    _worker['directory'] = directory
+
+
+def _render(urls):
+    """Render and write `urls`; returns [(url, error or None)]"""
+    results = []
+    for url in urls:
+        response = _worker['client'].get(url)
+        if response.status_code != 200:
+            results.append((url, f'HTTP {response.status_code}'))
+            continue
+        _write_atomic(os.path.join(_worker['directory'], export_path(url)), response.get_data())
+        results.append((url, None))
+    return results
+
+
+def export_site(app, directory, processes=None, full=False):
+    """Render the pages that changed since the last export into `directory`"""
+    started = time.perf_counter()
+    with app.app_context():
+        pages, categories, product_types = public_pages()
+        key = build_key(app, categories, product_types)
+        generations = scope_generations()
+        related = related_stamps()
+
+    stamps = {}
+    for url, scope in pages.items():
+        stamp = generations.get(scope, 0) if scope else 0
+        stamps[url] = [stamp, *related[scope]] if scope in related else stamp
+    manifest = _load_manifest(directory)
+    rendered = {} if full or manifest.get('key') != key else manifest.get('pages', {})
+    stale = [url for url, stamp in stamps.items() if rendered.get(url) != stamp]
+
+    # Remove the pages of products and categories that no longer exist
+    removed = 0
+    for url in set(manifest.get('pages', {})) - set(pages):
+        try:
+            os.remove(os.path.join(directory, export_path(url)))
+            removed += 1
+        except (OSError, ValueError):
+            pass
+
+    errors = {}
+    done = {url: stamp for url, stamp in rendered.items() if url in pages}
+    if stale:
+        config = {name: value for name, value in app.config.items() if name.isupper()}
+        chunks = [stale[i:i + CHUNK_SIZE] for i in range(0, len(stale), CHUNK_SIZE)]
+        processes = processes or os.cpu_count() or 1
+        with multiprocessing.Pool(min(processes, len(chunks)), _init_worker, (config, directory)) as pool:
+            for results in pool.imap_unordered(_render, chunks):
+                for url, error in results:
+                    if error:
+                        errors[url] = error
+                        done.pop(url, None)
+                    else:
+                        done[url] = stamps[url]
+
+    _write_atomic(os.path.join(directory, MANIFEST), json.dumps(
+        {'key': key, 'exported_at': time.time(), 'pages': done}, sort_keys=True
+    ).encode('utf-8'))
+    return {
+        'pages': len(pages),
+        'rendered': len(stale) - len(errors),
+        'removed': removed,
+        'errors': errors,
+        'seconds': time.perf_counter() - started,
+    }
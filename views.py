@@ -0,0 +1,190 @@
+from flask import abort, current_app, render_template, request, redirect, send_file, url_for, flash
+from models.product import PRODUCT_SORTS, Category, Product, ProductType
+from contact_queue import contact_queue
+from catalog_file import catalog_file
+from sitemap import sitemaps
+from search_cache import search_cache
+import re
+
+# Home route
+def home():
+    return render_template('index.html')
+
+# About Us route
+def about():
+    return render_template('about.html')
+
+# Contact route
+def contact():
+    from forms import ContactForm  # Imported on first use to keep app start-up light
+
+    form = ContactForm()
+    if form.validate_on_submit():
+        # Hand the message to the background writer instead of waiting on the DB
+        queued = contact_queue.submit(
+            form.name.data,
+            form.email.data,
+            form.phone.data,
+            form.subject.data,
+            form.message.data
+        )
+        if not queued:
+            flash('We are receiving a lot of messages right now. Please try again in a moment.', 'danger')
+            return redirect(url_for('contact'))
+        flash('Thank you for your message! We will get back to you soon.', 'success')
+        return redirect(url_for('contact'))
+    
+    return render_template('contact.html', form=form)
+
+def facet_param(name):
+    """Query parameter for a specification attribute: 'Wear Layer' -> 'wear-layer'"""
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+def price_param(name):
+    try:
+        value = float(request.args.get(name, ''))
+    except ValueError:
+        return None
+    return value if value >= 0 else None
+
+def listing_params():
+    """Price range, sort order and keyset position from the query string.
+
+    ?price_min=&price_max= bound the price, ?sort= is one of PRODUCT_SORTS
+    and ?after= is the cursor of the last product on the previous page.
+    """
+    sort = request.args.get('sort')
+    if sort not in PRODUCT_SORTS:
+        sort = None
+    return {
+        'price_min': price_param('price_min'),
+        'price_max': price_param('price_max'),
+        'sort': sort,
+        'after': Product.parse_page_cursor(request.args.get('after', ''), sort),
+    }
+
+def next_page(products, limit, sort=None):
+    """Trim a listing fetched with `limit + 1` rows; returns the page and the next page's URL"""
+    if len(products) <= limit:
+        return products, None
+    products = products[:limit]
+    args = request.args.to_dict()
+    args['after'] = Product.page_cursor(products[-1], sort)
+    return products, url_for(request.endpoint, **(request.view_args or {}), **args)
+
+# Category page route (e.g., LVT, Carpets, etc.)
+def category(category_name):
+    catalog = catalog_file.current()  # Memory-mapped catalog, when exported
+    if catalog:
+        category = catalog.category_by_slug(category_name)
+    else:
+        category = Category.filter_by(slug=category_name)
+    if not category:
+        return render_template('404.html'), 404
+        
+    if catalog:
+        product_types = catalog.types_for(category.id)
+    else:
+        product_types = ProductType.filter_by(category_id=category.id)
+    
+    # Filter by product type if specified in the query parameters
+    type_filter = request.args.get('type')
+    product_type_list = [pt for pt in product_types if pt.slug == type_filter] if type_filter else []
+    product_type_id = product_type_list[0].id if product_type_list else None
+    
+    # Filter by specification attributes, e.g. ?thickness=5mm&wear-layer=0.5mm
+    facet_names = current_app.config['FACET_ATTRIBUTES']
+    facet_params = {name: facet_param(name) for name in facet_names}
+    facet_filters = {
+        name: request.args[param] for name, param in facet_params.items() if request.args.get(param)
+    }
+    
+    # Price range, sort order and page
+    listing = listing_params()
+    price_range = {'price_min': listing['price_min'], 'price_max': listing['price_max']}
+    page_size = current_app.config['PRODUCTS_PAGE_SIZE']
+    
+    if catalog:
+        products, facet_counts = catalog.facets(category.id, product_type_id, facet_filters, facet_names, **price_range)
+        products = Product.sort_page(products, listing['sort'], listing['after'], page_size + 1)
+    else:
+        products = Product.filter_by_facets(category.id, product_type_id, facet_filters, **listing, limit=page_size + 1)
+        facet_counts = Product.facet_counts(category.id, product_type_id, facet_filters, facet_names, **price_range)
+    products, next_url = next_page(products, page_size, listing['sort'])
+    
+    facets = [
+        {
+            'name': name,
+            'param': facet_params[name],
+            'selected': facet_filters.get(name),
+            'options': facet_counts['attributes'][name],
+        }
+        for name in facet_names if facet_counts['attributes'][name]
+    ]
+    
+    return render_template(
+        'category.html', 
+        category=category, 
+        product_types=product_types, 
+        type_names={pt.id: pt.name for pt in product_types},
+        active_type=product_type_list[0].slug if product_type_list else None,
+        products=products,
+        facets=facets,
+        facet_filters=facet_filters,
+        facet_counts=facet_counts,
+        listing=listing,
+        sorts=PRODUCT_SORTS,
+        next_url=next_url,
+        active_category=category_name
+    )
+
+# Product page route
+def product(product_id):
+    catalog = catalog_file.current()  # Memory-mapped catalog, when exported
+    if catalog:
+        product = catalog.product(product_id)
+    else:
+        products = Product.filter_by(product_id=product_id)
+        product = products[0] if products else None
+    if not product:
+        return render_template('404.html'), 404
+        
+    # Find the category for active menu highlighting
+    category = catalog.category(product.category_id) if catalog else Category.get(product.category_id)
+    active_category = category.slug if category else None
+    
+    # Precomputed by `flask related-products`; one indexed query
+    related = Product.related(product.id, current_app.config['RELATED_PRODUCTS_SHOWN'])
+    return render_template('product.html', product=product, active_category=active_category, related=related)
+
+# Search route
+def search():
+    query = request.args.get('search', '')
+    if not query:
+        return render_template('search.html', query='', results=[])
+    
+    # Search for products by name, description, or product_id; popular queries are cached
+    listing = listing_params()
+    page_size = current_app.config['PRODUCTS_PAGE_SIZE']
+    results = search_cache.search(query, **listing, limit=page_size + 1)
+    results, next_url = next_page(results, page_size, listing['sort'])
+    
+    return render_template(
+        'search.html',
+        query=query,
+        results=results,
+        listing=listing,
+        sorts=PRODUCT_SORTS,
+        next_url=next_url
+    )
+
+# Sitemap index route
+def sitemap_index():
+    return send_file(sitemaps.index(), mimetype='application/xml', conditional=True)
+
+# Child sitemap route (fixed pages, or one category's products)
+def sitemap(name):
+    path = sitemaps.child(name)
+    if not path:
+        abort(404)
+    return send_file(path, mimetype='application/xml', conditional=True)